@@ -0,0 +1,84 @@
+"""
+Оценка всех портфелей: построчный цикл (курс каждого кошелька через
+CrossRateEngine.get) против BalanceMatrix и одного умножения на
+вектор курсов (aum_report).
+
+    poetry run python -m benchmarks.aum_report
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# модули пишут в data/ относительно текущего каталога — уходим во временный
+os.chdir(tempfile.mkdtemp(prefix="valutatrade-bench-"))
+
+from valutatrade_hub.core.money import to_major, to_minor  # noqa: E402
+from valutatrade_hub.core.valuation import (  # noqa: E402
+    BalanceMatrix,
+    aum_report,
+)
+from valutatrade_hub.parser_service.cross_rates import get_cross_rates  # noqa: E402
+from valutatrade_hub.parser_service.storage import save_rates  # noqa: E402
+
+USERS = 1_000_000
+WALLETS_PER_USER = 8
+CODES = ["USD", "EUR", "GBP", "RUB", "JPY", "CNY", "BTC", "ETH", "SOL", "TON"]
+
+
+def publish_rates():
+    now = datetime.now(timezone.utc).isoformat()
+    pairs = {
+        f"{code}_USD": {"rate": 1.0 + i * 3.7, "timestamp": now, "source": "bench"}
+        for i, code in enumerate(CODES[1:])
+    }
+    save_rates(pairs, now)
+
+
+def make_rows(users: int) -> list:
+    """(user_id, code, balance_minor) — как iter_wallet_rows хранилища"""
+    rng = random.Random(0)
+    rows = []
+    for user_id in range(1, users + 1):
+        for code in rng.sample(CODES, WALLETS_PER_USER):
+            rows.append((user_id, code, to_minor(rng.uniform(0.0, 1000.0), code)))
+    return rows
+
+
+def loop_totals(rows: list, base: str) -> dict:
+    """Прежний путь: курс каждого кошелька запрашивается отдельно"""
+    engine = get_cross_rates()
+    totals: dict = {}
+    for user_id, code, balance in rows:
+        rate = 1.0 if code == base else engine.get(code, base)[0]
+        totals[user_id] = totals.get(user_id, 0.0) + to_major(balance, code) * rate
+    return totals
+
+
+def main():
+    publish_rates()
+    rows = make_rows(USERS)
+    print(f"{USERS} пользователей, {len(rows)} кошельков")
+
+    started = time.perf_counter()
+    totals = loop_totals(rows, "USD")
+    loop_time = time.perf_counter() - started
+    print(f"  цикл по кошелькам      {loop_time:8.2f} с")
+
+    started = time.perf_counter()
+    matrix = BalanceMatrix.from_rows(rows)
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    report = aum_report("USD", top=10, matrix=matrix)
+    value_time = time.perf_counter() - started
+    print(f"  построение матрицы     {build_time:8.2f} с")
+    print(f"  оценка + топ + экспоз. {value_time * 1000:8.1f} мс")
+
+    drift = abs(report.total - sum(totals.values())) / report.total
+    print(f"  AUM {report.total:,.2f} USD, расхождение с циклом {drift:.1e}")
+
+
+if __name__ == "__main__":
+    main()
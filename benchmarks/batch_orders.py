@@ -0,0 +1,95 @@
+"""
+500 заявок по одной (buy_currency/sell_currency: чтение и запись
+portfolios.json на каждую) против execute_orders (одно чтение,
+один снимок курсов, одна запись) на JSON-хранилище с тысячами портфелей.
+
+    poetry run python -m benchmarks.batch_orders
+"""
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# модули пишут в data/ относительно текущего каталога — уходим во временный
+os.chdir(tempfile.mkdtemp(prefix="valutatrade-bench-"))
+os.makedirs("data", exist_ok=True)
+
+from valutatrade_hub.core import usecases  # noqa: E402
+from valutatrade_hub.core.usecases import Order, execute_orders  # noqa: E402
+from valutatrade_hub.parser_service.storage import save_rates  # noqa: E402
+
+USERS = 5_000
+ORDERS = 500
+START_USD_MINOR = 10_000_000 * 100
+
+
+def prepare():
+    now = datetime.now(timezone.utc).isoformat()
+    save_rates(
+        {
+            "BTC_USD": {"rate": 60000.0, "timestamp": now, "source": "bench"},
+            "EUR_USD": {"rate": 1.1, "timestamp": now, "source": "bench"},
+            "ETH_USD": {"rate": 3000.0, "timestamp": now, "source": "bench"},
+        },
+        now,
+    )
+    with open("data/users.json", "w", encoding="utf-8") as f:
+        json.dump([
+            {
+                "user_id": user_id,
+                "username": f"user{user_id}",
+                "hashed_password": "",
+                "salt": "",
+                "registration_date": now,
+            }
+            for user_id in range(1, USERS + 1)
+        ], f)
+    reset_portfolios()
+
+
+def reset_portfolios():
+    with open("data/portfolios.json", "w", encoding="utf-8") as f:
+        json.dump([
+            {"user_id": user_id, "wallets": {"USD": {"minor": START_USD_MINOR}}}
+            for user_id in range(1, USERS + 1)
+        ], f, indent=2)
+
+
+def make_orders() -> list:
+    rng = random.Random(0)
+    orders = []
+    for _ in range(ORDERS // 2):
+        code = rng.choice(["BTC", "EUR", "ETH"])
+        amount = round(rng.uniform(0.01, 1.0), 2)
+        orders += [Order("buy", code, amount), Order("sell", code, amount)]
+    return orders
+
+
+def main():
+    prepare()
+    usecases._current_user = usecases.User(1, "user1", "", "", datetime.now())
+    orders = make_orders()
+    print(f"{ORDERS} заявок, {USERS} портфелей в portfolios.json")
+
+    started = time.perf_counter()
+    for order in orders:
+        trade = usecases.buy_currency if order.side == "buy" else usecases.sell_currency
+        trade(order.currency, order.amount)
+    single = time.perf_counter() - started
+    single_state = usecases.db.backend.get_wallets(1)
+
+    reset_portfolios()
+    started = time.perf_counter()
+    results = execute_orders(orders)
+    batch = time.perf_counter() - started
+    batch_state = usecases.db.backend.get_wallets(1)
+
+    print(f"  по одной        {single:7.2f} с")
+    print(f"  execute_orders  {batch:7.2f} с  (исполнено {sum(r.ok for r in results)})")
+    print(f"  итоговые балансы совпадают: {single_state == batch_state}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Пропускная способность и точность учёта балансов: float, Decimal
+и целые минимальные единицы (центы/сатоши, как в Wallet). Каждая сделка —
+покупка BTC за USD по курсу и обратная продажа половины объёма.
+
+    poetry run python -m benchmarks.ledger_arithmetic
+"""
+import random
+import time
+from decimal import ROUND_DOWN, ROUND_HALF_EVEN, Decimal
+
+from valutatrade_hub.core.models import Portfolio
+from valutatrade_hub.core.money import convert_minor, to_minor
+
+TRADES = 200_000
+START_USD = 100_000_000
+
+
+def make_trades() -> list:
+    rng = random.Random(0)
+    return [
+        (round(rng.uniform(0.0001, 0.01), 8), round(rng.uniform(50000, 70000), 2))
+        for _ in range(TRADES)
+    ]
+
+
+def run_float(trades: list):
+    usd, btc = float(START_USD), 0.0
+    for amount, rate in trades:
+        cost = amount * rate
+        if usd < cost:
+            continue
+        usd -= cost
+        btc += amount
+        half = amount / 2
+        btc -= half
+        usd += half * rate
+    return usd, btc
+
+
+def run_decimal(trades: list):
+    cent, satoshi = Decimal("0.01"), Decimal("0.00000001")
+    usd, btc = Decimal(START_USD), Decimal(0)
+    for amount, rate in trades:
+        amount, rate = Decimal(str(amount)), Decimal(str(rate))
+        cost = (amount * rate).quantize(cent, ROUND_HALF_EVEN)
+        if usd < cost:
+            continue
+        usd -= cost
+        btc += amount
+        half = (amount / 2).quantize(satoshi, ROUND_DOWN)
+        btc -= half
+        usd += (half * rate).quantize(cent, ROUND_HALF_EVEN)
+    return usd, btc
+
+
+def run_minor(trades: list):
+    usd, btc = START_USD * 100, 0
+    for amount, rate in trades:
+        amount = to_minor(amount, "BTC")
+        cost = convert_minor(amount, "BTC", rate, "USD")
+        if usd < cost:
+            continue
+        usd -= cost
+        btc += amount
+        half = amount // 2
+        btc -= half
+        usd += convert_minor(half, "BTC", rate, "USD")
+    return usd / 100, btc / 10 ** 8
+
+
+def run_wallets(trades: list):
+    """
+    Тот же учёт через Portfolio/Wallet (array('q') минимальных единиц);
+    объём BTC зачисляется через Wallet.deposit в единицах валюты
+    """
+    portfolio = Portfolio.from_balances(1, {"USD": START_USD * 100, "BTC": 0})
+    usd, btc = portfolio.get_wallet("USD"), portfolio.get_wallet("BTC")
+    for amount, rate in trades:
+        amount_minor = to_minor(amount, "BTC")
+        cost = convert_minor(amount_minor, "BTC", rate, "USD")
+        if usd.balance_minor < cost:
+            continue
+        usd.withdraw_minor(cost)
+        btc.deposit(amount)
+        half = amount_minor // 2
+        btc.withdraw_minor(half)
+        usd.deposit_minor(convert_minor(half, "BTC", rate, "USD"))
+    return usd.balance, btc.balance
+
+
+def main():
+    trades = make_trades()
+    print(f"{TRADES} сделок (покупка + продажа половины)")
+    for label, run in (
+        ("float", run_float),
+        ("Decimal", run_decimal),
+        ("int minor", run_minor),
+        ("Wallet", run_wallets),
+    ):
+        started = time.perf_counter()
+        usd, btc = run(trades)
+        elapsed = time.perf_counter() - started
+        print(
+            f"  {label:10} {TRADES / elapsed:>10,.0f} сделок/с"
+            f"  USD {usd!s:>22}  BTC {btc!s:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
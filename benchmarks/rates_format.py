@@ -0,0 +1,71 @@
+"""
+Сравнение прежнего формата rates.json (indent=2, словарь пар)
+с компактным колоночным форматом версии 2: размер файла и время
+json.load + построения записей RatesCache.
+
+    poetry run python -m benchmarks.rates_format
+"""
+import json
+import os
+import tempfile
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from valutatrade_hub.parser_service.rates_cache import RatesCache
+from valutatrade_hub.parser_service.rates_format import dumps_rates
+
+
+def make_pairs(count: int) -> dict:
+    """Пары двух источников; у пар одного опроса общая метка времени"""
+    now = datetime.now(timezone.utc)
+    fetched_at = {
+        "CoinGecko": now.isoformat(),
+        "ExchangeRate-API": (now - timedelta(seconds=2)).isoformat(),
+    }
+    pairs = {}
+    for i in range(count):
+        source = "CoinGecko" if i % 3 == 0 else "ExchangeRate-API"
+        pairs[f"C{i:04d}_USD"] = {
+            "rate": 1.0 + i / 7,
+            "timestamp": fetched_at[source],
+            "source": source,
+            "meta": {"raw_id": f"coin-{i}"} if source == "CoinGecko"
+            else {"status_code": 200},
+        }
+    return pairs
+
+
+def measure(path: str, number: int) -> float:
+    def load():
+        cache = RatesCache(path)
+        cache.entries()
+
+    return min(timeit.repeat(load, number=number, repeat=5)) / number * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (160, 5000):
+            pairs = make_pairs(count)
+            last_refresh = datetime.now(timezone.utc).isoformat()
+            old_path = os.path.join(tmp, f"old-{count}.json")
+            new_path = os.path.join(tmp, f"new-{count}.json")
+            with open(old_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"pairs": pairs, "last_refresh": last_refresh},
+                    f, indent=2, ensure_ascii=False,
+                )
+            with open(new_path, "w", encoding="utf-8") as f:
+                f.write(dumps_rates(pairs, last_refresh))
+
+            number = 200 if count < 1000 else 10
+            print(f"{count} пар:")
+            for label, path in (("прежний", old_path), ("v2", new_path)):
+                print(
+                    f"  {label:8} {os.path.getsize(path):>9} байт"
+                    f"  {measure(path, number):8.3f} мс"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Пропускная способность и хвостовые задержки RatesUpdater без сети:
+клиенты направлены на локальный подменный сервер (StandInServer) с
+синтетическими ответами на тысячи пар, задержкой и внедрёнными ошибками.
+
+    poetry run python -m benchmarks.updater_replay
+"""
+import os
+import tempfile
+import time
+
+# модули пишут в data/ относительно текущего каталога — уходим во временный
+os.chdir(tempfile.mkdtemp(prefix="valutatrade-bench-"))
+
+from valutatrade_hub.parser_service.api_clients import (  # noqa: E402
+    BaseApiClient,
+    CircuitBreaker,
+    CoinGeckoClient,
+    CoinIdMap,
+    ExchangeRateApiClient,
+)
+from valutatrade_hub.parser_service.standin import (  # noqa: E402
+    StandInServer,
+    SyntheticSource,
+)
+from valutatrade_hub.parser_service.updater import RatesUpdater  # noqa: E402
+
+RUNS = 20
+SCENARIOS = {
+    "без ошибок": {"latency": 0.04, "jitter": 0.02},
+    "5% 500, 2% 429": {
+        "latency": 0.04, "jitter": 0.02, "error_rate": 0.05, "throttle_rate": 0.02,
+    },
+}
+
+
+def make_clients(coins: int) -> list:
+    clients = [
+        ExchangeRateApiClient(),
+        CoinGeckoClient(id_map=CoinIdMap(top=coins)),
+    ]
+    for client in clients:
+        # измеряем сам обмен данными: без лимитов, кеша и выключателя
+        client.limiter = None
+        client.response_cache = None
+        client.breaker = CircuitBreaker(client.__class__.__name__, 10**9)
+    return clients
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main(pairs: int = 3000, coins: int = 1000):
+    synthetic = SyntheticSource(pairs=pairs, coins=coins)
+    for name, options in SCENARIOS.items():
+        server = StandInServer(synthetic=synthetic, **options)
+        BaseApiClient.set_api_base(server.start())
+        try:
+            updater = RatesUpdater(make_clients(coins))
+            updater.run_update()  # прогрев: карта id монет, соединения
+
+            durations, total = [], 0
+            for _ in range(RUNS):
+                started = time.perf_counter()
+                total += updater.run_update()
+                durations.append(time.perf_counter() - started)
+        finally:
+            BaseApiClient.set_api_base(None)
+            server.stop()
+
+        elapsed = sum(durations)
+        print(f"{name}: {RUNS} обновлений, {server.requests} запросов к серверу")
+        print(
+            f"  {total / elapsed:9.0f} пар/с   "
+            f"p50 {percentile(durations, 0.5) * 1000:7.1f} мс   "
+            f"p95 {percentile(durations, 0.95) * 1000:7.1f} мс   "
+            f"max {max(durations) * 1000:7.1f} мс"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Память на 1M кошельков: прежнее представление (Portfolio с dict[str, Wallet],
+у каждого Wallet свой __dict__ и float-баланс) против Portfolio на параллельных
+массивах array('H') + array('q') минимальных единиц с общей таблицей кодов валют.
+
+    poetry run python -m benchmarks.wallet_memory
+"""
+import gc
+import random
+import time
+import tracemalloc
+
+from valutatrade_hub.core.models import Portfolio
+from valutatrade_hub.core.money import to_major, to_minor
+from valutatrade_hub.core.utils import validate_currency_code
+
+PORTFOLIOS = 200_000
+WALLETS_PER_PORTFOLIO = 5
+CODES = ["USD", "EUR", "GBP", "RUB", "JPY", "CNY", "BTC", "ETH", "SOL", "TON"]
+
+
+class LegacyWallet:
+    def __init__(self, currency_code: str, balance: float = 0.0):
+        self._currency_code = validate_currency_code(currency_code)
+        self._balance = float(balance)
+
+    @property
+    def balance(self) -> float:
+        return self._balance
+
+
+class LegacyPortfolio:
+    def __init__(self, user_id: int, wallets: dict):
+        self._user_id = user_id
+        self._wallets = wallets
+
+    @property
+    def wallets(self) -> dict:
+        return self._wallets.copy()
+
+
+def make_balances() -> list:
+    """Балансы в минимальных единицах, как их отдаёт хранилище"""
+    rng = random.Random(0)
+    return [
+        {
+            code: to_minor(rng.uniform(0.0, 1000.0), code)
+            for code in rng.sample(CODES, WALLETS_PER_PORTFOLIO)
+        }
+        for _ in range(PORTFOLIOS)
+    ]
+
+
+def build_legacy(balances: list) -> list:
+    return [
+        LegacyPortfolio(
+            user_id,
+            {
+                code: LegacyWallet(code, to_major(value, code))
+                for code, value in wallets.items()
+            },
+        )
+        for user_id, wallets in enumerate(balances)
+    ]
+
+
+def build_compact(balances: list) -> list:
+    return [
+        Portfolio.from_balances(user_id, wallets)
+        for user_id, wallets in enumerate(balances)
+    ]
+
+
+def measure(build, balances: list):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    portfolios = build(balances)
+    elapsed = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    total = 0.0
+    for portfolio in portfolios:
+        for wallet in portfolio.wallets.values():
+            total += wallet.balance
+    read = time.perf_counter() - started
+    return size, elapsed, read
+
+
+def main():
+    balances = make_balances()
+    wallets = PORTFOLIOS * WALLETS_PER_PORTFOLIO
+    print(f"{PORTFOLIOS} портфелей, {wallets} кошельков")
+    for label, build in (("прежнее", build_legacy), ("массивы", build_compact)):
+        size, elapsed, read = measure(build, balances)
+        print(
+            f"  {label:8} {size / 2 ** 20:8.1f} МиБ ({size / wallets:6.1f} Б/кошелёк)"
+            f"  построение {elapsed:5.2f} с  обход {read:5.2f} с"
+        )
+
+
+if __name__ == "__main__":
+    main()
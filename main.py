@@ -1,13 +1,28 @@
 import logging
+from datetime import datetime, timezone
 from typing import Optional
 
-from valutatrade_hub.core.exceptions import ApiRequestError
+from valutatrade_hub.core.exceptions import ApiRequestError, BatchRejectedError
 from valutatrade_hub.core.services import PortfolioManager, UserManager
+from valutatrade_hub.core.usecases import (
+    format_order_results,
+    load_orders,
+    show_portfolio,
+)
+from valutatrade_hub.core.valuation import aum_report
+from valutatrade_hub.infra.database import DatabaseManager
+from valutatrade_hub.parser_service.aggregation import (
+    get_ohlc_aggregator,
+    parse_duration,
+    parse_interval,
+)
 from valutatrade_hub.parser_service.api_clients import (
     CoinGeckoClient,
     ExchangeRateApiClient,
+    breaker_states,
 )
-from valutatrade_hub.parser_service.storage import load_rates
+from valutatrade_hub.parser_service.rate_limit import limiter_states
+from valutatrade_hub.parser_service.rates_cache import get_rates_cache
 from valutatrade_hub.parser_service.updater import RatesUpdater
 
 logging.basicConfig(
@@ -35,7 +50,12 @@ def update_rates(source: Optional[str] = None):
     updater = RatesUpdater(clients)
     try:
         total = updater.run_update()
-        print(f"Обновление завершено. Всего пар: {total}")
+        report = updater.last_report
+        print(
+            f"Обновление завершено. Всего пар: {total} "
+            f"(изменилось: {report.get('changed', total)}, "
+            f"без изменений: {report.get('unchanged', 0)})"
+        )
     except ApiRequestError as exc:
         print(f"Ошибка обновления: {exc}")
 
@@ -46,9 +66,9 @@ def show_rates(
     base: str = "USD",
 ):
     """Показать локальные курсы валют"""
-    data = load_rates()
-    pairs = data.get("pairs", {})
-    last_refresh = data.get("last_refresh", "N/A")
+    cache = get_rates_cache()
+    pairs = cache.pairs()
+    last_refresh = cache.last_refresh or "N/A"
 
     if not pairs:
         print("Локальный кеш курсов пуст. Выполните 'update-rates'.")
@@ -79,6 +99,98 @@ def show_rates(
         print(f"- {key}: {info['rate']}")
 
 
+def run_batch(path: str, atomic: bool = True):
+    """Исполнение заявок из файла одним пакетом"""
+    orders = load_orders(path)
+    if not orders:
+        print("Файл не содержит заявок.")
+        return
+    try:
+        results = portfolio_manager.execute_orders(orders, atomic)
+    except BatchRejectedError as exc:
+        print(f"{exc}. Портфель не изменён.")
+        failed = [result for result in exc.results if not result.ok]
+        print(format_order_results(failed, summary=False))
+        return
+    print(format_order_results(results))
+
+
+def show_aum_report(base: str = "USD", top: int = 10):
+    """Суммарные активы всех пользователей в базовой валюте"""
+    report = aum_report(base, top)
+    if not report.users:
+        print("Портфели пользователей пусты.")
+        return
+
+    usernames = {
+        user["user_id"]: user["username"]
+        for user in DatabaseManager().backend.iter_users()
+    }
+    print(
+        f"AUM: {report.total:,.2f} {report.base} "
+        f"({report.users} пользователей с кошельками)"
+    )
+    print(f"Топ-{len(report.top_holders)} держателей:")
+    for user_id, value in report.top_holders:
+        name = usernames.get(user_id, f"#{user_id}")
+        print(f"- {name}: {value:,.2f} {report.base}")
+
+    print("Экспозиция по валютам:")
+    exposure = sorted(report.exposure.items(), key=lambda item: -item[1][1])
+    for code, (amount, value, share) in exposure:
+        print(
+            f"- {code}: {amount:,.4f} → {value:,.2f} {report.base} ({share:.1%})"
+        )
+    if report.unpriced:
+        print(f"Без курса (не учтены): {', '.join(report.unpriced)}")
+
+
+def show_sources():
+    """Состояние выключателей и лимитов запросов источников курсов"""
+    limits = {state["source"]: state for state in limiter_states()}
+    for state in breaker_states():
+        line = f"- {state['source']}: {state['state']}"
+        if state["state"] != "closed":
+            line += f", повтор через {state['retry_in']:.0f} с"
+        if state["failures"]:
+            line += f", ошибок подряд: {state['failures']}"
+        if state["last_error"]:
+            line += f" (последняя ошибка: {state['last_error']})"
+        print(line)
+
+        limit = limits.get(state["source"])
+        if limit:
+            quota = f"/{limit['quota']}" if limit["quota"] else ""
+            print(
+                f"  лимит {limit['per_minute']:g}/мин ({limit['policy']}), "
+                f"токенов {limit['tokens']:.1f}/{limit['burst']:g}, "
+                f"запросов за {limit['period']}: {limit['used']}{quota}, "
+                f"отклонено: {limit['rejected']}"
+            )
+
+
+def show_rate_history(pair: str, interval: str, range_text: str):
+    """Свечи OHLC по истории курсов"""
+    pair = pair.upper()
+    if "_" not in pair:
+        pair = f"{pair}_USD"
+
+    bars = get_ohlc_aggregator().bars(
+        pair, parse_interval(interval), parse_duration(range_text)
+    )
+    if not len(bars):
+        print(f"История для '{pair}' за {range_text} пуста.")
+        return
+
+    print(f"{pair} — свечи {interval} за {range_text}:")
+    for start, open_, high, low, close, count in bars.rows():
+        moment = datetime.fromtimestamp(start, timezone.utc).strftime("%Y-%m-%d %H:%M")
+        print(
+            f"- {moment}  O={open_:.6g} H={high:.6g} "
+            f"L={low:.6g} C={close:.6g} ({count})"
+        )
+
+
 def main():
     global current_user
     print("Добро пожаловать в ValutaTrade Hub! Введите 'help' для списка команд.")
@@ -105,6 +217,10 @@ show-portfolio                     — показать портфель пол
 get-rate <currency>                — показать курс валюты
 update-rates [source]              — обновить курсы (coingecko/exchangerate)
 show-rates [currency] [top] [base] — показать локальные курсы
+rate-history <pair> <interval> <range> — свечи OHLC (пример: BTC_USD 1h 7d)
+sources                            — состояние источников курсов
+aum-report [base] [top]            — активы всех пользователей, топ держателей
+batch <file> [--partial]           — исполнить заявки из файла одним пакетом
 exit                               — выйти из CLI
 """
                 )
@@ -151,11 +267,8 @@ exit                               — выйти из CLI
                 if not current_user:
                     print("Сначала выполните login.")
                     continue
-                portfolio = portfolio_manager.get_portfolio()
-                total_value = portfolio.get_total_value()
-                for wallet in portfolio.wallets.values():
-                    print(f"{wallet.currency_code}: {wallet.balance}")
-                print(f"Общая стоимость: {total_value} USD")
+                # строки и итог — по курсам с проверкой свежести
+                print(show_portfolio())
             elif command == "get-rate":
                 if not args:
                     print("Использование: get-rate <currency>")
@@ -171,6 +284,25 @@ exit                               — выйти из CLI
                 top = int(args[1]) if len(args) >= 2 else None
                 base = args[2].upper() if len(args) >= 3 else "USD"
                 show_rates(currency, top, base)
+            elif command == "rate-history":
+                if len(args) < 3:
+                    print("Использование: rate-history <pair> <interval> <range>")
+                    continue
+                show_rate_history(*args[:3])
+            elif command == "batch":
+                if not current_user:
+                    print("Сначала выполните login.")
+                    continue
+                if not args:
+                    print("Использование: batch <file> [--partial]")
+                    continue
+                run_batch(args[0], atomic="--partial" not in args[1:])
+            elif command == "aum-report":
+                base = args[0].upper() if args else "USD"
+                top = int(args[1]) if len(args) >= 2 else 10
+                show_aum_report(base, top)
+            elif command == "sources":
+                show_sources()
             elif command == "exit":
                 print("Выход из CLI...")
                 break
@@ -0,0 +1,58 @@
+import os
+
+from valutatrade_hub.parser_service import history
+from valutatrade_hub.parser_service.history import RateHistoryStore
+
+
+def _record(ts: float) -> dict:
+    return {
+        "from_currency": "BTC",
+        "to_currency": "USD",
+        "rate": 100.0,
+        "timestamp": "2025-01-01T00:00:00Z",
+        "ts": ts,
+    }
+
+
+def _backdate(directory: str):
+    """Отодвигает mtime каталога за окно LISTING_RACY_NS"""
+    old = os.stat(directory).st_mtime_ns - 10 * history.LISTING_RACY_NS
+    os.utime(directory, ns=(old, old))
+
+
+def _count_listdir(monkeypatch) -> list:
+    calls = []
+    listdir = os.listdir
+
+    def counting(path):
+        calls.append(path)
+        return listdir(path)
+
+    monkeypatch.setattr(history.os, "listdir", counting)
+    return calls
+
+
+def test_read_reuses_listing_while_directory_unchanged(tmp_path, monkeypatch):
+    store = RateHistoryStore(str(tmp_path))
+    store.append(_record(1_000.0))
+    _backdate(str(tmp_path))
+    calls = _count_listdir(monkeypatch)
+
+    assert len(list(store.read("BTC_USD"))) == 1
+    assert len(list(store.read("BTC_USD"))) == 1
+    assert len(calls) == 1
+
+
+def test_listing_refreshed_after_new_segment(tmp_path, monkeypatch):
+    store = RateHistoryStore(str(tmp_path), max_segment_seconds=10)
+    store.append(_record(1_000.0))
+    _backdate(str(tmp_path))
+    other = RateHistoryStore(str(tmp_path), max_segment_seconds=10)
+    assert len(list(store.read("BTC_USD"))) == 1
+
+    # новый сегмент создан другим экземпляром (как другим процессом)
+    other.append(_record(2_000.0))
+    calls = _count_listdir(monkeypatch)
+
+    assert len(list(store.read("BTC_USD"))) == 2
+    assert len(calls) == 1
@@ -5,6 +5,9 @@ from valutatrade_hub.core.exceptions import CurrencyNotFoundError
 
 
 class Currency(ABC):
+    # знаков после запятой у минимальной единицы (центы, сатоши)
+    decimals: int = 2
+
     def __init__(self, name: str, code: str):
         if not isinstance(name, str) or not name.strip():
             raise ValueError("Currency name must be a non-empty string")
@@ -29,8 +32,15 @@ class Currency(ABC):
 
 
 class FiatCurrency(Currency):
-    def __init__(self, name: str, code: str, issuing_country: str):
+    def __init__(
+        self,
+        name: str,
+        code: str,
+        issuing_country: str,
+        decimals: int = 2,
+    ):
         super().__init__(name, code)
+        self.decimals = decimals
 
         if not isinstance(issuing_country, str) or not issuing_country.strip():
             raise ValueError("Issuing country must be a non-empty string")
@@ -47,9 +57,11 @@ class CryptoCurrency(Currency):
         name: str,
         code: str,
         algorithm: str,
-        market_cap: float
+        market_cap: float,
+        decimals: int = 8,
     ):
         super().__init__(name, code)
+        self.decimals = decimals
 
         if not isinstance(algorithm, str) or not algorithm.strip():
             raise ValueError("Algorithm must be a non-empty string")
@@ -71,7 +83,8 @@ _CURRENCY_REGISTRY: Dict[str, Currency] = {
     "USD": FiatCurrency("US Dollar", "USD", "United States"),
     "EUR": FiatCurrency("Euro", "EUR", "Eurozone"),
     "BTC": CryptoCurrency("Bitcoin", "BTC", "SHA-256", 1.12e12),
-    "ETH": CryptoCurrency("Ethereum", "ETH", "Ethash", 4.5e11),
+    # 18 знаков (wei) не помещаются в int64 — учёт ведётся в gwei
+    "ETH": CryptoCurrency("Ethereum", "ETH", "Ethash", 4.5e11, decimals=9),
 }
 
 
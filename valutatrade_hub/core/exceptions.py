@@ -8,6 +8,16 @@ class ApiRequestError(ValutaTradeError):
     pass
 
 
+class CircuitOpenError(ApiRequestError):
+    """Источник курсов временно отключён автоматическим выключателем."""
+    pass
+
+
+class RateLimitError(ApiRequestError):
+    """Превышен лимит частоты или квота запросов к источнику курсов."""
+    pass
+
+
 class AuthRequiredError(ValutaTradeError):
     """Ошибка авторизации."""
     pass
@@ -46,4 +56,12 @@ class InsufficientFundsError(ValutaTradeError):
 
 class ValidationError(ValutaTradeError):
     """Общее исключение для ошибок валидации данных."""
-    pass
\ No newline at end of file
+    pass
+
+
+class BatchRejectedError(ValutaTradeError):
+    """Пакет заявок отклонён целиком: хотя бы одна заявка не проходит."""
+
+    def __init__(self, message: str, results: list):
+        super().__init__(message)
+        self.results = results
@@ -1,11 +1,16 @@
+import math
+from array import array
+from collections.abc import Mapping
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Iterator, List, Optional
 
+from valutatrade_hub.core.currencies import get_currency
 from valutatrade_hub.core.exceptions import (
     CurrencyNotFoundError,
     InsufficientFundsError,
     ValidationError,
 )
+from valutatrade_hub.core.money import MINOR_MAX, amount_to_minor, scale, to_minor
 from valutatrade_hub.core.utils import (
     validate_amount,
     validate_currency_code,
@@ -47,77 +52,235 @@ class User:
         }
 
 
+# Общая таблица кодов валют: портфели хранят индексы вместо строк,
+# а код проверяется один раз — при первом появлении
+_CURRENCY_CODES: List[str] = []
+_CURRENCY_SCALES: List[int] = []
+_CURRENCY_IDS: Dict[str, int] = {}
+
+
+def intern_currency(code: str) -> int:
+    """Индекс кода валюты в общей таблице (с проверкой нового кода)"""
+    currency_id = _CURRENCY_IDS.get(code)
+    if currency_id is not None:
+        return currency_id
+    valid = validate_currency_code(code)
+    currency_id = _CURRENCY_IDS.get(valid)
+    if currency_id is None:
+        currency_id = len(_CURRENCY_CODES)
+        _CURRENCY_CODES.append(valid)
+        _CURRENCY_SCALES.append(scale(valid))
+        _CURRENCY_IDS[valid] = currency_id
+    _CURRENCY_IDS[code] = currency_id
+    return currency_id
+
+
 class Wallet:
+    """
+    Кошелёк одной валюты. Баланс — целое число минимальных единиц
+    (центы, сатоши) в ячейке slot массива int64 store: у отдельного
+    кошелька это собственный массив из одного элемента, у кошелька
+    из портфеля — общий массив балансов портфеля. В float баланс
+    переводится только для вывода (balance).
+    """
+
+    __slots__ = ("_currency_code", "_store", "_slot", "_scale")
+
     def __init__(self, currency_code: str, balance: float = 0.0):
         self._currency_code = validate_currency_code(currency_code)
-        self._balance = 0.0
+        # точность кошелька берётся из реестра, иначе её нечем подтвердить
+        get_currency(self._currency_code)
+        self._store = array("q", (0,))
+        self._slot = 0
+        self._scale = scale(self._currency_code)
         self.balance = balance
 
+    @classmethod
+    def _view(
+        cls, currency_code: str, store: array, slot: int, unit_scale: int
+    ) -> "Wallet":
+        wallet = cls.__new__(cls)
+        wallet._currency_code = currency_code
+        wallet._store = store
+        wallet._slot = slot
+        wallet._scale = unit_scale
+        return wallet
+
     @property
     def currency_code(self) -> str:
         return self._currency_code
 
     @property
     def balance(self) -> float:
-        return self._balance
+        return self._store[self._slot] / self._scale
 
     @balance.setter
     def balance(self, value: float):
         if not isinstance(value, (int, float)) or value < 0:
             raise ValueError("Баланс должен быть неотрицательным числом")
-        self._balance = float(value)
+        self._store[self._slot] = to_minor(value, self._currency_code)
 
-    def deposit(self, amount: float):
+    @property
+    def balance_minor(self) -> int:
+        return self._store[self._slot]
+
+    def _amount_minor(self, amount: float) -> int:
+        """
+        Сумма операции в минимальных единицах кошелька. Точность уже
+        известна (_scale), поэтому обычное положительное число переводится
+        без validate_amount и обращения к реестру; остальное проверяется
+        полностью, с прежними сообщениями об ошибках.
+        """
+        if type(amount) in (int, float) and 0 < amount < math.inf:
+            minor = round(amount * self._scale)
+            if 0 < minor <= MINOR_MAX:
+                return minor
         validate_amount(amount)
-        self._balance += amount
+        return amount_to_minor(amount, self._currency_code)
+
+    def deposit(self, amount: float):
+        self._store[self._slot] += self._amount_minor(amount)
 
     def withdraw(self, amount: float):
-        validate_amount(amount)
+        self.withdraw_minor(self._amount_minor(amount))
 
-        if amount > self._balance:
+    def deposit_minor(self, amount: int):
+        self._store[self._slot] += amount
+
+    def withdraw_minor(self, amount: int):
+        balance = self._store[self._slot]
+        if amount > balance:
             raise InsufficientFundsError(
                 f"Недостаточно средств: "
-                "доступно {self._balance} {self._currency_code}, "
-                f"требуется {amount} {self._currency_code}"
+                f"доступно {balance / self._scale} {self._currency_code}, "
+                f"требуется {amount / self._scale} {self._currency_code}"
             )
 
-        self._balance -= amount
+        self._store[self._slot] = balance - amount
 
     def get_balance_info(self) -> dict:
         return {
             "currency_code": self._currency_code,
-            "balance": self._balance,
+            "balance": self.balance,
+            "balance_minor": self.balance_minor,
         }
 
 
+class _WalletsView(Mapping):
+    """Кошельки портфеля только для чтения: code → Wallet, без копирования"""
+
+    __slots__ = ("_portfolio",)
+
+    def __init__(self, portfolio: "Portfolio"):
+        self._portfolio = portfolio
+
+    def __getitem__(self, code: str) -> Wallet:
+        wallet = self._portfolio._find(code)
+        if wallet is None:
+            raise KeyError(code)
+        return wallet
+
+    def __iter__(self) -> Iterator[str]:
+        for currency_id in self._portfolio._codes:
+            yield _CURRENCY_CODES[currency_id]
+
+    def __len__(self) -> int:
+        return len(self._portfolio._codes)
+
+    # обход по ячейкам подряд, без поиска кода для каждого кошелька
+    def values(self) -> List[Wallet]:
+        return [wallet for _, wallet in self._portfolio._iter_wallets()]
+
+    def items(self) -> List[tuple]:
+        return list(self._portfolio._iter_wallets())
+
+
 class Portfolio:
+    """
+    Портфель пользователя: индексы кодов валют (array('H')) и балансы
+    в минимальных единицах (array('q')) в двух параллельных массивах.
+    wallets и get_wallet отдают представления Wallet над ячейками массива
+    балансов, поэтому чтение не копирует данные и не создаёт кошельки заранее.
+    """
+
+    __slots__ = ("_user_id", "_codes", "_balances")
+
     def __init__(self, user_id: int, wallets: Optional[dict[str, Wallet]] = None):
         self._user_id = user_id
-        self._wallets: dict[str, Wallet] = wallets if wallets is not None else {}
+        self._codes = array("H")
+        self._balances = array("q")
+        for wallet in (wallets or {}).values():
+            # переданные кошельки переключаются на массив портфеля
+            self._codes.append(intern_currency(wallet.currency_code))
+            self._balances.append(wallet.balance_minor)
+            wallet._store = self._balances
+            wallet._slot = len(self._balances) - 1
+
+    @classmethod
+    def from_balances(cls, user_id: int, balances: Dict[str, int]) -> "Portfolio":
+        """Портфель из {code: минимальные единицы} хранилища без создания Wallet"""
+        portfolio = cls(user_id)
+        portfolio._codes = array("H", map(intern_currency, balances))
+        portfolio._balances = array("q", balances.values())
+        if portfolio._balances and min(portfolio._balances) < 0:
+            raise ValueError("Баланс должен быть неотрицательным числом")
+        return portfolio
 
     @property
     def user(self) -> int:
         return self._user_id
 
     @property
-    def wallets(self) -> dict[str, Wallet]:
-        return self._wallets.copy()
+    def wallets(self) -> Mapping:
+        return _WalletsView(self)
+
+    def balances(self) -> Dict[str, int]:
+        """Снимок {code: минимальные единицы} для сохранения"""
+        return {
+            _CURRENCY_CODES[currency_id]: balance
+            for currency_id, balance in zip(self._codes, self._balances)
+        }
+
+    def _iter_wallets(self) -> Iterator[tuple]:
+        view, balances = Wallet._view, self._balances
+        for slot, currency_id in enumerate(self._codes):
+            code = _CURRENCY_CODES[currency_id]
+            yield code, view(code, balances, slot, _CURRENCY_SCALES[currency_id])
+
+    def _find(self, currency_code: str) -> Optional[Wallet]:
+        currency_id = _CURRENCY_IDS.get(currency_code)
+        if currency_id is None:
+            return None
+        try:
+            slot = self._codes.index(currency_id)
+        except ValueError:
+            return None
+        return Wallet._view(
+            _CURRENCY_CODES[currency_id],
+            self._balances,
+            slot,
+            _CURRENCY_SCALES[currency_id],
+        )
 
     def add_currency(self, currency_code: str):
-        currency_code = validate_currency_code(currency_code)
+        currency_id = intern_currency(currency_code)
+        # новый кошелёк — только для валюты из реестра (с известной точностью)
+        get_currency(_CURRENCY_CODES[currency_id])
 
-        if currency_code in self._wallets:
+        if currency_id in self._codes:
             return
 
-        self._wallets[currency_code] = Wallet(currency_code)
+        self._codes.append(currency_id)
+        self._balances.append(0)
 
     def get_wallet(self, currency_code: str) -> Wallet:
         currency_code = validate_currency_code(currency_code)
 
-        if currency_code not in self._wallets:
+        wallet = self._find(currency_code)
+        if wallet is None:
             raise CurrencyNotFoundError(f"Неизвестная валюта '{currency_code}'")
 
-        return self._wallets[currency_code]
+        return wallet
 
     def get_total_value(self, base_currency: str = "USD") -> float:
         base_currency = validate_currency_code(base_currency)
@@ -136,10 +299,11 @@ class Portfolio:
 
         total_usd = 0.0
 
-        for wallet in self._wallets.values():
-            if wallet.currency_code not in exchange_rates:
+        for currency_id, balance in zip(self._codes, self._balances):
+            rate = exchange_rates.get(_CURRENCY_CODES[currency_id])
+            if rate is None:
                 continue
 
-            total_usd += wallet.balance * exchange_rates[wallet.currency_code]
+            total_usd += balance / _CURRENCY_SCALES[currency_id] * rate
 
         return total_usd / exchange_rates[base_currency]
@@ -0,0 +1,78 @@
+import math
+from typing import Dict
+
+from valutatrade_hub.core.currencies import get_currency
+from valutatrade_hub.core.exceptions import CurrencyNotFoundError, ValidationError
+
+# Точность валют, которых нет в реестре (например, монет из курсов CoinGecko):
+# нужна только для пересчёта курсов — кошельки заводятся лишь для валют реестра
+DEFAULT_DECIMALS = 8
+
+# Границы int64: балансы хранятся в array('q') и в INTEGER SQLite
+MINOR_MAX = 2 ** 63 - 1
+
+_scales: Dict[str, int] = {}
+
+
+def decimals(code: str) -> int:
+    try:
+        return get_currency(code).decimals
+    except CurrencyNotFoundError:
+        return DEFAULT_DECIMALS
+
+
+def scale(code: str) -> int:
+    """Число минимальных единиц в одной единице валюты (100 для USD)"""
+    value = _scales.get(code)
+    if value is None:
+        value = _scales[code] = 10 ** decimals(code)
+    return value
+
+
+def to_minor(amount: float, code: str) -> int:
+    """Сумма в единицах валюты → целое число минимальных единиц (с округлением)"""
+    minor = round(amount * (_scales.get(code) or scale(code)))
+    if abs(minor) > MINOR_MAX:
+        raise ValidationError(f"Сумма {amount} {code} слишком велика")
+    return minor
+
+
+def amount_to_minor(amount: float, code: str) -> int:
+    """Сумма операции в минимальных единицах; меньше одной единицы — ошибка"""
+    if not math.isfinite(amount):
+        raise ValidationError(f"Неверная сумма {amount} {code}")
+    minor = to_minor(amount, code)
+    if minor <= 0:
+        raise ValidationError(
+            f"Сумма {amount} {code} меньше минимальной единицы валюты"
+        )
+    return minor
+
+
+def to_major(minor: int, code: str) -> float:
+    """Минимальные единицы → float для вывода и оценки по курсу"""
+    return minor / scale(code)
+
+
+def format_minor(minor: int, code: str) -> str:
+    """Точная десятичная запись без промежуточного float: 150000001 BTC → 1.50000001"""
+    places = decimals(code)
+    sign = "-" if minor < 0 else ""
+    whole, frac = divmod(abs(minor), 10 ** places)
+    return f"{sign}{whole}.{frac:0{places}d}" if places else f"{sign}{whole}"
+
+
+def convert_minor(minor: int, from_code: str, rate: float, to_code: str) -> int:
+    """
+    minor единиц from_code по курсу rate (to_code за 1 from_code)
+    → минимальные единицы to_code. Округление к ближайшему (банковское) —
+    единственная неточность сделки, один раз на операцию.
+    """
+    # _scales.get вместо scale(): без лишнего вызова функции на сделку
+    converted = round(
+        minor * rate * (_scales.get(to_code) or scale(to_code))
+        / (_scales.get(from_code) or scale(from_code))
+    )
+    if abs(converted) > MINOR_MAX:
+        raise ValidationError(f"Сумма в {to_code} слишком велика")
+    return converted
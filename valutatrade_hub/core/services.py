@@ -1,136 +1,115 @@
-import json
-from datetime import datetime
-from hashlib import sha256
 from pathlib import Path
 
-from valutatrade_hub.core.models import Portfolio, User, Wallet
+from valutatrade_hub.core import usecases
+from valutatrade_hub.core.currencies import get_currency
+from valutatrade_hub.core.models import Portfolio, User
+from valutatrade_hub.core.money import amount_to_minor
+from valutatrade_hub.core.usecases import Order, OrderResult
+from valutatrade_hub.core.utils import validate_amount, validate_currency_code
+from valutatrade_hub.core.valuation import get_valuation_cache
+from valutatrade_hub.infra.database import DatabaseManager
+from valutatrade_hub.parser_service.rate_table import get_rate_table
+from valutatrade_hub.parser_service.rates_cache import get_rates_cache
 
 DATA_DIR = Path("data")
-USERS_FILE = DATA_DIR / "users.json"
-PORTFOLIOS_FILE = DATA_DIR / "portfolios.json"
 
 DATA_DIR.mkdir(exist_ok=True)
 
-if not USERS_FILE.exists():
-    USERS_FILE.write_text("[]", encoding="utf-8")
-
-if not PORTFOLIOS_FILE.exists():
-    PORTFOLIOS_FILE.write_text("[]", encoding="utf-8")
-
 class UserManager:
-    def __init__(self):
-        self._current_user: User | None = None
-        self._load_users()
-
-    def _load_users(self):
-        self._users = json.loads(USERS_FILE.read_text(encoding="utf-8"))
-
-    def _save_users(self):
-        USERS_FILE.write_text(json.dumps(self._users, indent=2), encoding="utf-8")
-
-    def register(self, username: str, password: str):
-        if any(user["username"] == username for user in self._users):
-            raise ValueError(f"Пользователь '{username}' уже существует")
-        hashed = sha256(password.encode()).hexdigest()
-        user = {
-            "user_id": len(self._users) + 1,
-            "username": username,
-            "password": hashed,
-            "created_at": datetime.now().isoformat()
-        }
-        self._users.append(user)
-        self._save_users()
-        self._current_user = User(
-            user["user_id"], 
-            user["username"], 
-            hashed, "", 
-            datetime.now()
-        )
-        return self._current_user
+    """
+    Регистрация и вход через usecases: пользователи хранятся в хранилище
+    DatabaseManager().backend (json | journal | sqlite), как и портфели.
+    """
 
-    def login(self, username: str, password: str):
-        hashed = sha256(password.encode()).hexdigest()
-        data = next((
-            user for user in self._users 
-            if user["username"] == username and user["password"] == hashed), None
-        )
-        if not data:
-            raise ValueError("Неверный логин или пароль")
-        self._current_user = User(
-            data["user_id"], 
-            data["username"], hashed, "", datetime.now()
-        )
-        return self._current_user
+    def register(self, username: str, password: str) -> User:
+        usecases.register_user(username, password)
+        return self.login(username, password)
+
+    def login(self, username: str, password: str) -> User:
+        usecases.login_user(username, password)
+        return self.current_user
 
     @property
-    def current_user(self):
-        return self._current_user
+    def current_user(self) -> User | None:
+        return usecases.get_current_user()
 
 class PortfolioManager:
     def __init__(self, user_manager: UserManager):
         self._user_manager = user_manager
-        self._load_portfolios()
-
-    def _load_portfolios(self):
-        self._portfolios_data = json.loads(PORTFOLIOS_FILE.read_text(encoding="utf-8"))
-        self._portfolios = {}
-        for portfolio in self._portfolios_data:
-            user_id = portfolio["user_id"]
-            wallets = {
-                currency: Wallet(currency, balance)
-                for currency, balance in portfolio.get("wallets", {}).items()
-            }
-            self._portfolios[user_id] = Portfolio(user_id, wallets)
-
-    def _save_portfolios(self):
-        data = []
-        for portfolio in self._portfolios.values():
-            wallets = {
-                wallet.currency_code: wallet.balance
-                for wallet in portfolio.wallets.values()
-            }
-            data.append({"user_id": portfolio.user, "wallets": wallets})
-        PORTFOLIOS_FILE.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        self._db = DatabaseManager()
+        # user_id → (StorageBackend.data_version при загрузке, портфель)
+        self._portfolios: dict[int, tuple[object, Portfolio]] = {}
+
+    def _load_portfolio(self, user_id: int) -> Portfolio:
+        return Portfolio.from_balances(
+            user_id, self._db.backend.get_wallets(user_id)
+        )
+
+    def _save_portfolio(self, portfolio: Portfolio):
+        get_valuation_cache().save_trade(portfolio.user, portfolio.balances())
+        # своя запись не требует перечитывать портфель
+        self._portfolios[portfolio.user] = (
+            self._db.backend.data_version(), portfolio
+        )
 
     def get_portfolio(self):
+        """
+        Портфель текущего пользователя. Кэш перечитывается, когда сменилась
+        метка хранилища (например, после сделок другого процесса);
+        без метки (None) портфель читается заново при каждом обращении.
+        """
         user = self._user_manager.current_user
         if not user:
             raise ValueError("Сначала выполните login")
-        if user.user_id not in self._portfolios:
-            self._portfolios[user.user_id] = Portfolio(user.user_id)
-        return self._portfolios[user.user_id]
+        version = self._db.backend.data_version()
+        cached = self._portfolios.get(user.user_id)
+        if cached is None or version is None or cached[0] != version:
+            cached = (version, self._load_portfolio(user.user_id))
+            self._portfolios[user.user_id] = cached
+        return cached[1]
 
     def buy(self, currency_code: str, amount: float):
+        # проверки до add_currency, чтобы не оставить в портфеле пустой кошелёк
+        currency_code = validate_currency_code(currency_code)
+        validate_amount(amount)
+        get_currency(currency_code)
+        amount_minor = amount_to_minor(amount, currency_code)
+
         portfolio = self.get_portfolio()
         portfolio.add_currency(currency_code)
         wallet = portfolio.get_wallet(currency_code)
-        wallet.deposit(amount)
-        self._save_portfolios()
+        wallet.deposit_minor(amount_minor)
+        self._save_portfolio(portfolio)
         return wallet
 
     def sell(self, currency_code: str, amount: float):
         portfolio = self.get_portfolio()
         wallet = portfolio.get_wallet(currency_code)
         wallet.withdraw(amount)
-        self._save_portfolios()
+        self._save_portfolio(portfolio)
         return wallet
     
+    def execute_orders(
+        self, orders: list[Order], atomic: bool = True
+    ) -> list[OrderResult]:
+        """Пакет заявок текущего пользователя — usecases.execute_orders"""
+        results = usecases.execute_orders(orders, atomic)
+        # запись этого же соединения не меняет метку SQLite (PRAGMA data_version)
+        self._portfolios.pop(self._user_manager.current_user.user_id, None)
+        return results
+
     def get_rate(self, currency_code: str) -> float:
         """
-        Возвращает текущий курс валюты относительно USD.
-        Для простоты можно брать из жестко закодированного словаря
-        или потом интегрировать с parser_service.
+        Возвращает текущий курс валюты относительно USD из бинарной
+        таблицы курсов (rates.bin), а если её ещё нет — из кеша rates.json.
         """
         currency_code = currency_code.upper()
-        exchange_rates = {
-            "USD": 1.0,
-            "EUR": 1.1,
-            "BTC": 50000.0,
-            "ETH": 3000.0,
-            "SOL": 20.0,
-        }
-
-        if currency_code not in exchange_rates:
+        if currency_code == "USD":
+            return 1.0
+
+        pair_key = f"{currency_code}_USD"
+        entry = get_rate_table().get(pair_key) or get_rates_cache().get(pair_key)
+        if entry is None:
             raise ValueError(f"Нет доступного курса для валюты '{currency_code}'")
 
-        return exchange_rates[currency_code]
+        return entry[0]
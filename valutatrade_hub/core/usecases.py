@@ -1,54 +1,56 @@
 import hashlib
 import json
+import logging
 import os
 import secrets
-from datetime import datetime, timedelta
-from typing import Optional
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from valutatrade_hub.core.currencies import get_currency
 from valutatrade_hub.core.exceptions import (
     ApiRequestError,
     AuthRequiredError,
+    BatchRejectedError,
     InsufficientFundsError,
     InvalidPasswordError,
     UserAlreadyExistsError,
     UserNotFoundError,
     ValidationError,
+    ValutaTradeError,
 )
-from valutatrade_hub.core.models import Portfolio, User, Wallet
+from valutatrade_hub.core.models import Portfolio, User
+from valutatrade_hub.core.money import amount_to_minor, convert_minor, to_major
 from valutatrade_hub.core.utils import validate_amount, validate_currency_code
+from valutatrade_hub.core.valuation import get_valuation_cache
 from valutatrade_hub.decorators import log_action
+from valutatrade_hub.infra.database import DatabaseManager
 from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.parser_service.cross_rates import get_cross_rates
+from valutatrade_hub.parser_service.refresh import get_refresher
 
 settings = SettingsLoader()
+db = DatabaseManager()
 
 DATA_DIR = settings.get("DATA_DIR", "data")
-USERS_FILE = os.path.join(DATA_DIR, settings.get("USERS_FILE", "users.json"))
-PORTFOLIOS_FILE = os.path.join(
-    DATA_DIR, settings.get("PORTFOLIOS_FILE", "portfolios.json")
-)
 RATES_FILE = os.path.join(DATA_DIR, settings.get("RATES_FILE", "rates.json"))
 RATES_TTL = settings.get("RATES_TTL_SECONDS", 300)
+RATES_STALE_GRACE = settings.get("RATES_STALE_GRACE_SECONDS", 0)
 
-_current_user: Optional[User] = None
-
-
-def _load_json(path: str, default):
-    if not os.path.exists(path):
-        return default
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
+logger = logging.getLogger(__name__)
 
-def _save_json(path: str, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+_current_user: Optional[User] = None
 
 
 def _hash_password(password: str, salt: str) -> str:
     return hashlib.sha256((password + salt).encode()).hexdigest()
 
 
+def get_current_user() -> Optional[User]:
+    return _current_user
+
+
 def _require_login():
     if _current_user is None:
         raise AuthRequiredError("Сначала выполните login")
@@ -57,23 +59,38 @@ def _require_login():
 def _get_rate(from_code: str, to_code: str) -> dict:
     """
     Получение курса с учётом TTL.
+    Пары без прямой котировки выводятся через USD (CrossRateEngine).
+    Устаревший курс в пределах RATES_STALE_GRACE_SECONDS отдаётся сразу,
+    а в фоне запускается одно обновление курсов (stale-while-revalidate).
     Любая проблема → ApiRequestError (строго по ТЗ)
     """
     try:
-        rates = _load_json(RATES_FILE, {})
-        key = f"{from_code.upper()}_{to_code.upper()}"
+        entry = get_cross_rates(RATES_FILE).get(from_code, to_code)
+    except (OSError, ValueError, KeyError) as exc:
+        raise ApiRequestError(f"Ошибка при обращении к внешнему API: {exc}")
 
-        if key not in rates.get("pairs", {}):
-            raise ApiRequestError(f"Курс {from_code}->{to_code} недоступен")
+    return _checked_rate(from_code, to_code, entry)
 
-        updated_at = datetime.fromisoformat(rates["pairs"][key]["updated_at"])
-        if datetime.now() - updated_at > timedelta(seconds=RATES_TTL):
-            raise ApiRequestError(f"Курс {from_code}->{to_code} устарел")
 
-        return rates["pairs"][key]
+def _checked_rate(
+    from_code: str, to_code: str, entry: Optional[Tuple[float, float, str]]
+) -> dict:
+    """Проверка возраста котировки CrossRateEngine (TTL и окно устаревания)"""
+    if entry is None:
+        raise ApiRequestError(f"Курс {from_code}->{to_code} недоступен")
 
-    except (OSError, ValueError, KeyError) as exc:
-        raise ApiRequestError(f"Ошибка при обращении к внешнему API: {exc}")
+    rate, updated_ts, updated_at = entry
+    age = time.time() - updated_ts
+    if age <= RATES_TTL:
+        return {"rate": rate, "updated_at": updated_at, "stale": False}
+    if age > RATES_TTL + RATES_STALE_GRACE:
+        raise ApiRequestError(f"Курс {from_code}->{to_code} устарел")
+
+    if get_refresher().request():
+        logger.info(
+            f"Курс {from_code}->{to_code} устарел, запущено фоновое обновление"
+        )
+    return {"rate": rate, "updated_at": updated_at, "stale": True}
 
 
 @log_action("REGISTER")
@@ -83,26 +100,18 @@ def register_user(username: str, password: str) -> str:
     if len(password) < 4:
         raise ValidationError("Пароль должен быть не короче 4 символов")
 
-    users = _load_json(USERS_FILE, [])
-    if any(user["username"] == username for user in users):
+    if db.backend.get_user(username) is not None:
         raise UserAlreadyExistsError(f"Имя пользователя '{username}' уже занято")
 
-    user_id = max((user["user_id"] for user in users), default=0) + 1
     salt = secrets.token_hex(8)
     hashed = _hash_password(password, salt)
 
-    users.append({
-        "user_id": user_id,
-        "username": username,
-        "hashed_password": hashed,
-        "salt": salt,
-        "registration_date": datetime.now().isoformat(),
-    })
-    _save_json(USERS_FILE, users)
-
-    portfolios = _load_json(PORTFOLIOS_FILE, [])
-    portfolios.append({"user_id": user_id, "wallets": {}})
-    _save_json(PORTFOLIOS_FILE, portfolios)
+    user_id = db.backend.add_user(
+        username=username,
+        hashed_password=hashed,
+        salt=salt,
+        registration_date=datetime.now().isoformat(),
+    )
 
     return f"Пользователь '{username}' зарегистрирован (id={user_id})"
 
@@ -111,8 +120,7 @@ def register_user(username: str, password: str) -> str:
 def login_user(username: str, password: str) -> str:
     global _current_user
 
-    users = _load_json(USERS_FILE, [])
-    data = next((user for user in users if user["username"] == username), None)
+    data = db.backend.get_user(username)
     if not data:
         raise UserNotFoundError(f"Пользователь '{username}' не найден")
     if _hash_password(password, data["salt"]) != data["hashed_password"]:
@@ -125,33 +133,22 @@ def login_user(username: str, password: str) -> str:
         salt=data["salt"],
         registration_date=datetime.fromisoformat(data["registration_date"]),
     )
+    # портфель могли изменить другие процессы — перечитается при обращении
+    get_valuation_cache().forget(_current_user.user_id)
 
     return f"Вы вошли как '{username}'"
 
 
-def _load_portfolio() -> tuple[list, dict]:
-    portfolios = _load_json(PORTFOLIOS_FILE, [])
-    pdata = next(
-        portfolio 
-        for portfolio in portfolios if portfolio["user_id"] == _current_user.user_id
-    )
-    return portfolios, pdata
+def _load_portfolio() -> Portfolio:
+    return _build_portfolio(db.backend.get_wallets(_current_user.user_id))
 
 
-def _build_portfolio(pdata: dict) -> Portfolio:
-    wallets = {
-        code: Wallet(code, data["balance"])
-        for code, data in pdata["wallets"].items()
-    }
-    return Portfolio(_current_user.user_id, wallets)
+def _build_portfolio(balances: dict[str, float]) -> Portfolio:
+    return Portfolio.from_balances(_current_user.user_id, balances)
 
 
-def _save_portfolio(portfolios: list, pdata: dict, portfolio: Portfolio):
-    pdata["wallets"] = {
-        code: {"balance": wallet.balance}
-        for code, wallet in portfolio.wallets.items()
-    }
-    _save_json(PORTFOLIOS_FILE, portfolios)
+def _save_portfolio(portfolio: Portfolio):
+    get_valuation_cache().save_trade(portfolio.user, portfolio.balances())
 
 
 def show_portfolio(base_currency: str = "USD") -> str:
@@ -160,34 +157,75 @@ def show_portfolio(base_currency: str = "USD") -> str:
     base_currency = validate_currency_code(base_currency)
     get_currency(base_currency)
 
-    portfolios, pdata = _load_portfolio()
-    portfolio = _build_portfolio(pdata)
+    valuation = get_valuation_cache()
+    holdings = valuation.holdings(_current_user.user_id)
 
-    if not portfolio.wallets:
+    if not holdings:
         return "Портфель пуст"
 
-    total = 0.0
     lines = [
         f"Портфель пользователя '{_current_user.username}' (база: {base_currency}):"
     ]
 
-    for wallet in portfolio.wallets.values():
-        code = wallet.currency_code
+    # итог — сумма тех же строк: все слагаемые по проверенным курсам (_get_rate)
+    total = 0.0
+    for code, balance in holdings.items():
         get_currency(code)
 
         value = (
-            wallet.balance 
-            if code == base_currency 
-            else wallet.balance * _get_rate(code, base_currency)["rate"]
+            balance
+            if code == base_currency
+            else balance * _get_rate(code, base_currency)["rate"]
         )
         total += value
-        lines.append(f"- {code}: {wallet.balance:.4f} → {value:.2f} {base_currency}")
+        lines.append(f"- {code}: {balance:.4f} → {value:.2f} {base_currency}")
 
     lines.append("-" * 30)
     lines.append(f"ИТОГО: {total:,.2f} {base_currency}")
     return "\n".join(lines)
 
 
+def _buy(portfolio: Portfolio, currency_code: str, amount_minor: int, rate: float):
+    """Покупка за USD в целых минимальных единицах; возвращает стоимость"""
+    # курс применяется один раз, дальше только целочисленные операции
+    cost_minor = convert_minor(amount_minor, currency_code, rate, "USD")
+
+    portfolio.add_currency("USD")
+    usd_wallet = portfolio.get_wallet("USD")
+
+    if usd_wallet.balance_minor < cost_minor:
+        raise InsufficientFundsError(
+            f"Недостаточно средств: доступно {usd_wallet.balance:.2f} USD, "
+            f"требуется {to_major(cost_minor, 'USD'):.2f} USD"
+        )
+
+    usd_wallet.withdraw_minor(cost_minor)
+    portfolio.add_currency(currency_code)
+    portfolio.get_wallet(currency_code).deposit_minor(amount_minor)
+    return cost_minor
+
+
+def _check_sell(portfolio: Portfolio, currency_code: str, amount_minor: int):
+    wallet = portfolio.get_wallet(currency_code)
+
+    if amount_minor > wallet.balance_minor:
+        raise InsufficientFundsError(
+            f"Недостаточно средств: доступно {wallet.balance:.4f} {currency_code}, "
+            f"требуется {to_major(amount_minor, currency_code):.4f} {currency_code}"
+        )
+
+
+def _sell(portfolio: Portfolio, currency_code: str, amount_minor: int, rate: float):
+    """Продажа за USD в целых минимальных единицах; возвращает выручку"""
+    _check_sell(portfolio, currency_code, amount_minor)
+    revenue_minor = convert_minor(amount_minor, currency_code, rate, "USD")
+
+    portfolio.get_wallet(currency_code).withdraw_minor(amount_minor)
+    portfolio.add_currency("USD")
+    portfolio.get_wallet("USD").deposit_minor(revenue_minor)
+    return revenue_minor
+
+
 @log_action("BUY", verbose=True)
 def buy_currency(currency_code: str, amount: float) -> str:
     _require_login()
@@ -196,26 +234,13 @@ def buy_currency(currency_code: str, amount: float) -> str:
     validate_amount(amount)
     get_currency(currency_code)
 
-    portfolios, pdata = _load_portfolio()
-    portfolio = _build_portfolio(pdata)
+    amount_minor = amount_to_minor(amount, currency_code)
+    portfolio = _load_portfolio()
 
     rate = _get_rate(currency_code, "USD")["rate"]
-    cost_usd = amount * rate
+    cost_usd = to_major(_buy(portfolio, currency_code, amount_minor, rate), "USD")
 
-    portfolio.add_currency("USD")
-    usd_wallet = portfolio.get_wallet("USD")
-
-    if usd_wallet.balance < cost_usd:
-        raise InsufficientFundsError(
-            f"Недостаточно средств: доступно {usd_wallet.balance:.2f} USD, "
-            f"требуется {cost_usd:.2f} USD"
-        )
-
-    usd_wallet.withdraw(cost_usd)
-    portfolio.add_currency(currency_code)
-    portfolio.get_wallet(currency_code).deposit(amount)
-
-    _save_portfolio(portfolios, pdata, portfolio)
+    _save_portfolio(portfolio)
 
     return (
         f"Куплено {amount:.4f} {currency_code} "
@@ -232,25 +257,14 @@ def sell_currency(currency_code: str, amount: float) -> str:
     validate_amount(amount)
     get_currency(currency_code)
 
-    portfolios, pdata = _load_portfolio()
-    portfolio = _build_portfolio(pdata)
-
-    wallet = portfolio.get_wallet(currency_code)
-
-    if amount > wallet.balance:
-        raise InsufficientFundsError(
-            f"Недостаточно средств: доступно {wallet.balance:.4f} {currency_code}, "
-            f"требуется {amount:.4f} {currency_code}"
-        )
+    amount_minor = amount_to_minor(amount, currency_code)
+    portfolio = _load_portfolio()
 
+    _check_sell(portfolio, currency_code, amount_minor)
     rate = _get_rate(currency_code, "USD")["rate"]
-    revenue = amount * rate
-
-    wallet.withdraw(amount)
-    portfolio.add_currency("USD")
-    portfolio.get_wallet("USD").deposit(revenue)
+    revenue = to_major(_sell(portfolio, currency_code, amount_minor, rate), "USD")
 
-    _save_portfolio(portfolios, pdata, portfolio)
+    _save_portfolio(portfolio)
 
     return (
         f"Продано {amount:.4f} {currency_code} "
@@ -267,6 +281,181 @@ def get_rate(from_code: str, to_code: str) -> str:
     get_currency(to_code)
 
     rate = _get_rate(from_code, to_code)
+    stale = ", обновляется" if rate["stale"] else ""
     return (
-        f"Курс {from_code}→{to_code}: {rate['rate']} (обновлено: {rate['updated_at']})"
+        f"Курс {from_code}→{to_code}: {rate['rate']} "
+        f"(обновлено: {rate['updated_at']}{stale})"
     )
+
+
+ORDER_SIDES = ("buy", "sell")
+
+
+@dataclass
+class Order:
+    side: str
+    currency: str
+    amount: float
+
+
+@dataclass
+class OrderResult:
+    index: int
+    order: Order
+    ok: bool
+    rate: Optional[float] = None
+    value_usd: Optional[float] = None
+    error: Optional[str] = None
+
+
+def load_orders(path: str) -> List[Order]:
+    """
+    Заявки из файла: JSON-массив {"side", "currency", "amount"}
+    или текст по строке на заявку — "buy BTC 0.05" (# — комментарий).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    if path.endswith(".json"):
+        try:
+            raw = json.loads(text)
+            return [
+                Order(item["side"], item["currency"], item["amount"]) for item in raw
+            ]
+        except (json.JSONDecodeError, KeyError, TypeError) as exc:
+            raise ValidationError(f"Неверный формат файла заявок: {exc}")
+
+    orders = []
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        parts = line.split()
+        if len(parts) != 3:
+            raise ValidationError(
+                f"Строка {number}: ожидается '<buy|sell> <currency> <amount>'"
+            )
+        try:
+            amount = float(parts[2])
+        except ValueError:
+            raise ValidationError(f"Строка {number}: неверная сумма '{parts[2]}'")
+        orders.append(Order(parts[0], parts[1], amount))
+    return orders
+
+
+def _rate_snapshot(codes: Iterable[str]) -> Dict[str, object]:
+    """
+    Курсы к USD всех валют пакета по одному снимку CrossRateEngine:
+    code → курс или исключение (курс недоступен / устарел).
+    """
+    codes = list(codes)
+    try:
+        quotes = get_cross_rates(RATES_FILE).quotes(codes, "USD")
+    except (OSError, ValueError, KeyError) as exc:
+        error = ApiRequestError(f"Ошибка при обращении к внешнему API: {exc}")
+        return {code: error for code in codes}
+
+    rates: Dict[str, object] = {}
+    for code in codes:
+        try:
+            rates[code] = _checked_rate(code, "USD", quotes[code])["rate"]
+        except ApiRequestError as exc:
+            rates[code] = exc
+    return rates
+
+
+def _validate_order(order: Order) -> Tuple[str, str, int]:
+    side = str(order.side).lower()
+    if side not in ORDER_SIDES:
+        raise ValidationError(f"Неизвестный тип заявки '{order.side}'")
+    currency_code = validate_currency_code(order.currency)
+    validate_amount(order.amount)
+    get_currency(currency_code)
+    return side, currency_code, amount_to_minor(order.amount, currency_code)
+
+
+def apply_orders(
+    portfolio: Portfolio, orders: List[Order], atomic: bool = True
+) -> Tuple[Portfolio, List[OrderResult]]:
+    """
+    Исполняет заявки по порядку на копии портфеля; все оцениваются
+    по одному снимку курсов. Сначала проверяются все заявки, затем
+    применяются. atomic=True: любая ошибка — BatchRejectedError, портфель
+    не меняется; atomic=False: ошибочные заявки пропускаются.
+    Возвращает новый портфель (для одного сохранения) и результаты.
+    """
+    validated: List[Optional[Tuple[str, str, int]]] = []
+    results: List[OrderResult] = []
+    for index, order in enumerate(orders, 1):
+        try:
+            validated.append(_validate_order(order))
+        except ValutaTradeError as exc:
+            validated.append(None)
+            results.append(OrderResult(index, order, ok=False, error=str(exc)))
+            continue
+        results.append(OrderResult(index, order, ok=True))
+
+    rates = _rate_snapshot({item[1] for item in validated if item})
+    for result, item in zip(results, validated):
+        if item and isinstance(rates[item[1]], Exception):
+            result.ok, result.error = False, str(rates[item[1]])
+
+    if atomic and not all(result.ok for result in results):
+        raise BatchRejectedError("Пакет заявок отклонён: есть ошибки", results)
+
+    updated = Portfolio.from_balances(portfolio.user, portfolio.balances())
+    for result, item in zip(results, validated):
+        if not result.ok:
+            continue
+        side, currency_code, amount_minor = item
+        rate = rates[currency_code]
+        trade = _buy if side == "buy" else _sell
+        try:
+            value_minor = trade(updated, currency_code, amount_minor, rate)
+        except ValutaTradeError as exc:
+            result.ok, result.error = False, str(exc)
+            if atomic:
+                raise BatchRejectedError(
+                    f"Пакет заявок отклонён: заявка #{result.index}: {exc}", results
+                )
+            continue
+        result.rate = rate
+        result.value_usd = to_major(value_minor, "USD")
+
+    return updated, results
+
+
+@log_action("BATCH")
+def execute_orders(orders: List[Order], atomic: bool = True) -> List[OrderResult]:
+    """
+    Пакетное исполнение заявок: портфель читается один раз,
+    курсы берутся из одного снимка, результат сохраняется одной записью.
+    """
+    _require_login()
+
+    portfolio, results = apply_orders(_load_portfolio(), orders, atomic)
+    if any(result.ok for result in results):
+        _save_portfolio(portfolio)
+    return results
+
+
+def format_order_results(results: List[OrderResult], summary: bool = True) -> str:
+    lines = []
+    for result in results:
+        order = result.order
+        head = f"#{result.index} {order.side} {order.currency} {order.amount}"
+        if result.ok and result.value_usd is not None:
+            lines.append(
+                f"{head}: OK по курсу {result.rate:.2f} "
+                f"({result.value_usd:.2f} USD)"
+            )
+        elif result.ok:
+            lines.append(f"{head}: не исполнена")
+        else:
+            lines.append(f"{head}: ошибка — {result.error}")
+    if summary:
+        done = sum(
+            1 for result in results if result.ok and result.value_usd is not None
+        )
+        lines.append(f"Исполнено заявок: {done} из {len(results)}")
+    return "\n".join(lines)
@@ -0,0 +1,310 @@
+import threading
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from valutatrade_hub.core.exceptions import ValidationError
+from valutatrade_hub.core.money import scale, to_major
+from valutatrade_hub.core.utils import validate_currency_code
+from valutatrade_hub.infra.database import DatabaseManager, StorageBackend
+from valutatrade_hub.parser_service.cross_rates import (
+    BASE_CURRENCY,
+    get_cross_rates,
+)
+from valutatrade_hub.parser_service.updater import add_rates_listener
+
+
+@dataclass
+class BalanceMatrix:
+    """Балансы всех пользователей: balances[i, j] — user_ids[i] в codes[j]"""
+    user_ids: np.ndarray
+    codes: List[str]
+    balances: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, str, int]]) -> "BalanceMatrix":
+        """
+        Строит матрицу из потока (user_id, currency_code, balance_minor);
+        минимальные единицы переводятся в единицы валюты по столбцам
+        """
+        users, columns, values = array("q"), array("q"), array("d")
+        code_index: Dict[str, int] = {}
+        for user_id, code, balance in rows:
+            column = code_index.get(code)
+            if column is None:
+                column = code_index[code] = len(code_index)
+            users.append(user_id)
+            columns.append(column)
+            values.append(balance)
+
+        raw_users = np.frombuffer(users, dtype=np.int64)
+        user_ids, rows_index = np.unique(raw_users, return_inverse=True)
+        balances = np.zeros((user_ids.size, len(code_index)), dtype=np.float64)
+        # np.add.at: повторы одной пары (user, code) складываются
+        np.add.at(
+            balances,
+            (rows_index, np.frombuffer(columns, dtype=np.int64)),
+            np.frombuffer(values, dtype=np.float64),
+        )
+        codes = list(code_index)
+        balances /= np.array([scale(code) for code in codes], dtype=np.float64)
+        return cls(user_ids, codes, balances)
+
+    @classmethod
+    def load(cls, backend: Optional[StorageBackend] = None) -> "BalanceMatrix":
+        backend = backend or DatabaseManager().backend
+        return cls.from_rows(backend.iter_wallet_rows())
+
+
+@dataclass
+class AumReport:
+    """Итоги оценки всех портфелей в базовой валюте"""
+    base: str
+    users: int
+    total: float
+    user_totals: np.ndarray
+    user_ids: np.ndarray
+    top_holders: List[Tuple[int, float]]
+    # code → (сумма балансов, стоимость в base, доля в total)
+    exposure: Dict[str, Tuple[float, float, float]]
+    unpriced: List[str]
+
+
+def value_matrix(
+    matrix: BalanceMatrix, base: str = "USD"
+) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    Стоимость каждого баланса в base одной операцией:
+    balances (пользователи × валюты) умножается на вектор курсов.
+    Валюты без курса оцениваются в 0 и возвращаются списком unpriced.
+    """
+    try:
+        rate_codes, rate_values = get_cross_rates().vector(base)
+    except KeyError:
+        raise ValidationError(f"Нет доступного курса для базовой валюты '{base}'")
+
+    index = {code: i for i, code in enumerate(rate_codes)}
+    positions = np.array([index.get(code, -1) for code in matrix.codes], dtype=np.intp)
+    priced = positions >= 0
+    rates = np.zeros(len(matrix.codes), dtype=np.float64)
+    rates[priced] = rate_values[positions[priced]]
+    unpriced = [code for code, ok in zip(matrix.codes, priced) if not ok]
+    return matrix.balances @ rates, rates, unpriced
+
+
+def aum_report(
+    base: str = "USD",
+    top: int = 10,
+    matrix: Optional[BalanceMatrix] = None,
+) -> AumReport:
+    """Суммарные активы, крупнейшие держатели и экспозиция по валютам"""
+    base = validate_currency_code(base)
+    matrix = matrix or BalanceMatrix.load()
+
+    user_totals, rates, unpriced = value_matrix(matrix, base)
+    total = float(user_totals.sum())
+
+    count = min(top, user_totals.size)
+    if count:
+        # argpartition — O(n) выбор top-N без полной сортировки
+        head = np.argpartition(user_totals, -count)[-count:]
+        head = head[np.argsort(user_totals[head])[::-1]]
+        top_holders = [
+            (int(matrix.user_ids[i]), float(user_totals[i])) for i in head
+        ]
+    else:
+        top_holders = []
+
+    sums = matrix.balances.sum(axis=0)
+    values = sums * rates
+    exposure = {
+        code: (float(amount), float(value), float(value / total) if total else 0.0)
+        for code, amount, value in zip(matrix.codes, sums, values)
+    }
+
+    return AumReport(
+        base=base,
+        users=int(matrix.user_ids.size),
+        total=total,
+        user_totals=user_totals,
+        user_ids=matrix.user_ids,
+        top_holders=top_holders,
+        exposure=exposure,
+        unpriced=unpriced,
+    )
+
+
+class ValuationCache:
+    """
+    Стоимость портфелей в USD, поддерживаемая приращениями.
+
+    Для загруженного пользователя хранятся балансы и текущая сумма в USD,
+    а обратный индекс code → holders связывает валюту с её держателями.
+    Сделка меняет сумму на Δbalance · price, изменение курса валюты —
+    на balance · Δprice только у держателей этой валюты. Чтение суммы — O(1).
+
+    Курсы приходят от RatesUpdater этого процесса (add_rates_listener),
+    а снимки, записанные другими процессами, подхватываются при чтении
+    по смене поколения CrossRateEngine. Балансы перечитываются, когда
+    меняется StorageBackend.data_version (сделки другого процесса);
+    собственные записи идут через save_trade и кеш не сбрасывают.
+    Валюты без курса оцениваются в 0.
+    """
+
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self._backend = backend
+        self._lock = threading.RLock()
+        self._holdings: Dict[int, Dict[str, float]] = {}
+        self._totals: Dict[int, float] = {}
+        self._holders: Dict[str, Set[int]] = {}
+        self._prices: Dict[str, float] = {BASE_CURRENCY: 1.0}
+        self._generation = -1
+        self._storage_version: Optional[object] = None
+
+    @property
+    def backend(self) -> StorageBackend:
+        return self._backend or DatabaseManager().backend
+
+    def _set_price(self, code: str, price: float):
+        delta = price - self._prices.get(code, 0.0)
+        if not delta:
+            return
+        self._prices[code] = price
+        for user_id in self._holders.get(code, ()):
+            self._totals[user_id] += self._holdings[user_id][code] * delta
+
+    def _sync(self):
+        """Сверка с текущим снимком курсов, если сменилось его поколение"""
+        generation, prices = get_cross_rates().prices()
+        if generation == self._generation:
+            return
+        for code in [code for code in self._prices if code not in prices]:
+            self._set_price(code, 0.0)
+        for code, price in prices.items():
+            self._set_price(code, price)
+        self._generation = generation
+
+    def on_rates(self, changed: Dict[str, dict]):
+        """Обработчик RatesUpdater: пересчёт держателей изменившихся валют"""
+        prices: Dict[str, float] = {}
+        inverse: Dict[str, float] = {}
+        for key, info in changed.items():
+            from_code, _, to_code = key.partition("_")
+            rate = info.get("rate") or 0.0
+            if rate <= 0:
+                continue
+            if to_code == BASE_CURRENCY and from_code != BASE_CURRENCY:
+                prices[from_code] = rate
+            elif from_code == BASE_CURRENCY and to_code:
+                inverse[to_code] = 1.0 / rate
+        for code, price in inverse.items():
+            prices.setdefault(code, price)
+
+        with self._lock:
+            for code, price in prices.items():
+                self._set_price(code, price)
+
+    def _check_storage(self):
+        """Хранилище изменилось вне кеша — загруженные балансы сбрасываются"""
+        version = self.backend.data_version()
+        if version == self._storage_version:
+            return
+        self._storage_version = version
+        self._holdings.clear()
+        self._totals.clear()
+        self._holders.clear()
+
+    def _ensure_loaded(self, user_id: int):
+        self._check_storage()
+        if user_id in self._holdings:
+            return
+        balances = {
+            code: to_major(minor, code)
+            for code, minor in self.backend.get_wallets(user_id).items()
+        }
+        self._holdings[user_id] = balances
+        self._totals[user_id] = sum(
+            balance * self._prices.get(code, 0.0)
+            for code, balance in balances.items()
+        )
+        for code in balances:
+            self._holders.setdefault(code, set()).add(user_id)
+
+    def save_trade(self, user_id: int, minor_balances: Dict[str, int]):
+        """
+        Сохраняет балансы пользователя в хранилище и учитывает их в кеше.
+        Метка хранилища запоминается сразу после записи, поэтому своя
+        запись не выглядит изменением извне; чужие изменения до неё
+        по-прежнему сбрасывают кеш.
+        """
+        with self._lock:
+            self._check_storage()
+            self.backend.save_wallets(user_id, minor_balances)
+            self._storage_version = self.backend.data_version()
+            self.apply_trade(user_id, minor_balances)
+
+    def apply_trade(self, user_id: int, minor_balances: Dict[str, int]):
+        """
+        Новые балансы пользователя после сделки (полный набор кошельков
+        в минимальных единицах). Если пользователь ещё не загружен, он
+        прочитается из хранилища при первом обращении.
+        """
+        with self._lock:
+            holdings = self._holdings.get(user_id)
+            if holdings is None:
+                return
+            balances = {
+                code: to_major(minor, code) for code, minor in minor_balances.items()
+            }
+            total = self._totals[user_id]
+            for code in set(holdings) | set(balances):
+                old = holdings.get(code, 0.0)
+                new = balances.get(code, 0.0)
+                if new == old:
+                    continue
+                total += (new - old) * self._prices.get(code, 0.0)
+                if code in balances:
+                    holdings[code] = new
+                    self._holders.setdefault(code, set()).add(user_id)
+                else:
+                    del holdings[code]
+                    self._holders[code].discard(user_id)
+            self._totals[user_id] = total
+
+    def forget(self, user_id: int):
+        with self._lock:
+            for code in self._holdings.pop(user_id, {}):
+                self._holders[code].discard(user_id)
+            self._totals.pop(user_id, None)
+
+    def holdings(self, user_id: int) -> Dict[str, float]:
+        with self._lock:
+            self._ensure_loaded(user_id)
+            return dict(self._holdings[user_id])
+
+    def total(self, user_id: int, base: str = BASE_CURRENCY) -> float:
+        """Стоимость портфеля в base: сумма в USD делится на цену base"""
+        with self._lock:
+            self._sync()
+            self._ensure_loaded(user_id)
+            price = self._prices.get(base.upper())
+            if not price:
+                raise ValidationError(
+                    f"Нет доступного курса для базовой валюты '{base}'"
+                )
+            return self._totals[user_id] / price
+
+
+_valuation: Optional[ValuationCache] = None
+_valuation_lock = threading.Lock()
+
+
+def get_valuation_cache() -> ValuationCache:
+    global _valuation
+    with _valuation_lock:
+        if _valuation is None:
+            _valuation = ValuationCache()
+            add_rates_listener(_valuation.on_rates)
+        return _valuation
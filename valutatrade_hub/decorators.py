@@ -3,8 +3,6 @@ from datetime import datetime
 from functools import wraps
 from typing import Callable
 
-from valutatrade_hub.core.usecases import _current_user
-
 logger = logging.getLogger(__name__)
 
 
@@ -23,8 +21,11 @@ def log_action(
     def decorator(func: Callable):
         @wraps(func)
         def wrapper(*args, **kwargs):
+            # usecases импортирует этот модуль, поэтому импорт — в момент вызова
+            from valutatrade_hub.core import usecases
+
             timestamp = datetime.now().isoformat()
-            user = getattr(_current_user, "username", None)
+            user = getattr(usecases._current_user, "username", None)
 
             log_data = {
                 "action": action,
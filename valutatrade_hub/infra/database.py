@@ -1,24 +1,563 @@
 import json
 import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, Optional, Tuple
+
+from valutatrade_hub.core.exceptions import UserAlreadyExistsError
+from valutatrade_hub.core.money import to_minor
+from valutatrade_hub.infra.journal import PortfolioJournal, save_json_atomic
+from valutatrade_hub.infra.settings import SettingsLoader
+
+settings = SettingsLoader()
+
+_USER_COLUMNS = (
+    "user_id", "username", "hashed_password", "salt", "registration_date"
+)
+
+
+def _wallets_from_json(raw: dict) -> Dict[str, int]:
+    """
+    Приводит кошельки из portfolios.json к виду {code: минимальные единицы}.
+    Текущий формат — {"USD": {"minor": 150}}; прежние {"USD": 1.5} и
+    {"USD": {"balance": 1.5}} (float в единицах валюты) переводятся при чтении.
+    """
+    wallets: Dict[str, int] = {}
+    for code, value in (raw or {}).items():
+        code = code.upper()
+        if isinstance(value, dict):
+            if "minor" in value:
+                wallets[code] = int(value["minor"])
+                continue
+            value = value.get("balance", 0.0)
+        wallets[code] = to_minor(float(value), code)
+    return wallets
+
+
+def _wallets_to_json(wallets: Dict[str, int]) -> dict:
+    return {code: {"minor": minor} for code, minor in wallets.items()}
+
+
+def _user_from_json(raw: dict) -> dict:
+    """Нормализует запись пользователя из users.json"""
+    return {
+        "user_id": int(raw["user_id"]),
+        "username": raw["username"],
+        "hashed_password": raw.get("hashed_password") or raw.get("password", ""),
+        "salt": raw.get("salt", ""),
+        "registration_date": (
+            raw.get("registration_date") or raw.get("created_at", "")
+        ),
+    }
+
+
+class StorageBackend(ABC):
+    """
+    Абстрактное хранилище пользователей и портфелей.
+    Портфель представлен словарём {currency_code: balance}, где balance —
+    целое число минимальных единиц валюты (центы, сатоши).
+    """
+
+    @abstractmethod
+    def get_user(self, username: str) -> Optional[dict]:
+        """Возвращает пользователя по имени или None"""
+        pass
+
+    @abstractmethod
+    def add_user(
+        self,
+        username: str,
+        hashed_password: str,
+        salt: str,
+        registration_date: str,
+    ) -> int:
+        """Создаёт пользователя с пустым портфелем и возвращает его user_id"""
+        pass
+
+    @abstractmethod
+    def get_wallets(self, user_id: int) -> Dict[str, int]:
+        """Возвращает кошельки пользователя"""
+        pass
+
+    @abstractmethod
+    def save_wallets(self, user_id: int, wallets: Dict[str, int]):
+        """Полностью заменяет кошельки пользователя"""
+        pass
+
+    @abstractmethod
+    def iter_users(self) -> Iterator[dict]:
+        pass
+
+    @abstractmethod
+    def iter_portfolios(self) -> Iterator[Tuple[int, Dict[str, int]]]:
+        pass
+
+    def data_version(self) -> Optional[object]:
+        """
+        Метка состояния портфелей: меняется, когда кошельки изменены
+        (в том числе другим процессом). None — отслеживание не поддерживается.
+        """
+        return None
+
+    def iter_wallet_rows(self) -> Iterator[Tuple[int, str, int]]:
+        """Все кошельки плоским потоком (user_id, currency_code, balance)"""
+        for user_id, wallets in self.iter_portfolios():
+            for code, balance in wallets.items():
+                yield user_id, code, balance
+
+    def close(self):
+        pass
+
+
+class JsonStorageBackend(StorageBackend):
+    """
+    Хранилище поверх users.json / portfolios.json.
+    Любая запись перезаписывает файл целиком — O(кол-во пользователей).
+    """
+
+    def __init__(self, data_dir: str):
+        self.users_path = os.path.join(
+            data_dir, settings.get("USERS_FILE", "users.json")
+        )
+        self.portfolios_path = os.path.join(
+            data_dir, settings.get("PORTFOLIOS_FILE", "portfolios.json")
+        )
+
+    @staticmethod
+    def _load(path: str) -> list:
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _save(path: str, data: list):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    def get_user(self, username: str) -> Optional[dict]:
+        for user in self._load(self.users_path):
+            if user["username"] == username:
+                return _user_from_json(user)
+        return None
+
+    def _append_user(
+        self,
+        username: str,
+        hashed_password: str,
+        salt: str,
+        registration_date: str,
+    ) -> int:
+        users = self._load(self.users_path)
+        user_id = max((user["user_id"] for user in users), default=0) + 1
+        users.append({
+            "user_id": user_id,
+            "username": username,
+            "hashed_password": hashed_password,
+            "salt": salt,
+            "registration_date": registration_date,
+        })
+        self._save(self.users_path, users)
+        return user_id
+
+    def add_user(
+        self,
+        username: str,
+        hashed_password: str,
+        salt: str,
+        registration_date: str,
+    ) -> int:
+        user_id = self._append_user(
+            username, hashed_password, salt, registration_date
+        )
+
+        portfolios = self._load(self.portfolios_path)
+        portfolios.append({"user_id": user_id, "wallets": {}})
+        self._save(self.portfolios_path, portfolios)
+        return user_id
+
+    def get_wallets(self, user_id: int) -> Dict[str, int]:
+        for portfolio in self._load(self.portfolios_path):
+            if portfolio["user_id"] == user_id:
+                return _wallets_from_json(portfolio.get("wallets", {}))
+        return {}
+
+    def save_wallets(self, user_id: int, wallets: Dict[str, int]):
+        portfolios = self._load(self.portfolios_path)
+        pdata = next(
+            (p for p in portfolios if p["user_id"] == user_id), None
+        )
+        if pdata is None:
+            pdata = {"user_id": user_id}
+            portfolios.append(pdata)
+        pdata["wallets"] = _wallets_to_json(wallets)
+        self._save(self.portfolios_path, portfolios)
+
+    def iter_users(self) -> Iterator[dict]:
+        for user in self._load(self.users_path):
+            yield _user_from_json(user)
+
+    def data_version(self) -> Optional[object]:
+        try:
+            st = os.stat(self.portfolios_path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def iter_portfolios(self) -> Iterator[Tuple[int, Dict[str, int]]]:
+        for portfolio in self._load(self.portfolios_path):
+            yield (
+                int(portfolio["user_id"]),
+                _wallets_from_json(portfolio.get("wallets", {})),
+            )
+
+
+class JournalStorageBackend(JsonStorageBackend):
+    """
+    Пользователи — в users.json, портфели — в памяти с журналом
+    изменений (PortfolioJournal). portfolios.json служит снимком,
+    который фоновый поток периодически пересобирает из журнала.
+    """
+
+    def __init__(self, data_dir: str):
+        super().__init__(data_dir)
+        self.journal = PortfolioJournal(
+            journal_path=os.path.join(
+                data_dir, settings.get("JOURNAL_FILE", "portfolios.journal")
+            ),
+            load_snapshot=self._load_snapshot,
+            save_snapshot=self._save_snapshot,
+            compact_threshold=settings.get("JOURNAL_COMPACT_BYTES", 1024 * 1024),
+            fsync=settings.get("JOURNAL_FSYNC", False),
+            legacy_balance=lambda code, balance: to_minor(balance, code),
+            snapshot_path=self.portfolios_path,
+        )
+
+    def _load_snapshot(self) -> Dict[int, Dict[str, int]]:
+        return dict(JsonStorageBackend.iter_portfolios(self))
+
+    def _save_snapshot(self, state: Dict[int, Dict[str, int]]):
+        save_json_atomic(
+            [
+                {"user_id": user_id, "wallets": _wallets_to_json(wallets)}
+                for user_id, wallets in state.items()
+            ],
+            self.portfolios_path,
+        )
+
+    def add_user(
+        self,
+        username: str,
+        hashed_password: str,
+        salt: str,
+        registration_date: str,
+    ) -> int:
+        user_id = self._append_user(
+            username, hashed_password, salt, registration_date
+        )
+        self.journal.create(user_id)
+        return user_id
+
+    def get_wallets(self, user_id: int) -> Dict[str, int]:
+        return self.journal.get_wallets(user_id)
+
+    def save_wallets(self, user_id: int, wallets: Dict[str, int]):
+        self.journal.record(user_id, wallets)
+
+    def iter_portfolios(self) -> Iterator[Tuple[int, Dict[str, int]]]:
+        yield from self.journal.snapshot().items()
+
+    def data_version(self) -> Optional[object]:
+        # журнал дописывают и сворачивают и другие процессы
+        return self.journal.version()
+
+    def close(self):
+        self.journal.close()
+
+
+class SqliteStorageBackend(StorageBackend):
+    """
+    Встроенная SQLite-база (WAL) с индексами по user_id и username.
+    Чтение и запись одного портфеля — O(log n) независимо от числа пользователей.
+    """
+
+    _WALLETS_TABLE = """
+        CREATE TABLE IF NOT EXISTS wallets (
+            user_id INTEGER NOT NULL,
+            currency_code TEXT NOT NULL,
+            balance_minor INTEGER NOT NULL,
+            PRIMARY KEY (user_id, currency_code)
+        ) WITHOUT ROWID
+    """
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL UNIQUE,
+            hashed_password TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            registration_date TEXT NOT NULL
+        );
+    """ + _WALLETS_TABLE + ";"
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self._SCHEMA)
+        self._migrate_minor_units()
+
+    def _migrate_minor_units(self):
+        """
+        Прежняя схема хранила wallets.balance REAL в единицах валюты:
+        таблица пересоздаётся с balance_minor INTEGER одной транзакцией.
+        """
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(wallets)")}
+        if "balance" not in columns:
+            return
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._conn.execute(
+                "SELECT user_id, currency_code, balance FROM wallets"
+            ).fetchall()
+            self._conn.execute("DROP TABLE wallets")
+            self._conn.execute(self._WALLETS_TABLE)
+            self._conn.executemany(
+                "INSERT INTO wallets (user_id, currency_code, balance_minor) "
+                "VALUES (?, ?, ?)",
+                [
+                    (user_id, code, to_minor(balance, code))
+                    for user_id, code, balance in rows
+                ],
+            )
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def get_user(self, username: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT user_id, username, hashed_password, salt, registration_date "
+                "FROM users WHERE username = ?",
+                (username,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(_USER_COLUMNS, row))
+
+    def add_user(
+        self,
+        username: str,
+        hashed_password: str,
+        salt: str,
+        registration_date: str,
+    ) -> int:
+        with self._lock:
+            try:
+                cursor = self._conn.execute(
+                    "INSERT INTO users "
+                    "(username, hashed_password, salt, registration_date) "
+                    "VALUES (?, ?, ?, ?)",
+                    (username, hashed_password, salt, registration_date),
+                )
+            except sqlite3.IntegrityError:
+                # имя заняли между проверкой get_user и вставкой (другой процесс)
+                raise UserAlreadyExistsError(
+                    f"Имя пользователя '{username}' уже занято"
+                )
+            return cursor.lastrowid
+
+    def get_wallets(self, user_id: int) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT currency_code, balance_minor FROM wallets WHERE user_id = ?",
+                (user_id,),
+            ).fetchall()
+        return {code: balance for code, balance in rows}
+
+    def save_wallets(self, user_id: int, wallets: Dict[str, int]):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM wallets WHERE user_id = ?", (user_id,)
+                )
+                self._conn.executemany(
+                    "INSERT INTO wallets (user_id, currency_code, balance_minor) "
+                    "VALUES (?, ?, ?)",
+                    [(user_id, code, balance) for code, balance in wallets.items()],
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def data_version(self) -> Optional[object]:
+        # меняется только после коммитов других соединений
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def iter_users(self) -> Iterator[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, username, hashed_password, salt, registration_date "
+                "FROM users ORDER BY user_id"
+            ).fetchall()
+        for row in rows:
+            yield dict(zip(_USER_COLUMNS, row))
+
+    def iter_portfolios(self) -> Iterator[Tuple[int, Dict[str, int]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, currency_code, balance_minor FROM wallets "
+                "ORDER BY user_id"
+            ).fetchall()
+        current_id, wallets = None, {}
+        for user_id, code, balance in rows:
+            if user_id != current_id:
+                if current_id is not None:
+                    yield current_id, wallets
+                current_id, wallets = user_id, {}
+            wallets[code] = balance
+        if current_id is not None:
+            yield current_id, wallets
+
+    def iter_wallet_rows(self) -> Iterator[Tuple[int, str, int]]:
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT user_id, currency_code, balance_minor FROM wallets"
+            )
+            rows = cursor.fetchall()
+        return iter(rows)
+
+    def import_data(self, users: list, portfolios: list) -> Tuple[int, int]:
+        """Массовая загрузка нормализованных данных одной транзакцией"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO users "
+                    "(user_id, username, hashed_password, salt, registration_date) "
+                    "VALUES (:user_id, :username, :hashed_password, :salt, "
+                    ":registration_date)",
+                    users,
+                )
+                for user_id, wallets in portfolios:
+                    self._conn.execute(
+                        "DELETE FROM wallets WHERE user_id = ?", (user_id,)
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO wallets (user_id, currency_code, balance_minor) "
+                        "VALUES (?, ?, ?)",
+                        [(user_id, code, bal) for code, bal in wallets.items()],
+                    )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return len(users), len(portfolios)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def migrate_json_to_sqlite(data_dir: str, db_path: str) -> Tuple[int, int]:
+    """
+    Одноразовый перенос users.json / portfolios.json в SQLite.
+    Повторный запуск безопасен: записи перезаписываются по user_id.
+    """
+    source = JsonStorageBackend(data_dir)
+    target = SqliteStorageBackend(db_path)
+    try:
+        return target.import_data(
+            list(source.iter_users()), list(source.iter_portfolios())
+        )
+    finally:
+        target.close()
+
+
+def migrate_to_minor_units(data_dir: str) -> int:
+    """
+    Переписывает portfolios.json в формате минимальных единиц
+    ({"USD": {"minor": 150}}). Прежний формат читается и без миграции,
+    SQLite переводится автоматически при открытии базы.
+    """
+    backend = JsonStorageBackend(data_dir)
+    portfolios = [
+        {"user_id": user_id, "wallets": _wallets_to_json(wallets)}
+        for user_id, wallets in backend.iter_portfolios()
+    ]
+    save_json_atomic(portfolios, backend.portfolios_path)
+    return len(portfolios)
 
 
 class DatabaseManager:
     _instance = None
 
-    def __new__(cls, base_dir: str):
+    def __new__(cls, base_dir: str = "."):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance.base_dir = base_dir
+            cls._instance._backend = None
         return cls._instance
-    
+
+    @property
+    def data_dir(self) -> str:
+        return os.path.join(self.base_dir, settings.get("DATA_DIR", "data"))
+
+    @property
+    def backend(self) -> StorageBackend:
+        """Хранилище, выбранное параметром STORAGE_BACKEND (json | journal | sqlite)"""
+        if self._backend is None:
+            name = settings.get("STORAGE_BACKEND", "json").lower()
+            if name == "json":
+                self._backend = JsonStorageBackend(self.data_dir)
+            elif name == "journal":
+                self._backend = JournalStorageBackend(self.data_dir)
+            elif name == "sqlite":
+                self._backend = SqliteStorageBackend(self.database_path)
+            else:
+                raise ValueError(f"Неизвестное хранилище '{name}'")
+        return self._backend
+
+    @property
+    def database_path(self) -> str:
+        return os.path.join(
+            self.data_dir, settings.get("DATABASE_FILE", "valutatrade.db")
+        )
+
     def load(self, filename: str, default):
-        path = os.path.join(self.base_dir, "data", filename)
+        path = os.path.join(self.data_dir, filename)
         if not os.path.exists(path):
             return default
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
-        
+
     def save(self, filename: str, data):
-        path = os.path.join(self.base_dir, "data", filename)
+        path = os.path.join(self.data_dir, filename)
         with open(path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    import sys
+
+    db = DatabaseManager()
+    if "--minor-units" in sys.argv[1:]:
+        portfolios_count = migrate_to_minor_units(db.data_dir)
+        print(f"portfolios.json в минимальных единицах: портфелей {portfolios_count}")
+    else:
+        users_count, portfolios_count = migrate_json_to_sqlite(
+            db.data_dir, db.database_path
+        )
+        print(
+            f"Перенесено в {db.database_path}: "
+            f"пользователей {users_count}, портфелей {portfolios_count}"
+        )
@@ -0,0 +1,333 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: журнал согласован только внутри процесса
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioJournal:
+    """
+    Журнал изменений кошельков в режиме append-only.
+
+    Каждая сделка дописывает в журнал по одной короткой строке NDJSON на
+    изменённый кошелёк — стоимость записи не зависит от числа пользователей.
+    Запись хранит итоговый баланс в минимальных единицах ("minor"), поэтому
+    повторное применение безопасно. Строки прежнего формата с float-балансом
+    ("balance") переводятся функцией legacy_balance(code, balance).
+    Новый пользователь получает запись create — пустой портфель.
+
+    С журналом может работать несколько процессов. Перед чтением (под общей
+    flock) и записью (под исключительной) процесс дочитывает строки,
+    дописанные другими, с того места, где остановился. Блокировка берётся на
+    соседнем файле *.lock, который компактизация не переименовывает. Если
+    журнал был свёрнут другим процессом (сменился inode журнала или снимок),
+    состояние перечитывается целиком.
+
+    Когда журнал превышает compact_threshold байт, фоновый поток:
+    1. под исключительной блокировкой переименовывает журнал в *.compacting
+       и копирует состояние;
+    2. вне её сохраняет снимок (snapshot) атомарно;
+    3. снова под исключительной блокировкой удаляет *.compacting.
+    Компактизацию одновременно ведёт только один процесс (*.compact.lock).
+
+    При старте состояние = снимок + *.compacting (если остался) + журнал.
+    """
+
+    def __init__(
+        self,
+        journal_path: str,
+        load_snapshot: Callable[[], Dict[int, Dict[str, int]]],
+        save_snapshot: Callable[[Dict[int, Dict[str, int]]], None],
+        compact_threshold: int = 1024 * 1024,
+        fsync: bool = False,
+        legacy_balance: Optional[Callable[[str, float], int]] = None,
+        snapshot_path: Optional[str] = None,
+    ):
+        self.journal_path = journal_path
+        self.compacting_path = journal_path + ".compacting"
+        self.snapshot_path = snapshot_path
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self._load_snapshot = load_snapshot
+        self._save_snapshot = save_snapshot
+        self._legacy_balance = legacy_balance or (lambda code, balance: int(balance))
+
+        self._lock = threading.Lock()
+        self._compact_event = threading.Event()
+        self._compact_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+        self._lock_fd = os.open(journal_path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        self._compact_fd = os.open(
+            journal_path + ".compact.lock", os.O_RDWR | os.O_CREAT, 0o644
+        )
+
+        self._state: Dict[int, Dict[str, int]] = {}
+        self._offset = 0
+        self._stamp: Optional[tuple] = None
+        with self._locked(exclusive=True):
+            self._truncate_torn_tail(self.journal_path)
+            open(self.journal_path, "ab").close()
+            self._reload()
+
+        if os.path.exists(self.compacting_path):
+            self._compact_event.set()
+        self._start_compactor()
+
+    @contextmanager
+    def _locked(self, exclusive: bool = False):
+        """Блокировка потоков процесса и flock журнала между процессами"""
+        with self._lock:
+            if fcntl:
+                fcntl.flock(
+                    self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                )
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _file_stamp(path: Optional[str]) -> Optional[tuple]:
+        if not path:
+            return None
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _current_stamp(self) -> tuple:
+        """
+        inode журнала и метка снимка: inode меняется при компактизации,
+        а снимок — после неё (на случай повторного использования inode)
+        """
+        journal = self._file_stamp(self.journal_path)
+        return journal[0] if journal else None, self._file_stamp(self.snapshot_path)
+
+    def _reload(self):
+        """Состояние заново: снимок + *.compacting (если остался) + журнал"""
+        while True:
+            stamp = self._current_stamp()
+            self._state = self._load_snapshot()
+            self._replay(self.compacting_path)
+            self._offset = self._replay(self.journal_path)
+            # снимок сохранён посреди чтения — *.compacting мог уже исчезнуть
+            if self._current_stamp() == stamp:
+                self._stamp = stamp
+                return
+
+    def _catch_up(self):
+        """Дочитывает строки, дописанные в журнал другими процессами"""
+        if self._current_stamp() != self._stamp:
+            self._reload()
+            return
+        if os.path.getsize(self.journal_path) > self._offset:
+            self._offset = self._replay(self.journal_path, self._offset)
+
+    @staticmethod
+    def _truncate_torn_tail(path: str):
+        """
+        Обрезает недописанную последнюю строку после аварийного завершения:
+        иначе следующая запись дописалась бы к обрывку и потерялась при replay.
+        """
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                chunk = f.read(step)
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    pos = pos - step + newline + 1
+                    break
+                pos -= step
+            if pos < end:
+                logger.warning(
+                    f"Обрезана недописанная запись в {path} ({end - pos} байт)"
+                )
+                f.truncate(pos)
+
+    def _replay(self, path: str, offset: int = 0) -> int:
+        """
+        Применяет записи журнала начиная с offset к состоянию в памяти;
+        возвращает смещение после последней полной строки
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # строку ещё дописывает другой процесс
+                    break
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Пропущена повреждённая запись в {path}")
+                    continue
+                self._apply(record)
+        return offset
+
+    def _apply(self, record: dict):
+        wallets = self._state.setdefault(int(record["user_id"]), {})
+        if record["op"] == "create":
+            return
+        code = record["currency"]
+        if record["op"] == "remove":
+            wallets.pop(code, None)
+        elif "minor" in record:
+            wallets[code] = int(record["minor"])
+        else:
+            wallets[code] = self._legacy_balance(code, float(record["balance"]))
+
+    def get_wallets(self, user_id: int) -> Dict[str, int]:
+        with self._locked():
+            self._catch_up()
+            return dict(self._state.get(user_id, {}))
+
+    def snapshot(self) -> Dict[int, Dict[str, int]]:
+        with self._locked():
+            self._catch_up()
+            return {uid: dict(w) for uid, w in self._state.items()}
+
+    def version(self) -> Optional[tuple]:
+        """(inode, размер) журнала: меняется при каждой записи и компактизации"""
+        stamp = self._file_stamp(self.journal_path)
+        return (stamp[0], stamp[2]) if stamp else None
+
+    def record(self, user_id: int, wallets: Dict[str, int]):
+        """
+        Сравнивает новые кошельки с текущими и дописывает в журнал
+        deposit / withdraw / remove только для изменившихся валют.
+        """
+        with self._locked(exclusive=True):
+            self._catch_up()
+            current = self._state.get(user_id, {})
+            lines = []
+            for code, balance in wallets.items():
+                old = current.get(code)
+                if old == balance:
+                    continue
+                delta = balance - (old or 0)
+                lines.append({
+                    "user_id": user_id,
+                    "op": "deposit" if delta >= 0 else "withdraw",
+                    "currency": code,
+                    "amount": abs(delta),
+                    "minor": balance,
+                })
+            for code in current.keys() - wallets.keys():
+                lines.append({"user_id": user_id, "op": "remove", "currency": code})
+
+            if lines:
+                self._append(lines)
+            else:
+                self._state.setdefault(user_id, {})
+
+    def create(self, user_id: int):
+        """
+        Пустой портфель нового пользователя: запись create, иначе портфель
+        попал бы в журнал (и в снимок) только с первой сделкой.
+        """
+        with self._locked(exclusive=True):
+            self._catch_up()
+            if user_id not in self._state:
+                self._append([{"user_id": user_id, "op": "create"}])
+
+    def _append(self, lines: list):
+        """Дописывает записи в журнал и применяет их (под исключительной flock)"""
+        payload = "".join(
+            json.dumps(line, ensure_ascii=False) + "\n" for line in lines
+        ).encode("utf-8")
+        with open(self.journal_path, "ab") as f:
+            f.write(payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._offset += len(payload)
+
+        for line in lines:
+            self._apply(line)
+
+        if self._offset >= self.compact_threshold:
+            self._compact_event.set()
+
+    def _start_compactor(self):
+        self._thread = threading.Thread(
+            target=self._compactor_loop, name="portfolio-compactor", daemon=True
+        )
+        self._thread.start()
+
+    def _compactor_loop(self):
+        while True:
+            self._compact_event.wait()
+            self._compact_event.clear()
+            try:
+                self.compact()
+            except Exception as exc:
+                logger.error(f"Ошибка компактизации журнала: {exc}")
+
+    def compact(self):
+        """Сворачивает журнал в снимок; занято другим процессом — пропуск"""
+        with self._compact_lock:
+            if fcntl:
+                try:
+                    fcntl.flock(self._compact_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return
+            try:
+                with self._locked(exclusive=True):
+                    self._catch_up()
+                    if not os.path.exists(self.compacting_path):
+                        os.replace(self.journal_path, self.compacting_path)
+                        open(self.journal_path, "ab").close()
+                        self._offset = 0
+                        self._stamp = self._current_stamp()
+                    state = {uid: dict(w) for uid, w in self._state.items()}
+
+                self._save_snapshot(state)
+                with self._locked(exclusive=True):
+                    # свой снимок не требует перечитывать состояние
+                    self._stamp = (
+                        self._stamp[0], self._file_stamp(self.snapshot_path)
+                    )
+                    # под блокировкой: иначе другой процесс может прочитать
+                    # новый снимок вместе с ещё не удалённым *.compacting
+                    os.remove(self.compacting_path)
+            finally:
+                if fcntl:
+                    fcntl.flock(self._compact_fd, fcntl.LOCK_UN)
+            logger.info(f"Журнал портфелей свёрнут в снимок ({len(state)} портфелей)")
+
+    def close(self):
+        with self._lock:
+            os.close(self._lock_fd)
+            os.close(self._compact_fd)
+
+
+def save_json_atomic(data, path: str):
+    """Атомарно сохраняет JSON рядом с целевым файлом"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=directory, delete=False
+    ) as tf:
+        json.dump(data, tf, indent=2, ensure_ascii=False)
+        temp_name = tf.name
+    os.replace(temp_name, path)
@@ -0,0 +1,274 @@
+import math
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from valutatrade_hub.core.exceptions import ValidationError
+from valutatrade_hub.parser_service.asof import RateAsOfIndex, get_asof_index
+from valutatrade_hub.parser_service.history import (
+    record_ohlc,
+    record_pair,
+    record_ts,
+)
+
+INTERVALS = {
+    "1m": 60,
+    "5m": 5 * 60,
+    "15m": 15 * 60,
+    "1h": 60 * 60,
+    "4h": 4 * 60 * 60,
+    "1d": 24 * 60 * 60,
+}
+
+_DURATION_UNITS = {
+    "m": 60,
+    "h": 60 * 60,
+    "d": 24 * 60 * 60,
+    "w": 7 * 24 * 60 * 60,
+    "mo": 30 * 24 * 60 * 60,
+}
+
+
+def parse_interval(text: str) -> int:
+    if text not in INTERVALS:
+        raise ValidationError(
+            f"Неизвестный интервал '{text}'. Доступны: {', '.join(INTERVALS)}"
+        )
+    return INTERVALS[text]
+
+
+def parse_duration(text: str) -> int:
+    """'90m', '12h', '7d', '2w', '3mo' → секунды"""
+    for unit in sorted(_DURATION_UNITS, key=len, reverse=True):
+        number = text[: -len(unit)]
+        if text.endswith(unit) and number.isdigit() and int(number) > 0:
+            return int(number) * _DURATION_UNITS[unit]
+    raise ValidationError(f"Неверный диапазон '{text}' (пример: 12h, 7d, 3mo)")
+
+
+@dataclass
+class OhlcBars:
+    """
+    Свечи OHLC в виде параллельных массивов; start — начало интервала,
+    open_ts/close_ts — время записей, давших open и close
+    """
+    start: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    count: np.ndarray
+    open_ts: np.ndarray
+    close_ts: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "OhlcBars":
+        floats = np.empty(0, dtype=np.float64)
+        return cls(
+            floats, floats, floats, floats, floats, np.empty(0, np.int64),
+            floats, floats,
+        )
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def slice(self, lo: int, hi: Optional[int] = None) -> "OhlcBars":
+        return OhlcBars(*(column[lo:hi] for column in _columns(self)))
+
+    def rows(self) -> Iterator[Tuple[float, float, float, float, float, int]]:
+        return zip(
+            self.start.tolist(), self.open.tolist(), self.high.tolist(),
+            self.low.tolist(), self.close.tolist(), self.count.tolist(),
+        )
+
+
+def _columns(bars: OhlcBars) -> Tuple[np.ndarray, ...]:
+    return (
+        bars.start, bars.open, bars.high, bars.low, bars.close, bars.count,
+        bars.open_ts, bars.close_ts,
+    )
+
+
+def _reduce(bars: OhlcBars) -> OhlcBars:
+    """
+    Объединяет свечи с одинаковым start. open и close берутся у записей
+    с самым ранним open_ts и самым поздним close_ts, поэтому порядок
+    поступления записей на результат не влияет.
+    """
+    if len(bars) == 0:
+        return bars
+    by_open = np.lexsort((bars.open_ts, bars.start))
+    by_close = np.lexsort((bars.close_ts, bars.start))
+    starts = bars.start[by_open]
+    first = np.concatenate(([0], np.flatnonzero(np.diff(starts)) + 1))
+    last = np.concatenate((first[1:], [starts.size])) - 1
+    return OhlcBars(
+        start=starts[first],
+        open=bars.open[by_open][first],
+        high=np.maximum.reduceat(bars.high[by_open], first),
+        low=np.minimum.reduceat(bars.low[by_open], first),
+        close=bars.close[by_close][last],
+        count=np.add.reduceat(bars.count[by_open], first),
+        open_ts=bars.open_ts[by_open][first],
+        close_ts=bars.close_ts[by_close][last],
+    )
+
+
+def compute_ohlc(
+    times: np.ndarray,
+    rates: np.ndarray,
+    interval: int,
+    opens: Optional[np.ndarray] = None,
+    highs: Optional[np.ndarray] = None,
+    lows: Optional[np.ndarray] = None,
+    counts: Optional[np.ndarray] = None,
+    open_times: Optional[np.ndarray] = None,
+) -> OhlcBars:
+    """
+    Свечи по записям в любом порядке — без циклов Python.
+    rates — close записей; для свёрнутых записей передаются их
+    open/high/low/count и время начала (по умолчанию — тики).
+    """
+    if times.size == 0:
+        return OhlcBars.empty()
+    return _reduce(OhlcBars(
+        start=np.floor_divide(times, interval) * interval,
+        open=rates if opens is None else opens,
+        high=rates if highs is None else highs,
+        low=rates if lows is None else lows,
+        close=rates,
+        count=np.ones(times.size, dtype=np.int64) if counts is None else counts,
+        open_ts=times if open_times is None else open_times,
+        close_ts=times,
+    ))
+
+
+def merge_ohlc(old: OhlcBars, new: OhlcBars) -> OhlcBars:
+    """Домешивает новые свечи к старым, в том числе в уже закрытые интервалы"""
+    if len(new) == 0:
+        return old
+    if len(old) == 0:
+        return new
+    return _reduce(OhlcBars(*(
+        np.concatenate((a, b)) for a, b in zip(_columns(old), _columns(new))
+    )))
+
+
+def _records_ohlc(records: Iterable[dict], interval: int) -> OhlcBars:
+    """
+    Свечи по потоку записей истории без загрузки всей серии пары.
+    Свёрнутые записи (retention) дают свои open/high/low/close и число тиков.
+    """
+    columns = [array("d") for _ in range(6)]
+    counts = array("q")
+    for record in records:
+        ts = record_ts(record)
+        open_, high, low, close, count = record_ohlc(record)
+        start = (record.get("ohlc") or {}).get("start", ts)
+        for column, value in zip(columns, (ts, start, open_, high, low, close)):
+            column.append(value)
+        counts.append(count)
+    times, open_times, opens, highs, lows, closes = (
+        np.frombuffer(column, dtype=np.float64) for column in columns
+    )
+    return compute_ohlc(
+        times, closes, interval,
+        opens=opens,
+        highs=highs,
+        lows=lows,
+        counts=np.frombuffer(counts, dtype=np.int64),
+        open_times=open_times,
+    )
+
+
+@dataclass
+class _CacheEntry:
+    bars: OhlcBars
+    upto: float
+
+
+class OhlcAggregator:
+    """
+    Свечи OHLC по истории курсов с кешем по ключу (pair, interval, range).
+
+    Окно выравнивается по границе интервала; при первом запросе читаются
+    только сегменты истории, пересекающие окно. Закешированные свечи не
+    пересчитываются: новые тики (из подписки на RateHistoryStore или из
+    истории, дописанной другим процессом) домешиваются к свечам по своему
+    времени, а вышедшие из окна свечи отрезаются.
+    """
+
+    def __init__(self, index: Optional[RateAsOfIndex] = None):
+        self.index = index or get_asof_index()
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple[str, int, int], _CacheEntry] = {}
+        self.index.store.subscribe(self._on_records)
+
+    def _read(self, pair: str, start: float) -> Iterator[dict]:
+        tiers = self.index.tiers
+        if tiers is not None:
+            return tiers.read(pair, start=start)
+        return self.index.store.read(pair, start=start)
+
+    def _on_records(self, records: List[dict]):
+        by_pair: Dict[str, List[dict]] = {}
+        for record in records:
+            by_pair.setdefault(record_pair(record), []).append(record)
+        with self._lock:
+            for (pair, interval, _), entry in self._cache.items():
+                if pair not in by_pair:
+                    continue
+                self._merge(entry, _records_ohlc(by_pair[pair], interval))
+
+    @staticmethod
+    def _merge(entry: _CacheEntry, bars: OhlcBars):
+        if len(bars):
+            entry.bars = merge_ohlc(entry.bars, bars)
+            entry.upto = max(entry.upto, float(bars.close_ts.max()))
+
+    def bars(self, pair: str, interval: int, range_seconds: int) -> OhlcBars:
+        pair = pair.upper()
+        window = math.floor((time.time() - range_seconds) / interval) * interval
+        key = (pair, interval, range_seconds)
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                entry = _CacheEntry(bars=OhlcBars.empty(), upto=window)
+                self._merge(entry, _records_ohlc(self._read(pair, window), interval))
+                self._cache[key] = entry
+            else:
+                # записи других процессов; свои уже пришли через подписку
+                upto = entry.upto
+                fresh = (
+                    record for record in self.index.store.read(pair, start=upto)
+                    if record_ts(record) > upto
+                )
+                self._merge(entry, _records_ohlc(fresh, interval))
+
+            first = int(np.searchsorted(entry.bars.start, window, side="left"))
+            if first:
+                entry.bars = entry.bars.slice(first)
+            return entry.bars
+
+    def invalidate(self, pair: Optional[str] = None):
+        with self._lock:
+            for key in list(self._cache):
+                if pair is None or key[0] == pair.upper():
+                    del self._cache[key]
+
+
+_aggregator: Optional[OhlcAggregator] = None
+_aggregator_lock = threading.Lock()
+
+
+def get_ohlc_aggregator() -> OhlcAggregator:
+    global _aggregator
+    with _aggregator_lock:
+        if _aggregator is None:
+            _aggregator = OhlcAggregator()
+        return _aggregator
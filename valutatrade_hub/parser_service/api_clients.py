@@ -1,19 +1,403 @@
+import json
+import logging
+import queue
+import threading
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Dict
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from valutatrade_hub.core.exceptions import ApiRequestError
+from valutatrade_hub.core.exceptions import (
+    ApiRequestError,
+    CircuitOpenError,
+    RateLimitError,
+)
+from valutatrade_hub.infra.settings import SettingsLoader
 
 from .config import config
+from .http_cache import get_response_cache, redact_url
+from .rate_limit import get_limiter
+from .standin import fixture_key, record_response, replay_url
+from .storage import save_atomic
+
+settings = SettingsLoader()
+# Кешированный ответ не считается свежим дольше, чем живут сами курсы
+RATES_TTL = settings.get("RATES_TTL_SECONDS", 300)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestStats:
+    """
+    Статистика HTTP-запросов клиента.
+    ttfb — от отправки запроса до получения заголовков (включая соединение),
+    read — чтение тела ответа.
+    Счётчики меняются только через count/record: клиент вызывают
+    из нескольких потоков (пакетные запросы CoinGecko).
+    """
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    ttfb_total: float = 0.0
+    read_total: float = 0.0
+    last_ttfb: float = 0.0
+    last_read: float = 0.0
+    cache_hits: int = 0
+    revalidated: int = 0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record(self, ttfb: float, read: float, retries: int):
+        """Учитывает выполненный запрос"""
+        with self._lock:
+            self.requests += 1
+            self.retries += retries
+            self.ttfb_total += ttfb
+            self.read_total += read
+            self.last_ttfb = ttfb
+            self.last_read = read
+
+    @property
+    def avg_ttfb(self) -> float:
+        return self.ttfb_total / self.requests if self.requests else 0.0
+
+    @property
+    def avg_read(self) -> float:
+        return self.read_total / self.requests if self.requests else 0.0
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель источника курсов.
+
+    closed — запросы идут как обычно; после failure_threshold ошибок подряд
+    переходит в open. open — запросы сразу отклоняются (CircuitOpenError)
+    до истечения cooldown, затем half-open: пропускается один пробный
+    запрос. Успех пробы закрывает цепь, ошибка снова её открывает.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = config.BREAKER_FAILURE_THRESHOLD,
+        cooldown: float = config.BREAKER_COOLDOWN_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Проверка перед запросом; при открытой цепи — CircuitOpenError"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    self.rejected += 1
+                    raise CircuitOpenError(
+                        f"{self.name}: источник недоступен, "
+                        f"повтор через {self._retry_in():.0f} с"
+                    )
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(
+                        f"{self.name}: идёт проверка доступности источника"
+                    )
+                self._probing = True
+
+    def release(self):
+        """Запрос не был отправлен: снимает занятую пробу half-open"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self, error: str):
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def _retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "source": self.name,
+                "state": self.state,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "retry_in": self._retry_in() if self.state == self.OPEN else 0.0,
+                "last_error": self.last_error,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Один выключатель на источник в пределах процесса"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def breaker_states() -> List[dict]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.snapshot() for breaker in breakers]
+
+
+def build_session(
+    pool_connections: int = config.HTTP_POOL_CONNECTIONS,
+    pool_maxsize: int = config.HTTP_POOL_MAXSIZE,
+    max_retries: int = config.HTTP_MAX_RETRIES,
+    backoff_factor: float = config.HTTP_BACKOFF_FACTOR,
+    status_retries: bool = True,
+) -> requests.Session:
+    """
+    Сессия с пулом keep-alive соединений и повторами при 429/5xx
+    (экспоненциальная задержка, заголовок Retry-After учитывается).
+    status_retries=False — без повторов по статусу: для источников с
+    TokenBucket, где каждый повтор — ещё один запрос к лимиту и квоте.
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries if status_retries else 0,
+        backoff_factor=backoff_factor,
+        status_forcelist=config.HTTP_RETRY_STATUSES if status_retries else (),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 
 class BaseApiClient(ABC):
     """
     Абстрактный базовый клиент для получения курсов валют.
+    Все клиенты используют общую сессию с пулом соединений.
     """
 
+    # Собственный дедлайн клиента в RatesUpdater (None — общий по умолчанию)
+    deadline: Optional[float] = None
+    # Период опроса источника в RateUpdaterScheduler
+    update_interval: float = config.UPDATE_INTERVAL_SECONDS
+
+    connect_timeout: float = config.CONNECT_TIMEOUT
+    read_timeout: float = config.REQUEST_TIMEOUT
+
+    # Адрес подменного сервера (standin.StandInServer) вместо настоящих API
+    api_base: Optional[str] = config.API_BASE_OVERRIDE or None
+
+    _session: Optional[requests.Session] = None
+    # сессия источников с TokenBucket: без повторов по статусу 429/5xx
+    _limited_session: Optional[requests.Session] = None
+    _session_lock = threading.Lock()
+
+    @classmethod
+    def session(cls, limited: bool = False) -> requests.Session:
+        with BaseApiClient._session_lock:
+            if limited:
+                if BaseApiClient._limited_session is None:
+                    BaseApiClient._limited_session = build_session(
+                        status_retries=False
+                    )
+                return BaseApiClient._limited_session
+            if BaseApiClient._session is None:
+                BaseApiClient._session = build_session()
+            return BaseApiClient._session
+
+    @classmethod
+    def set_session(cls, session: Optional[requests.Session], limited: bool = False):
+        """Подменяет общую сессию (например, с другими настройками пула)"""
+        with BaseApiClient._session_lock:
+            if limited:
+                BaseApiClient._limited_session = session
+            else:
+                BaseApiClient._session = session
+
+    @classmethod
+    def set_api_base(cls, base_url: Optional[str]):
+        """Направляет запросы всех клиентов на подменный сервер (None — на API)"""
+        BaseApiClient.api_base = base_url
+
+    def __init__(self):
+        self.stats = RequestStats()
+        self.breaker = get_breaker(self.__class__.__name__)
+        self.limiter = get_limiter(self.__class__.__name__)
+        self.response_cache = (
+            get_response_cache() if config.HTTP_CACHE_ENABLED else None
+        )
+
+    @property
+    def cache_max_age(self) -> Optional[float]:
+        """Срок свежести кешированного ответа источника (None — по заголовкам)"""
+        return config.HTTP_CACHE_MAX_AGE.get(self.__class__.__name__)
+
+    @staticmethod
+    def response_timestamp(response: requests.Response) -> str:
+        """
+        Время данных ответа (ISO, UTC). Для ответа из кеша — момент его
+        сохранения (или заголовок Date), чтобы TTL курсов видел их возраст.
+        """
+        if getattr(response, "from_cache", False):
+            stored_at = getattr(response, "stored_at", None)
+            if stored_at is not None:
+                return datetime.fromtimestamp(stored_at, timezone.utc).isoformat()
+            try:
+                date = parsedate_to_datetime(response.headers["Date"])
+                return date.astimezone(timezone.utc).isoformat()
+            except (KeyError, TypeError, ValueError):
+                pass
+        return datetime.now(timezone.utc).isoformat()
+
+    def _secrets(self) -> tuple:
+        """Строки, которые нельзя сохранять в ключе кеша (API-ключи в URL)"""
+        return ()
+
+    def _get(self, url: str, params: Optional[dict] = None) -> requests.Response:
+        """
+        GET с дисковым кешем ответов.
+
+        Свежий ответ (cache_max_age или Cache-Control/Expires) отдаётся
+        без сети; устаревший перепроверяется условным запросом
+        (If-None-Match / If-Modified-Since), и на 304 отдаётся сохранённое
+        тело. В офлайн-режиме (HTTP_CACHE_OFFLINE) сеть не используется вовсе.
+        Ответ из кеша помечен from_cache и stored_at (см. response_timestamp).
+        С api_base запрос уходит на подменный сервер, а в режиме HTTP_RECORD
+        полученные ответы записываются как фикстуры для него.
+        """
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        key = redact_url(full_url, self._secrets())
+        if self.api_base:
+            # воспроизведение: секреты подменному серверу не передаются,
+            # а его ответы не смешиваются с кешем настоящих API
+            return self._send(replay_url(key, self.api_base))
+
+        cache = self.response_cache
+        entry = cache.get(key) if cache else None
+
+        if config.HTTP_CACHE_OFFLINE:
+            if entry is None:
+                raise ApiRequestError(
+                    f"{self.__class__.__name__}: нет сохранённого ответа для {key}"
+                )
+            self.stats.count("cache_hits")
+            return entry.to_response()
+
+        if entry and entry.is_fresh(self.cache_max_age, cap=RATES_TTL):
+            self.stats.count("cache_hits")
+            return entry.to_response()
+
+        headers = entry.conditional_headers() if entry else {}
+        response = self._send(full_url, headers=headers)
+        if entry and response.status_code == 304:
+            self.stats.count("revalidated")
+            return cache.touch(entry, response).to_response()
+        if cache:
+            cache.put(key, response)
+        if config.HTTP_RECORD:
+            record_response(fixture_key(key), response)
+        return response
+
+    def _send(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET через общую сессию с учётом таймаутов и статистики.
+        При открытом выключателе источника или исчерпанном лимите
+        запрос не отправляется. Источник с лимитом использует сессию без
+        повторов по статусу, а оставшиеся повторы сессии (соединение,
+        чтение) списываются с его TokenBucket.
+        """
+        self.breaker.allow()
+        if self.limiter:
+            try:
+                self.limiter.acquire()
+            except RateLimitError:
+                self.breaker.release()
+                raise
+        stats = self.stats
+        started = time.perf_counter()
+        try:
+            response = self.session(limited=self.limiter is not None).get(
+                url,
+                timeout=(self.connect_timeout, self.read_timeout),
+                stream=True,
+                **kwargs,
+            )
+            ttfb = time.perf_counter() - started
+            response.content  # дочитываем тело, соединение возвращается в пул
+        except requests.exceptions.RequestException as exc:
+            stats.count("errors")
+            self.breaker.record_failure(str(exc))
+            raise
+        except Exception as exc:
+            self.breaker.record_failure(str(exc))
+            raise
+
+        if response.status_code in config.HTTP_RETRY_STATUSES:
+            self.breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            self.breaker.record_success()
+
+        read = time.perf_counter() - started - ttfb
+        retries = getattr(response.raw, "retries", None)
+
+        retried = len(retries.history) if retries else 0
+        if self.limiter and retried:
+            self.limiter.charge(retried)
+
+        stats.record(ttfb, read, retried)
+        return response
+
     @abstractmethod
     def fetch_rates(self) -> Dict[str, dict]:
         """
@@ -31,50 +415,226 @@ class BaseApiClient(ABC):
         pass
 
 
+class CoinIdMap:
+    """
+    Карта символ → id CoinGecko с локальным кешем в файле.
+
+    Файл перечитывается лениво: при первом обращении и когда он старше ttl.
+    Тогда карта запрашивается заново (топ монет по капитализации через
+    /coins/markets); если API недоступен, используется прежний файл,
+    а без него — CRYPTO_ID_MAP. Символы из CRYPTO_ID_MAP всегда имеют
+    приоритет над совпадающими символами других монет.
+    """
+
+    def __init__(
+        self,
+        path: str = config.COINGECKO_IDS_FILE_PATH,
+        ttl: float = config.COINGECKO_IDS_TTL_SECONDS,
+        top: int = config.COINGECKO_TOP_COINS,
+        seed: Optional[Dict[str, str]] = None,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.top = top
+        self.seed = dict(seed if seed is not None else config.CRYPTO_ID_MAP)
+        self._ids: Optional[Dict[str, str]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, fetch_page: Callable[[int, int], list]) -> Dict[str, str]:
+        """fetch_page(page, per_page) — страница ответа /coins/markets"""
+        with self._lock:
+            if self._ids is None or time.time() - self._loaded_at > self.ttl:
+                self._ids, self._loaded_at = self._load(fetch_page)
+            return self._ids
+
+    def _read_file(self) -> Optional[dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _load(self, fetch_page) -> Tuple[Dict[str, str], float]:
+        cached = self._read_file()
+        if cached and time.time() - cached.get("fetched_at", 0) <= self.ttl:
+            return {**cached["ids"], **self.seed}, cached["fetched_at"]
+        if self.top <= 0:
+            return dict(self.seed), time.time()
+
+        try:
+            ids = self._fetch(fetch_page)
+        except ApiRequestError as exc:
+            logger.warning(f"Не удалось обновить карту id CoinGecko: {exc}")
+            if cached:
+                return {**cached["ids"], **self.seed}, time.time()
+            return dict(self.seed), time.time()
+
+        fetched_at = time.time()
+        save_atomic({"fetched_at": fetched_at, "ids": ids}, self.path)
+        return {**ids, **self.seed}, fetched_at
+
+    def _fetch(self, fetch_page) -> Dict[str, str]:
+        ids: Dict[str, str] = {}
+        per_page = min(self.top, 250)
+        page = 1
+        while len(ids) < self.top:
+            coins = fetch_page(page, per_page)
+            for coin in coins:
+                symbol = str(coin.get("symbol", "")).upper()
+                # монеты отсортированы по капитализации: первая с символом побеждает
+                if symbol.isascii() and symbol.isalnum() and len(symbol) <= 10:
+                    ids.setdefault(symbol, coin["id"])
+                if len(ids) >= self.top:
+                    break
+            if len(coins) < per_page:
+                break
+            page += 1
+        return ids
+
+
 class CoinGeckoClient(BaseApiClient):
     """
-    Клиент для получения курсов криптовалют через CoinGecko
+    Клиент для получения курсов криптовалют через CoinGecko.
+
+    id монет разбиваются на пакеты по batch_size, пакеты запрашиваются
+    параллельно (не больше max_workers); частоту запросов ограничивает
+    общий для источника TokenBucket.
     """
 
-    def __init__(self):
-        self.crypto_map = config.CRYPTO_ID_MAP
+    update_interval = config.CRYPTO_UPDATE_INTERVAL_SECONDS
+
+    def __init__(
+        self,
+        id_map: Optional[CoinIdMap] = None,
+        batch_size: int = config.COINGECKO_BATCH_SIZE,
+        max_workers: int = config.COINGECKO_MAX_WORKERS,
+    ):
+        super().__init__()
+        self.id_map = id_map or CoinIdMap()
+        self.batch_size = batch_size
+        self.max_workers = max_workers
         self.base_currency = config.BASE_FIAT_CURRENCY.upper()
 
-    def fetch_rates(self) -> Dict[str, dict]:
-        ids = ",".join(self.crypto_map.values())
-        url = (
-            f"{config.COINGECKO_URL}"
-            f"?ids={ids}&vs_currencies={self.base_currency.lower()}"
-        )
+    @property
+    def crypto_map(self) -> Dict[str, str]:
+        return self.id_map.get(self._fetch_markets_page)
 
+    def _request_json(self, url: str, params: dict):
         try:
-            response = requests.get(url, timeout=config.REQUEST_TIMEOUT)
+            response = self._get(url, params=params)
             response.raise_for_status()
-            data = response.json()
+            return response.json(), response.status_code, response
         except requests.exceptions.RequestException as exc:
             raise ApiRequestError(f"CoinGecko network error: {exc}")
         except ValueError:
             raise ApiRequestError("CoinGecko returned invalid JSON")
 
-        timestamp = datetime.now().replace(tzinfo=timezone.utc).isoformat()
+    def _fetch_markets_page(self, page: int, per_page: int) -> list:
+        data, _, _ = self._request_json(
+            config.COINGECKO_MARKETS_URL,
+            {
+                "vs_currency": self.base_currency.lower(),
+                "order": "market_cap_desc",
+                "per_page": per_page,
+                "page": page,
+            },
+        )
+        return data
+
+    def _fetch_batch(self, ids: List[str]) -> Tuple[dict, int, requests.Response]:
+        return self._request_json(
+            config.COINGECKO_URL,
+            {"ids": ",".join(ids), "vs_currencies": self.base_currency.lower()},
+        )
+
+    def _fetch_batches(
+        self, batches: List[List[str]]
+    ) -> List[Tuple[dict, int, requests.Response]]:
+        """
+        Пакеты в daemon-потоках (не больше max_workers), как клиенты
+        в RatesUpdater: зависший запрос не держит завершение процесса.
+        Ждём не дольше дедлайна клиента; после ошибки или дедлайна
+        ещё не начатые пакеты отменяются.
+        """
+        futures = [Future() for _ in batches]
+        pending: queue.SimpleQueue = queue.SimpleQueue()
+        for item in zip(batches, futures):
+            pending.put(item)
+
+        def worker():
+            while True:
+                try:
+                    batch, future = pending.get_nowait()
+                except queue.Empty:
+                    return
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(self._fetch_batch(batch))
+                except BaseException as exc:
+                    future.set_exception(exc)
+
+        for index in range(min(self.max_workers, len(batches))):
+            threading.Thread(
+                target=worker, name=f"coingecko-{index}", daemon=True
+            ).start()
+
+        until = time.monotonic() + (self.deadline or config.CLIENT_DEADLINE_SECONDS)
+        try:
+            return [
+                future.result(timeout=max(0.0, until - time.monotonic()))
+                for future in futures
+            ]
+        except FutureTimeoutError:
+            raise ApiRequestError("CoinGecko: пакеты не уложились в дедлайн")
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def fetch_rates(self) -> Dict[str, dict]:
+        crypto_map = self.crypto_map
+        coin_ids = sorted(set(crypto_map.values()))
+        batches = [
+            coin_ids[i:i + self.batch_size]
+            for i in range(0, len(coin_ids), self.batch_size)
+        ]
+
+        # при ошибке любого пакета падает весь опрос: частичный ответ
+        # в дельта-режиме RatesUpdater удалил бы пары пропавших монет
+        if len(batches) > 1:
+            responses = self._fetch_batches(batches)
+        else:
+            responses = [self._fetch_batch(batch) for batch in batches]
+
+        # пакет из кеша может быть старше остальных: у монеты — время её пакета
+        data: Dict[str, dict] = {}
+        stamps: Dict[str, str] = {}
+        status_code = 200
+        for batch_data, status_code, response in responses:
+            data.update(batch_data)
+            timestamp = self.response_timestamp(response)
+            stamps.update({coin_id: timestamp for coin_id in batch_data})
+
+        vs = self.base_currency.lower()
         result: Dict[str, dict] = {}
 
-        for symbol, coin_id in self.crypto_map.items():
+        for symbol, coin_id in crypto_map.items():
             if coin_id not in data:
                 continue
-            if self.base_currency.lower() not in data[coin_id]:
+            if vs not in data[coin_id]:
                 continue
 
-            rate = float(data[coin_id][self.base_currency.lower()])
+            rate = float(data[coin_id][vs])
             pair = f"{symbol}_{self.base_currency}"
 
             result[pair] = {
                 "rate": rate,
-                "timestamp": timestamp,
+                "timestamp": stamps[coin_id],
                 "source": "CoinGecko",
                 "meta": {
                     "raw_id": coin_id,
-                    "status_code": response.status_code,
+                    "status_code": status_code,
                 },
             }
 
@@ -86,13 +646,19 @@ class ExchangeRateApiClient(BaseApiClient):
     Клиент для получения фиатных курсов через ExchangeRate-API
     """
 
+    update_interval = config.FIAT_UPDATE_INTERVAL_SECONDS
+
     def __init__(self):
+        super().__init__()
         self.api_key = config.EXCHANGERATE_API_KEY
         self.base_currency = config.BASE_FIAT_CURRENCY.upper()
 
         if not self.api_key:
             raise ApiRequestError("ExchangeRate-API key not found in environment")
 
+    def _secrets(self) -> tuple:
+        return (self.api_key,)
+
     def fetch_rates(self) -> Dict[str, dict]:
         url = (
             f"{config.EXCHANGERATE_API_URL}/"
@@ -100,7 +666,7 @@ class ExchangeRateApiClient(BaseApiClient):
         )
 
         try:
-            response = requests.get(url, timeout=config.REQUEST_TIMEOUT)
+            response = self._get(url)
             response.raise_for_status()
             data = response.json()
 
@@ -112,14 +678,17 @@ class ExchangeRateApiClient(BaseApiClient):
         except ValueError:
             raise ApiRequestError("ExchangeRate-API returned invalid JSON")
 
-        timestamp = datetime.now().replace(tzinfo=timezone.utc).isoformat()
+        timestamp = self.response_timestamp(response)
         result: Dict[str, dict] = {}
 
+        # API отдаёт количество валюты за 1 USD, а пара XXX_USD — цена XXX в USD
         for currency, rate in data.get("rates", {}).items():
+            if not rate:
+                continue
             pair = f"{currency.upper()}_{self.base_currency}"
 
             result[pair] = {
-                "rate": float(rate),
+                "rate": 1.0 / float(rate),
                 "timestamp": timestamp,
                 "source": "ExchangeRate-API",
                 "meta": {
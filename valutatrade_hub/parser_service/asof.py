@@ -0,0 +1,133 @@
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from valutatrade_hub.parser_service.history import (
+    RateHistoryStore,
+    get_history_store,
+    record_ohlc,
+    record_ts,
+)
+from valutatrade_hub.parser_service.retention import (
+    HistoryRetention,
+    get_history_retention,
+)
+
+
+class _PairSeries:
+    """Отсортированные по времени массивы меток и курсов одной пары"""
+
+    __slots__ = ("times", "rates", "_np_times", "_np_rates")
+
+    def __init__(self):
+        self.times = array("d")
+        self.rates = array("d")
+        self._np_times: Optional[np.ndarray] = None
+        self._np_rates: Optional[np.ndarray] = None
+
+    def add(self, ts: float, rate: float):
+        if not self.times or ts >= self.times[-1]:
+            self.times.append(ts)
+            self.rates.append(rate)
+        else:
+            i = bisect_right(self.times, ts)
+            self.times.insert(i, ts)
+            self.rates.insert(i, rate)
+        self._np_times = self._np_rates = None
+
+    def as_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._np_times is None:
+            self._np_times = np.array(self.times, dtype=np.float64)
+            self._np_rates = np.array(self.rates, dtype=np.float64)
+        return self._np_times, self._np_rates
+
+
+class RateAsOfIndex:
+    """
+    Курс пары на момент времени ("BTC_USD as of T").
+
+    Для каждой пары держит отсортированные array('d') меток и курсов,
+    загружаемые из RateHistoryStore при первом обращении и дочитываемые
+    при следующих. Одиночный запрос — bisect за O(log n), пакетный —
+    один вызов np.searchsorted на весь массив меток.
+    """
+
+    def __init__(
+        self,
+        store: Optional[RateHistoryStore] = None,
+        tiers: Optional[HistoryRetention] = None,
+    ):
+        self.tiers = tiers
+        self.store = store or (tiers.raw if tiers else get_history_store())
+        self._lock = threading.Lock()
+        self._series: Dict[str, _PairSeries] = {}
+
+    def _refresh(self, pair: str) -> _PairSeries:
+        series = self._series.get(pair)
+        if series is None:
+            series = self._series[pair] = _PairSeries()
+            # при первом обращении учитываются и свёрнутые уровни истории
+            records = self.tiers.read(pair) if self.tiers else self.store.read(pair)
+        else:
+            last = series.times[-1] if series.times else None
+            records = (
+                record for record in self.store.read(pair, start=last)
+                if last is None or record_ts(record) > last
+            )
+        for record in records:
+            # у свёрнутой записи курс на её время — close свечи
+            series.add(record_ts(record), record_ohlc(record)[3])
+        return series
+
+    def as_of(self, pair: str, ts: float) -> Optional[Tuple[float, float]]:
+        """(rate, ts) последней записи не позже ts или None"""
+        with self._lock:
+            series = self._refresh(pair.upper())
+            i = bisect_right(series.times, ts) - 1
+            if i < 0:
+                return None
+            return series.rates[i], series.times[i]
+
+    def arrays(self, pair: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Все метки и курсы пары в виде массивов NumPy (только для чтения)"""
+        with self._lock:
+            return self._refresh(pair.upper()).as_arrays()
+
+    def as_of_many(self, pair: str, timestamps: Iterable[float]) -> np.ndarray:
+        """
+        Курсы на каждый момент из timestamps одним векторным вызовом.
+        Для моментов раньше первой записи возвращается NaN.
+        """
+        query = np.asarray(
+            timestamps if isinstance(timestamps, np.ndarray) else list(timestamps),
+            dtype=np.float64,
+        )
+        times, rates = self.arrays(pair)
+
+        result = np.full(query.shape, np.nan)
+        if times.size == 0:
+            return result
+        positions = np.searchsorted(times, query, side="right") - 1
+        found = positions >= 0
+        result[found] = rates[positions[found]]
+        return result
+
+
+_index: Optional[RateAsOfIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_asof_index() -> RateAsOfIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = RateAsOfIndex(tiers=get_history_retention())
+        return _index
+
+
+def rate_as_of(pair: str, ts: float) -> Optional[Tuple[float, float]]:
+    """Курс пары на момент ts по общей истории курсов"""
+    return get_asof_index().as_of(pair, ts)
@@ -10,6 +10,7 @@ class ParserConfig:
     )
 
     COINGECKO_URL: str = "https://api.coingecko.com/api/v3/simple/price"
+    COINGECKO_MARKETS_URL: str = "https://api.coingecko.com/api/v3/coins/markets"
     EXCHANGERATE_API_URL: str = "https://v6.exchangerate-api.com/v6"
 
     BASE_FIAT_CURRENCY: str = "USD"
@@ -22,11 +23,83 @@ class ParserConfig:
         "SOL": "solana",
     })
 
+    # Карта символ → id CoinGecko: топ COINGECKO_TOP_COINS монет по капитализации
+    # (CRYPTO_ID_MAP имеет приоритет), обновляется раз в COINGECKO_IDS_TTL_SECONDS
+    COINGECKO_IDS_FILE_PATH: str = "data/coingecko_ids.json"
+    COINGECKO_IDS_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    COINGECKO_TOP_COINS: int = 250
+    COINGECKO_BATCH_SIZE: int = 100
+    COINGECKO_MAX_WORKERS: int = 4
+
     RATES_FILE_PATH: str = "data/rates.json"
+    RATE_TABLE_FILE_PATH: str = "data/rates.bin"
     HISTORY_FILE_PATH: str = "data/exchange_rates.json"
+    HISTORY_DIR: str = "data/history"
+    HISTORY_SEGMENT_MAX_BYTES: int = 4 * 1024 * 1024
+    HISTORY_SEGMENT_SECONDS: int = 24 * 60 * 60
 
     REQUEST_TIMEOUT: int = 10
+    CONNECT_TIMEOUT: float = 3.05
+
+    HTTP_POOL_CONNECTIONS: int = 4
+    HTTP_POOL_MAXSIZE: int = 10
+    HTTP_MAX_RETRIES: int = 3
+    HTTP_BACKOFF_FACTOR: float = 0.5
+    HTTP_RETRY_STATUSES: tuple = (429, 500, 502, 503, 504)
+
+    BREAKER_FAILURE_THRESHOLD: int = 3
+    BREAKER_COOLDOWN_SECONDS: float = 60.0
+
+    # Дисковый кеш ответов; HTTP_CACHE_MAX_AGE переопределяет срок свежести
+    # из Cache-Control для источника (ключ — класс клиента). Любой срок
+    # ограничен RATES_TTL_SECONDS: из кеша не отдаются уже устаревшие курсы
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_DIR: str = "data/http_cache"
+    HTTP_CACHE_OFFLINE: bool = os.getenv("VALUTATRADE_OFFLINE", "") == "1"
+    HTTP_CACHE_MAX_AGE: dict = field(default_factory=lambda: {
+        "ExchangeRateApiClient": 5 * 60,
+    })
+
+    # Запись ответов источников в FIXTURES_DIR (VALUTATRADE_RECORD=1) и
+    # воспроизведение через подменный сервер (VALUTATRADE_API_BASE=http://...)
+    FIXTURES_DIR: str = "data/fixtures"
+    HTTP_RECORD: bool = os.getenv("VALUTATRADE_RECORD", "") == "1"
+    API_BASE_OVERRIDE: str = os.getenv("VALUTATRADE_API_BASE", "")
+
+    # Token bucket на источник (ключ — класс клиента), общий для процессов:
+    # per_minute, burst, policy queue/reject, max_wait, quota за quota_period
+    RATE_LIMIT_STATE_PATH: str = "data/rate_limits.json"
+    RATE_LIMITS: dict = field(default_factory=lambda: {
+        "CoinGeckoClient": {
+            "per_minute": 30,
+            "burst": 5,
+            "policy": "queue",
+            "max_wait": 8.0,
+        },
+        "ExchangeRateApiClient": {
+            "per_minute": 10,
+            "burst": 2,
+            "policy": "reject",
+            "quota": 1500,
+            "quota_period": "month",
+        },
+    })
+
     UPDATE_INTERVAL_SECONDS: int = 300
+    CRYPTO_UPDATE_INTERVAL_SECONDS: int = 30
+    FIAT_UPDATE_INTERVAL_SECONDS: int = 300
+    SCHEDULER_JITTER: float = 0.1
+    SCHEDULER_BACKOFF_MAX_SECONDS: int = 30 * 60
+
+    UPDATE_CONCURRENT: bool = True
+    UPDATE_DELTA_MODE: bool = True
+    RATES_DELTA_EPSILON: float = 1e-9
+    UPDATE_DEADLINE_SECONDS: float = 12.0
+    CLIENT_DEADLINE_SECONDS: float = 10.0
+
+    REFRESH_LOCK_FILE_PATH: str = "data/rates.refresh.lock"
+    REFRESH_LOCK_TIMEOUT_SECONDS: float = 60.0
+    REFRESH_FAILURE_COOLDOWN_SECONDS: float = 30.0
 
 
 config = ParserConfig()
@@ -0,0 +1,143 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from valutatrade_hub.parser_service.rates_cache import (
+    RATES_FILE,
+    RatesCache,
+    get_rates_cache,
+)
+
+BASE_CURRENCY = "USD"
+
+
+class CrossRateEngine:
+    """
+    Кросс-курсы любой пары по снимку rates.json.
+
+    Из пар вида XXX_USD (и USD_XXX) собирается вектор цен в USD,
+    проиндексированный по кодам валют. Курс FROM_TO = usd[FROM] / usd[TO]
+    вычисляется за O(1); полная матрица N×N строится одной операцией NumPy.
+    Вектор пересобирается только при смене поколения снимка в RatesCache.
+    """
+
+    def __init__(self, cache: RatesCache):
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._generation = -1
+        self.codes: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.usd = np.empty(0, dtype=np.float64)
+        self.timestamps = np.empty(0, dtype=np.float64)
+        self._labels: List[str] = []
+        self._keys: List[str] = []
+        self._prices: Dict[str, float] = {}
+
+    def _refresh(self):
+        generation, entries = self.cache.entries()
+        if generation == self._generation:
+            return
+
+        prices: Dict[str, Tuple[float, float, str, str]] = {
+            BASE_CURRENCY: (1.0, float("inf"), "", "")
+        }
+        inverse: Dict[str, Tuple[float, float, str, str]] = {}
+        for key, (rate, ts, label) in entries.items():
+            from_code, _, to_code = key.partition("_")
+            if rate <= 0:
+                continue
+            if to_code == BASE_CURRENCY and from_code != BASE_CURRENCY:
+                prices[from_code] = (rate, ts, label, key)
+            elif from_code == BASE_CURRENCY and to_code:
+                inverse[to_code] = (1.0 / rate, ts, label, key)
+        for code, value in inverse.items():
+            prices.setdefault(code, value)
+
+        codes = sorted(prices)
+        self.codes = codes
+        self.index = {code: i for i, code in enumerate(codes)}
+        self.usd = np.fromiter(
+            (prices[code][0] for code in codes), dtype=np.float64, count=len(codes)
+        )
+        self.timestamps = np.fromiter(
+            (prices[code][1] for code in codes), dtype=np.float64, count=len(codes)
+        )
+        self._labels = [prices[code][2] for code in codes]
+        self._keys = [prices[code][3] for code in codes]
+        self._prices = {code: prices[code][0] for code in codes}
+        self._generation = generation
+
+    def get(self, from_code: str, to_code: str) -> Optional[Tuple[float, float, str]]:
+        """
+        (rate, updated_ts, updated_at) для пары или None.
+        Время кросс-курса — время более старой из двух ног
+        (с учётом подтверждений из RatesCache.confirmed_at).
+        """
+        with self._lock:
+            self._refresh()
+            return self._quote(from_code, to_code)
+
+    def quotes(
+        self, from_codes: Iterable[str], to_code: str
+    ) -> Dict[str, Optional[Tuple[float, float, str]]]:
+        """Курсы нескольких валют к to_code по одному снимку (как get)"""
+        with self._lock:
+            self._refresh()
+            return {code: self._quote(code, to_code) for code in from_codes}
+
+    def _quote(
+        self, from_code: str, to_code: str
+    ) -> Optional[Tuple[float, float, str]]:
+        i = self.index.get(from_code.upper())
+        j = self.index.get(to_code.upper())
+        if i is None or j is None:
+            return None
+
+        rate = float(self.usd[i] / self.usd[j])
+        legs = [
+            (self._fresh_ts(k), self._labels[k]) for k in (i, j)
+            if self._keys[k]
+        ]
+        if not legs:
+            return rate, float("inf"), ""
+        ts, label = min(legs)
+        return rate, ts, label
+
+    def _fresh_ts(self, k: int) -> float:
+        """Время курса с учётом подтверждения источником без изменения курса"""
+        return max(float(self.timestamps[k]), self.cache.confirmed_at(self._keys[k]))
+
+    def prices(self) -> Tuple[int, Dict[str, float]]:
+        """Поколение снимка и цены всех валют в USD (словарь не изменять)"""
+        with self._lock:
+            self._refresh()
+            return self._generation, self._prices
+
+    def matrix(self) -> Tuple[List[str], np.ndarray]:
+        """Коды валют и матрица M, где M[i, j] — курс codes[i] → codes[j]"""
+        with self._lock:
+            self._refresh()
+            return list(self.codes), np.divide.outer(self.usd, self.usd)
+
+    def vector(self, base_code: str = BASE_CURRENCY) -> Tuple[List[str], np.ndarray]:
+        """Курсы всех валют к base_code одним вектором"""
+        with self._lock:
+            self._refresh()
+            j = self.index.get(base_code.upper())
+            if j is None:
+                raise KeyError(base_code)
+            return list(self.codes), self.usd / self.usd[j]
+
+
+_engines: Dict[int, CrossRateEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_cross_rates(path: str = RATES_FILE) -> CrossRateEngine:
+    """Движок кросс-курсов поверх общего RatesCache для файла"""
+    cache = get_rates_cache(path)
+    with _engines_lock:
+        if id(cache) not in _engines:
+            _engines[id(cache)] = CrossRateEngine(cache)
+        return _engines[id(cache)]
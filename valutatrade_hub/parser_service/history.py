@@ -0,0 +1,404 @@
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from valutatrade_hub.parser_service.config import config
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".ndjson"
+INDEX_SUFFIX = ".idx.json"
+# изменение каталога в пределах этого окна могло не сдвинуть его mtime
+LISTING_RACY_NS = 1_000_000_000
+
+
+def record_ts(record: dict) -> float:
+    """Время записи истории в epoch float"""
+    if "ts" in record:
+        return float(record["ts"])
+    return datetime.fromisoformat(record["timestamp"]).timestamp()
+
+
+def record_pair(record: dict) -> str:
+    return f"{record['from_currency']}_{record['to_currency']}"
+
+
+def record_ohlc(record: dict) -> Tuple[float, float, float, float, int]:
+    """
+    (open, high, low, close, count) записи: у свёрнутой записи — из блока
+    ohlc, у тика open = high = low = close = rate и count = 1
+    """
+    rate = float(record["rate"])
+    ohlc = record.get("ohlc")
+    if not ohlc:
+        return rate, rate, rate, rate, 1
+    return (
+        float(ohlc.get("open", rate)),
+        float(ohlc.get("high", rate)),
+        float(ohlc.get("low", rate)),
+        float(ohlc.get("close", rate)),
+        int(ohlc.get("count", 1)),
+    )
+
+
+class Segment:
+    """
+    Один файл NDJSON истории и его индекс: для каждой пары —
+    смещения строк в файле и их временные метки (в порядке записи).
+    """
+
+    def __init__(self, path: str, start: float):
+        self.path = path
+        self.start = start
+        self.end = start
+        self.count = 0
+        self.offsets: Dict[str, array] = {}
+        self.times: Dict[str, array] = {}
+        self.scanned = 0
+        self.sealed = False
+
+    @property
+    def index_path(self) -> str:
+        return self.path[: -len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+    def add(self, pair: str, offset: int, ts: float):
+        if pair not in self.offsets:
+            self.offsets[pair] = array("q")
+            self.times[pair] = array("d")
+        self.offsets[pair].append(offset)
+        self.times[pair].append(ts)
+        self.end = max(self.end, ts)
+        self.count += 1
+
+    def catch_up(self):
+        """Дочитывает в индекс строки, дописанные после последнего сканирования"""
+        if self.sealed or not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self.scanned)
+            offset = self.scanned
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                    self.add(record_pair(record), offset, record_ts(record))
+                except (ValueError, KeyError):
+                    logger.warning(f"Пропущена повреждённая запись в {self.path}")
+                offset += len(line)
+            self.scanned = offset
+
+    def load_index(self) -> bool:
+        if not os.path.exists(self.index_path):
+            return False
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.end = data["end"]
+        self.count = data["count"]
+        for pair, entry in data["pairs"].items():
+            self.offsets[pair] = array("q", entry["offsets"])
+            self.times[pair] = array("d", entry["ts"])
+        self.scanned = os.path.getsize(self.path)
+        self.sealed = True
+        return True
+
+    def seal(self):
+        """Фиксирует сегмент и сохраняет его индекс рядом с файлом"""
+        self.catch_up()
+        data = {
+            "start": self.start,
+            "end": self.end,
+            "count": self.count,
+            "pairs": {
+                pair: {
+                    "offsets": self.offsets[pair].tolist(),
+                    "ts": self.times[pair].tolist(),
+                }
+                for pair in self.offsets
+            },
+        }
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+        self.sealed = True
+
+    def read(
+        self,
+        pair: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> Iterator[dict]:
+        times = self.times.get(pair)
+        if not times:
+            return
+        lo = 0 if start is None else bisect_left(times, start)
+        hi = len(times) if end is None else bisect_right(times, end)
+        if lo >= hi:
+            return
+        offsets = self.offsets[pair]
+        with open(self.path, "rb") as f:
+            for i in range(lo, hi):
+                f.seek(offsets[i])
+                yield json.loads(f.readline())
+
+
+class RateHistoryStore:
+    """
+    История курсов в виде append-only сегментов NDJSON.
+
+    Запись — одна дописанная строка в активный сегмент (O(1)).
+    Сегмент закрывается по размеру или возрасту, и рядом сохраняется
+    его индекс (пара → смещения и время строк). Чтение диапазона открывает
+    только сегменты, пересекающие интервал, и читает только строки нужной пары.
+    Метки времени внутри пары предполагаются неубывающими.
+    """
+
+    def __init__(
+        self,
+        directory: str = config.HISTORY_DIR,
+        max_segment_bytes: int = config.HISTORY_SEGMENT_MAX_BYTES,
+        max_segment_seconds: int = config.HISTORY_SEGMENT_SECONDS,
+    ):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self._lock = threading.RLock()
+        self._segments: Dict[str, Segment] = {}
+        self._names: Optional[List[str]] = None
+        self._names_mtime = 0
+        self._names_listed = 0
+        self._subscribers: List[Callable[[List[dict]], None]] = []
+        os.makedirs(directory, exist_ok=True)
+
+    def subscribe(self, callback: Callable[[List[dict]], None]):
+        """callback(records) вызывается после каждой успешной записи"""
+        self._subscribers.append(callback)
+
+    def _segment_names(self) -> List[str]:
+        """
+        Отсортированные имена сегментов. Список кэшируется по mtime каталога
+        и перечитывается, только когда каталог изменился (в том числе другим
+        процессом) или список снят слишком близко к его последнему изменению.
+        """
+        mtime = os.stat(self.directory).st_mtime_ns
+        if (
+            self._names is None
+            or mtime != self._names_mtime
+            or self._names_listed - mtime < LISTING_RACY_NS
+        ):
+            self._names_listed = time.time_ns()
+            self._names = sorted(
+                name for name in os.listdir(self.directory)
+                if name.endswith(SEGMENT_SUFFIX)
+            )
+            self._names_mtime = mtime
+        return self._names
+
+    @staticmethod
+    def _segment_start(name: str) -> float:
+        return int(name[len("seg-"): -len(SEGMENT_SUFFIX)]) / 1000
+
+    def _segment(self, name: str) -> Segment:
+        segment = self._segments.get(name)
+        if segment is None:
+            segment = Segment(
+                os.path.join(self.directory, name), self._segment_start(name)
+            )
+            segment.load_index()
+            self._segments[name] = segment
+        if not segment.sealed:
+            segment.catch_up()
+        return segment
+
+    def segments(self) -> List[Segment]:
+        with self._lock:
+            return [self._segment(name) for name in self._segment_names()]
+
+    def _new_segment(self, start: float) -> Segment:
+        start_ms = int(start * 1000)
+        while True:
+            name = f"seg-{start_ms:015d}{SEGMENT_SUFFIX}"
+            path = os.path.join(self.directory, name)
+            if not os.path.exists(path):
+                break
+            start_ms += 1
+        open(path, "ab").close()
+        self._names = None
+        segment = Segment(path, start_ms / 1000)
+        self._segments[name] = segment
+        return segment
+
+    def _needs_rotation(self, segment: Segment, size: int, ts: float) -> bool:
+        return (
+            segment.sealed
+            or size >= self.max_segment_bytes
+            or ts - segment.start >= self.max_segment_seconds
+        )
+
+    def append_many(self, records: Iterable[dict]) -> int:
+        """
+        Дописывает записи в активный сегмент, по возможности одним вызовом write.
+        Сегменты ротируются по времени записей, поэтому имя сегмента —
+        это время его первой записи.
+        """
+        items = []
+        appended = []
+        for record in records:
+            record = dict(record)
+            record.setdefault("ts", record_ts(record))
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+            items.append(
+                (record["ts"], record_pair(record), (line + "\n").encode("utf-8"))
+            )
+            appended.append(record)
+        if not items:
+            return 0
+
+        with self._lock:
+            names = self._segment_names()
+            segment = self._segment(names[-1]) if names else None
+            size = os.path.getsize(segment.path) if segment else 0
+            buffer: List[tuple] = []
+
+            for ts, pair, line in items:
+                if segment is None or self._needs_rotation(segment, size, ts):
+                    if segment is not None:
+                        self._write(segment, buffer)
+                        segment.seal()
+                    segment = self._new_segment(ts)
+                    size, buffer = 0, []
+                buffer.append((ts, pair, line))
+                size += len(line)
+
+            self._write(segment, buffer)
+
+        for callback in self._subscribers:
+            try:
+                callback(appended)
+            except Exception as exc:
+                logger.error(f"Ошибка обработчика истории курсов: {exc}")
+        return len(items)
+
+    @staticmethod
+    def _write(segment: Segment, lines: List[tuple]):
+        """Пишет строки (ts, pair, bytes) и сразу добавляет их в индекс сегмента"""
+        if not lines:
+            return
+        segment.catch_up()
+        with open(segment.path, "ab") as f:
+            offset = f.tell()
+            f.write(b"".join(line for _, _, line in lines))
+        if offset != segment.scanned:
+            # в сегмент одновременно писал другой процесс
+            segment.catch_up()
+            return
+        for ts, pair, line in lines:
+            segment.add(pair, offset, ts)
+            offset += len(line)
+        segment.scanned = offset
+
+    def append(self, record: dict):
+        self.append_many([record])
+
+    def read(
+        self,
+        pair: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> Iterator[dict]:
+        """Записи пары в интервале [start, end] (epoch), в порядке записи"""
+        with self._lock:
+            names = self._segment_names()
+            selected = []
+            for i, name in enumerate(names):
+                seg_start = self._segment_start(name)
+                next_start = (
+                    self._segment_start(names[i + 1])
+                    if i + 1 < len(names) else float("inf")
+                )
+                if end is not None and seg_start > end:
+                    break
+                if start is not None and next_start < start:
+                    continue
+                selected.append(self._segment(name))
+
+        for segment in selected:
+            yield from segment.read(pair, start, end)
+
+    def sealed_segments(self) -> List[Segment]:
+        """Закрытые сегменты (в них больше никто не пишет)"""
+        with self._lock:
+            names = self._segment_names()
+            return [
+                segment for segment in map(self._segment, names[:-1])
+                if segment.sealed
+            ]
+
+    def drop_segment(self, segment: Segment):
+        """Удаляет закрытый сегмент вместе с индексом"""
+        with self._lock:
+            self._segments.pop(os.path.basename(segment.path), None)
+            self._names = None
+            for path in (segment.path, segment.index_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def read_segment(self, segment: Segment) -> Iterator[dict]:
+        """Все записи сегмента в порядке записи"""
+        with open(segment.path, "rb") as f:
+            for line in f:
+                if line.endswith(b"\n"):
+                    yield json.loads(line)
+
+    def pairs(self) -> List[str]:
+        result = set()
+        for segment in self.segments():
+            result.update(segment.offsets)
+        return sorted(result)
+
+
+def migrate_history_array(
+    path: str = config.HISTORY_FILE_PATH,
+    store: Optional[RateHistoryStore] = None,
+) -> int:
+    """
+    Переносит массив records из exchange_rates.json в сегменты
+    и переименовывает исходный файл в *.migrated.
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            records = json.load(f).get("records", [])
+        except json.JSONDecodeError:
+            records = []
+
+    store = store or RateHistoryStore()
+    records.sort(key=record_ts)
+    count = store.append_many(records)
+    os.replace(path, path + ".migrated")
+    return count
+
+
+_store: Optional[RateHistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_history_store() -> RateHistoryStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RateHistoryStore()
+        return _store
+
+
+if __name__ == "__main__":
+    migrated = migrate_history_array()
+    print(f"Перенесено записей истории: {migrated}")
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from valutatrade_hub.parser_service.config import config
+
+HTTP_CACHE_DIR = config.HTTP_CACHE_DIR
+
+# Заголовки, которые нужны для повторной проверки и выдачи ответа из кеша
+_KEPT_HEADERS = (
+    "Cache-Control", "Content-Type", "Date", "ETag", "Expires", "Last-Modified",
+)
+
+
+def redact_url(url: str, secrets: Iterable[str]) -> str:
+    for secret in secrets:
+        if secret:
+            url = url.replace(secret, "***")
+    return url
+
+
+def _cache_control(headers) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def header_max_age(headers) -> Optional[float]:
+    """Срок свежести по Cache-Control: max-age или Expires (None — не указан)"""
+    directives = _cache_control(headers)
+    if "no-cache" in directives:
+        return 0.0
+    if directives.get("max-age"):
+        try:
+            return float(directives["max-age"])
+        except ValueError:
+            return 0.0
+    if headers.get("Expires"):
+        try:
+            expires = parsedate_to_datetime(headers["Expires"]).timestamp()
+        except (TypeError, ValueError):
+            return 0.0
+        return max(0.0, expires - time.time())
+    return None
+
+
+class CachedEntry:
+    """Сохранённый ответ; url — URL со скрытыми секретами (он же ключ)"""
+
+    __slots__ = ("url", "status", "headers", "body", "stored_at")
+
+    def __init__(
+        self, url: str, status: int, headers: dict, body: str, stored_at: float
+    ):
+        self.url = url
+        self.status = status
+        self.headers = CaseInsensitiveDict(headers)
+        self.body = body
+        self.stored_at = stored_at
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def is_fresh(
+        self, max_age: Optional[float], cap: Optional[float] = None
+    ) -> bool:
+        """
+        max_age — переопределение источника; иначе срок из заголовков.
+        cap — верхняя граница срока (например, TTL курсов) при любом источнике.
+        """
+        limit = max_age if max_age is not None else header_max_age(self.headers)
+        if limit is not None and cap is not None:
+            limit = min(limit, cap)
+        return bool(limit) and self.age() < limit
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.headers.get("ETag"):
+            headers["If-None-Match"] = self.headers["ETag"]
+        if self.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = self.headers["Last-Modified"]
+        return headers
+
+    def to_response(self) -> requests.Response:
+        response = requests.Response()
+        response.status_code = self.status
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.body.encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = self.url
+        response.from_cache = True
+        response.stored_at = self.stored_at
+        return response
+
+
+class ResponseCache:
+    """
+    Дисковый кеш HTTP-ответов источников курсов.
+
+    Ключ — URL запроса со скрытыми секретами (API-ключ не попадает
+    ни в имя файла, ни в его содержимое). Каждый ответ хранится в
+    отдельном JSON-файле вместе с заголовками ETag, Last-Modified
+    и Cache-Control, по которым решается, отдать ли тело без сети
+    или отправить условный запрос.
+    """
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, key: str) -> Optional[CachedEntry]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if data.get("url") != key:
+            return None
+        return CachedEntry(
+            key, data["status"], data["headers"], data["body"], data["stored_at"]
+        )
+
+    def put(self, key: str, response: requests.Response) -> Optional[CachedEntry]:
+        """Сохраняет ответ, если он кешируемый (200 без no-store)"""
+        if response.status_code != 200:
+            return None
+        if "no-store" in _cache_control(response.headers):
+            return None
+        headers = {
+            name: response.headers[name]
+            for name in _KEPT_HEADERS if name in response.headers
+        }
+        entry = CachedEntry(key, 200, headers, response.text, time.time())
+        self._write(entry)
+        return entry
+
+    def touch(self, entry: CachedEntry, response: requests.Response) -> CachedEntry:
+        """Ответ 304: тело прежнее, срок свежести и валидаторы — из нового ответа"""
+        for name in _KEPT_HEADERS:
+            if name in response.headers:
+                entry.headers[name] = response.headers[name]
+        entry.stored_at = time.time()
+        self._write(entry)
+        return entry
+
+    def _write(self, entry: CachedEntry):
+        data = {
+            "url": entry.url,
+            "status": entry.status,
+            "headers": dict(entry.headers),
+            "body": entry.body,
+            "stored_at": entry.stored_at,
+        }
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=self.directory, delete=False
+            ) as tf:
+                json.dump(data, tf, ensure_ascii=False)
+                temp_name = tf.name
+            os.replace(temp_name, self._path(entry.url))
+
+    def clear(self):
+        with self._lock:
+            if not os.path.isdir(self.directory):
+                return
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.directory, name))
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
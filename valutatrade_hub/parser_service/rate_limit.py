@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from valutatrade_hub.core.exceptions import RateLimitError
+from valutatrade_hub.parser_service.config import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: ограничение действует только внутри процесса
+    fcntl = None
+
+RATE_LIMIT_STATE_FILE = config.RATE_LIMIT_STATE_PATH
+
+_PERIOD_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m"}
+
+
+class TokenBucket:
+    """
+    Ограничитель запросов к источнику по алгоритму token bucket.
+
+    Корзина на burst токенов пополняется со скоростью per_minute в минуту,
+    каждый запрос забирает один токен. Состояние (токены, счётчик квоты)
+    хранится в общем файле под flock, поэтому лимит общий для всех потоков
+    и процессов. Если токена нет: policy="queue" — ждать его не дольше
+    max_wait, policy="reject" — сразу RateLimitError. Квота (quota запросов
+    за quota_period: day/month) при исчерпании всегда отклоняет запрос.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        per_minute: float,
+        burst: float = 1,
+        policy: str = "queue",
+        max_wait: float = 10.0,
+        quota: Optional[int] = None,
+        quota_period: str = "month",
+        state_path: str = RATE_LIMIT_STATE_FILE,
+    ):
+        if policy not in ("queue", "reject"):
+            raise ValueError(f"Неизвестная политика ограничения '{policy}'")
+        if per_minute <= 0:
+            # источник без ограничения просто не указывается в RATE_LIMITS
+            raise ValueError(f"{name}: per_minute должен быть положительным")
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.burst = float(burst)
+        self.policy = policy
+        self.max_wait = max_wait
+        self.quota = quota
+        self.quota_period = quota_period
+        self.state_path = state_path
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _state(self):
+        """Состояние всех источников под эксклюзивной блокировкой файла"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+            with os.fdopen(fd, "r+", encoding="utf-8") as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    try:
+                        states = json.loads(f.read() or "{}")
+                    except json.JSONDecodeError:
+                        states = {}
+                    # состояние сохраняется и когда запрос отклонён
+                    try:
+                        yield states.setdefault(self.name, {})
+                    finally:
+                        f.seek(0)
+                        f.truncate()
+                        f.write(json.dumps(states, ensure_ascii=False))
+                        f.flush()
+                finally:
+                    if fcntl:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _period(self) -> str:
+        return datetime.now(timezone.utc).strftime(_PERIOD_FORMATS[self.quota_period])
+
+    def _refill(self, state: dict, now: float):
+        tokens = state.get("tokens", self.burst)
+        updated = state.get("updated", now)
+        state["tokens"] = min(self.burst, tokens + (now - updated) * self.rate)
+        state["updated"] = now
+        period = self._period()
+        if state.get("period") != period:
+            state["period"] = period
+            state["used"] = 0
+
+    def acquire(self):
+        """Забирает токен перед запросом или бросает RateLimitError"""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            with self._state() as state:
+                self._refill(state, time.time())
+                if self.quota is not None and state["used"] >= self.quota:
+                    state["rejected"] = state.get("rejected", 0) + 1
+                    raise RateLimitError(
+                        f"{self.name}: исчерпана квота {self.quota} запросов "
+                        f"за период {state['period']}"
+                    )
+                if state["tokens"] >= 1:
+                    state["tokens"] -= 1
+                    state["used"] += 1
+                    return
+                wait = (1 - state["tokens"]) / self.rate
+                if self.policy == "reject" or time.monotonic() + wait > deadline:
+                    state["rejected"] = state.get("rejected", 0) + 1
+                    raise RateLimitError(
+                        f"{self.name}: превышен лимит запросов, "
+                        f"повтор через {wait:.1f} с"
+                    )
+            self.waited += wait
+            time.sleep(wait)
+
+    def charge(self, count: int):
+        """
+        Учитывает запросы, отправленные без acquire (повторы внутри сессии):
+        токены могут уйти в минус, и следующие запросы подождут дольше
+        """
+        if count <= 0:
+            return
+        with self._state() as state:
+            self._refill(state, time.time())
+            state["tokens"] -= count
+            state["used"] += count
+
+    def snapshot(self) -> dict:
+        with self._state() as state:
+            self._refill(state, time.time())
+            return {
+                "source": self.name,
+                "tokens": state["tokens"],
+                "burst": self.burst,
+                "per_minute": self.rate * 60,
+                "policy": self.policy,
+                "used": state["used"],
+                "quota": self.quota,
+                "period": state["period"],
+                "rejected": state.get("rejected", 0),
+            }
+
+
+_limiters: Dict[str, Optional[TokenBucket]] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str) -> Optional[TokenBucket]:
+    """Ограничитель источника по config.RATE_LIMITS (None — без ограничений)"""
+    with _limiters_lock:
+        if name not in _limiters:
+            settings = config.RATE_LIMITS.get(name)
+            _limiters[name] = TokenBucket(name, **settings) if settings else None
+        return _limiters[name]
+
+
+def limiter_states() -> List[dict]:
+    with _limiters_lock:
+        limiters = [limiter for limiter in _limiters.values() if limiter]
+    return [limiter.snapshot() for limiter in limiters]
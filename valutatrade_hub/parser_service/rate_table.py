@@ -0,0 +1,259 @@
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from valutatrade_hub.parser_service.config import config
+from valutatrade_hub.parser_service.rates_format import to_epoch
+
+try:
+    import fcntl
+except ImportError:  # Windows: публикации упорядочиваются только внутри процесса
+    fcntl = None
+
+RATE_TABLE_FILE = config.RATE_TABLE_FILE_PATH
+
+logger = logging.getLogger(__name__)
+
+# magic, version, flags, seq, generation, count, capacity
+_HEADER = struct.Struct("<4sHHQQII")
+# pair (ASCII, дополняется нулями), rate, ts
+_RECORD = struct.Struct("<16sdd")
+_SEQ = struct.Struct("<Q")
+_SEQ_OFFSET = 8
+_KEY_SIZE = 16
+
+MAGIC = b"VTRT"
+VERSION = 1
+FLAG_RETIRED = 1
+_MAX_SPINS = 1000
+
+_publish_lock = threading.Lock()
+
+
+def _encode(pairs: Dict[str, dict]) -> list:
+    rows = []
+    for key, info in pairs.items():
+        raw = key.encode("ascii")
+        if len(raw) > _KEY_SIZE:
+            logger.warning(f"Пара {key} не помещается в таблицу курсов, пропущена")
+            continue
+        ts = to_epoch(info.get("updated_at") or info.get("timestamp"))
+        rows.append((raw, float(info["rate"]), ts))
+    rows.sort()
+    return rows
+
+
+def _write_rows(buf, rows: list, generation: int):
+    seq = _SEQ.unpack_from(buf, _SEQ_OFFSET)[0]
+    # нечётный seq — запись в процессе, читатели повторяют попытку;
+    # нечётное значение от прерванной записи пропускается
+    writing = seq + 2 if seq & 1 else seq + 1
+    _SEQ.pack_into(buf, _SEQ_OFFSET, writing)
+    _, _, flags, _, _, _, capacity = _HEADER.unpack_from(buf, 0)
+    _HEADER.pack_into(
+        buf, 0, MAGIC, VERSION, flags, writing, generation, len(rows), capacity
+    )
+    for i, row in enumerate(rows):
+        _RECORD.pack_into(buf, _HEADER.size + i * _RECORD.size, *row)
+    _SEQ.pack_into(buf, _SEQ_OFFSET, writing + 1)
+
+
+@contextmanager
+def _exclusive(path: str):
+    """
+    Один писатель таблицы на все потоки и процессы: seqlock защищает
+    читателей, но не разводит параллельных писателей (их записи
+    перемешались бы при одинаковом чётном seq). Блокировка — flock
+    на соседнем файле path.lock, который не подменяется os.replace.
+    """
+    with _publish_lock:
+        fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+def publish_rate_table(pairs: Dict[str, dict], path: str = RATE_TABLE_FILE):
+    """
+    Публикует бинарную таблицу курсов для чтения через mmap.
+
+    Если набор пар помещается в текущий файл, записи обновляются на месте
+    под seqlock. Иначе создаётся новый файл с запасом ёмкости, атомарно
+    подменяется через os.replace, а старый помечается как выведенный,
+    чтобы читатели переоткрыли путь. Вся последовательность выполняется
+    под эксклюзивной блокировкой писателя.
+    """
+    rows = _encode(pairs)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _exclusive(path):
+        _publish(rows, path)
+
+
+def _publish(rows: list, path: str):
+    old = None
+    try:
+        with open(path, "r+b") as f:
+            old = mmap.mmap(f.fileno(), 0)
+    except (FileNotFoundError, ValueError):
+        pass
+
+    try:
+        generation = 1
+        if old is not None and len(old) >= _HEADER.size:
+            magic, version, _, _, prev, _, capacity = _HEADER.unpack_from(old, 0)
+            if magic == MAGIC and version == VERSION:
+                generation = prev + 1
+                if len(rows) <= capacity:
+                    _write_rows(old, rows, generation)
+                    old.flush()
+                    return
+
+        capacity = max(64, len(rows) * 2)
+        size = _HEADER.size + capacity * _RECORD.size
+        buf = bytearray(size)
+        _HEADER.pack_into(buf, 0, MAGIC, VERSION, 0, 0, 0, 0, capacity)
+        _write_rows(buf, rows, generation)
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=os.path.dirname(path) or ".", delete=False
+        ) as tf:
+            tf.write(buf)
+            temp_name = tf.name
+        os.replace(temp_name, path)
+
+        if old is not None and len(old) >= _HEADER.size:
+            flags = struct.unpack_from("<H", old, 6)[0]
+            struct.pack_into("<H", old, 6, flags | FLAG_RETIRED)
+            old.flush()
+    finally:
+        if old is not None:
+            old.close()
+
+
+class RateTable:
+    """
+    Читатель бинарной таблицы курсов (data/rates.bin) без разбора JSON.
+
+    Файл отображается в память один раз. Поиск пары — бинарный поиск
+    по отсортированным ключам фиксированной длины. Согласованность
+    чтения обеспечивает seqlock: значение seq читается до и после
+    выборки, нечётное или изменившееся значение означает параллельную
+    запись, и чтение повторяется.
+    """
+
+    def __init__(self, path: str = RATE_TABLE_FILE):
+        self.path = path
+        self.retries = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+
+    def _open(self) -> bool:
+        self._close()
+        try:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            self._close()
+            return False
+        if len(self._map) < _HEADER.size or self._map[:4] != MAGIC:
+            self._close()
+            return False
+        return True
+
+    def _close(self):
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._map = self._file = None
+
+    def _read(self, reader):
+        """Выполняет reader(buf, count) под seqlock и возвращает (generation, result)"""
+        if self._map is None and not self._open():
+            return 0, None
+        for _ in range(_MAX_SPINS):
+            buf = self._map
+            _, _, flags, seq, generation, count, _ = _HEADER.unpack_from(buf, 0)
+            if flags & FLAG_RETIRED:
+                if not self._open():
+                    return 0, None
+                continue
+            if seq & 1:
+                self.retries += 1
+                time.sleep(0)
+                continue
+            result = reader(buf, count)
+            if _SEQ.unpack_from(buf, _SEQ_OFFSET)[0] == seq:
+                return generation, result
+            self.retries += 1
+        logger.warning(f"Таблица курсов {self.path} занята записью, чтение отменено")
+        return 0, None
+
+    @staticmethod
+    def _find(buf, count: int, key: bytes) -> Optional[Tuple[float, float]]:
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = _HEADER.size + mid * _RECORD.size
+            probe = buf[offset:offset + _KEY_SIZE]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                _, rate, ts = _RECORD.unpack_from(buf, offset)
+                return rate, ts
+        return None
+
+    def get(self, pair_key: str) -> Optional[Tuple[float, float]]:
+        """(rate, updated_ts) пары или None"""
+        key = pair_key.upper().encode("ascii").ljust(_KEY_SIZE, b"\0")
+        with self._lock:
+            return self._read(lambda buf, count: self._find(buf, count, key))[1]
+
+    @property
+    def generation(self) -> int:
+        with self._lock:
+            return self._read(lambda buf, count: None)[0]
+
+    def items(self) -> Iterator[Tuple[str, float, float]]:
+        """Согласованный снимок всех записей: (pair, rate, ts)"""
+        def read_all(buf, count):
+            return [
+                _RECORD.unpack_from(buf, _HEADER.size + i * _RECORD.size)
+                for i in range(count)
+            ]
+
+        with self._lock:
+            rows = self._read(read_all)[1] or []
+        return (
+            (raw.rstrip(b"\0").decode("ascii"), rate, ts) for raw, rate, ts in rows
+        )
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+_tables: Dict[str, RateTable] = {}
+_tables_lock = threading.Lock()
+
+
+def get_rate_table(path: str = RATE_TABLE_FILE) -> RateTable:
+    """Одно отображение таблицы на файл в пределах процесса"""
+    key = os.path.abspath(path)
+    with _tables_lock:
+        if key not in _tables:
+            _tables[key] = RateTable(path)
+        return _tables[key]
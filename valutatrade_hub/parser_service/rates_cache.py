@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from valutatrade_hub.parser_service.config import config
+from valutatrade_hub.parser_service.rates_format import (
+    decode_pairs,
+    is_compact,
+    iter_columns,
+    to_epoch,
+    to_iso,
+)
+
+RATES_FILE = config.RATES_FILE_PATH
+
+# (rate, updated_ts, updated_at) — время как epoch float и исходная ISO-строка
+RateEntry = Tuple[float, float, str]
+
+
+def checked_path(path: str) -> str:
+    """
+    Файл подтверждений рядом с rates.json: время последнего успешного
+    опроса каждого источника. Пишется, даже когда сам снимок не менялся.
+    """
+    base, ext = os.path.splitext(path)
+    return f"{base}.checked{ext or '.json'}"
+
+
+def _stat_stamp(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class RatesCache:
+    """
+    Кеш rates.json в памяти процесса.
+
+    Файл разбирается один раз; перед каждым обращением проверяется только
+    os.stat (mtime, размер, inode). Пока они не изменились — ответ из памяти (hit),
+    иначе файл перечитывается (miss). Временные метки переводятся в epoch float
+    при разборе, чтобы не вызывать datetime.fromisoformat на каждый запрос.
+    Файл подтверждений (checked_path) учитывается отдельно и не сбрасывает кеш.
+    """
+
+    def __init__(self, path: str = RATES_FILE):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._stamp: Optional[tuple] = None
+        self._data: dict = {"pairs": {}, "last_refresh": None}
+        self._pairs: Optional[dict] = None
+        self._entries: Dict[str, RateEntry] = {}
+        self._sources: Dict[str, str] = {}
+
+        self.checked_path = checked_path(path)
+        self._checked_stamp: Optional[tuple] = None
+        self._checked: Dict[str, float] = {}
+        self._checked_refresh: Optional[str] = None
+
+    def _revalidate(self):
+        stamp = _stat_stamp(self.path)
+        if stamp is not None and stamp == self._stamp:
+            self.hits += 1
+            return
+
+        self.misses += 1
+        self._stamp = stamp
+        self._load()
+
+    def _revalidate_checked(self):
+        stamp = _stat_stamp(self.checked_path)
+        if stamp == self._checked_stamp:
+            return
+        self._checked_stamp = stamp
+        data: dict = {}
+        if stamp is not None:
+            with open(self.checked_path, "r", encoding="utf-8") as f:
+                try:
+                    data = json.load(f)
+                except json.JSONDecodeError:
+                    pass
+        self._checked = data.get("sources", {})
+        self._checked_refresh = data.get("last_refresh")
+
+    def _load(self):
+        data = {"pairs": {}, "last_refresh": None}
+        if self._stamp is not None:
+            with open(self.path, "r", encoding="utf-8") as f:
+                try:
+                    data = json.load(f)
+                except json.JSONDecodeError:
+                    pass
+
+        entries: Dict[str, RateEntry] = {}
+        sources: Dict[str, str] = {}
+        if is_compact(data):
+            # пары одного опроса источника делят метку времени
+            labels: Dict[float, str] = {}
+            for key, rate, ts, source in iter_columns(data):
+                label = labels.get(ts)
+                if label is None:
+                    label = labels[ts] = to_iso(ts)
+                entries[key] = (rate, ts, label)
+                sources[key] = source
+        else:
+            for key, info in data.get("pairs", {}).items():
+                updated_at = info.get("updated_at") or info.get("timestamp") or ""
+                entries[key] = (
+                    float(info["rate"]), to_epoch(updated_at), updated_at
+                )
+                sources[key] = info.get("source", "")
+
+        self._data = data
+        self._pairs = None
+        self._entries = entries
+        self._sources = sources
+        self.generation += 1
+
+    def get(self, pair_key: str) -> Optional[RateEntry]:
+        """Курс пары вида 'BTC_USD' или None, если её нет в кеше"""
+        with self._lock:
+            self._revalidate()
+            return self._entries.get(pair_key)
+
+    def entries(self) -> Tuple[int, Dict[str, RateEntry]]:
+        """Поколение снимка и все пары (только для чтения)"""
+        with self._lock:
+            self._revalidate()
+            return self.generation, self._entries
+
+    def pairs(self) -> dict:
+        """Пары в прежнем виде rates.json (только для чтения)"""
+        with self._lock:
+            self._revalidate()
+            if self._pairs is None:
+                self._pairs = decode_pairs(self._data)
+            return self._pairs
+
+    def confirmed_at(self, pair_key: str) -> float:
+        """Время последнего опроса источника пары, подтвердившего её курс"""
+        with self._lock:
+            self._revalidate()
+            self._revalidate_checked()
+            return self._checked.get(self._sources.get(pair_key, ""), 0.0)
+
+    @property
+    def last_refresh(self) -> Optional[str]:
+        with self._lock:
+            self._revalidate()
+            self._revalidate_checked()
+            candidates = [self._data.get("last_refresh"), self._checked_refresh]
+            return max((c for c in candidates if c), default=None)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def invalidate(self):
+        with self._lock:
+            self._stamp = None
+
+
+_caches: Dict[str, RatesCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_rates_cache(path: str = RATES_FILE) -> RatesCache:
+    """Один кеш на файл в пределах процесса"""
+    key = os.path.abspath(path)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = RatesCache(path)
+        return _caches[key]
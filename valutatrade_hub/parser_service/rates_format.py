@@ -0,0 +1,120 @@
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional, Tuple
+
+FORMAT_VERSION = 2
+
+
+def to_epoch(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    return datetime.fromisoformat(value).timestamp()
+
+
+def to_iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else ""
+
+
+def is_compact(data: dict) -> bool:
+    return data.get("format") == FORMAT_VERSION
+
+
+def encode_rates(pairs: Dict[str, dict], last_refresh: Optional[str]) -> dict:
+    """
+    Снимок курсов в компактном формате версии 2:
+
+    {
+      "format": 2,
+      "last_refresh": ISO,
+      "sources": [{"source": "CoinGecko", "meta": {"status_code": 200}}, ...],
+      "columns": {"pair": [...], "rate": [...], "ts": [...], "src": [...]},
+      "pair_meta": {"BTC_USD": {"raw_id": "bitcoin"}}
+    }
+
+    Общие для источника поля meta хранятся один раз в sources,
+    отличающиеся — в разреженном pair_meta; время — epoch float.
+    """
+    grouped: Dict[str, list] = {}
+    for key, info in pairs.items():
+        grouped.setdefault(info.get("source", ""), []).append(key)
+
+    sources = []
+    source_index: Dict[str, int] = {}
+    common_meta: Dict[str, dict] = {}
+    for source, keys in grouped.items():
+        metas = [pairs[key].get("meta") or {} for key in keys]
+        common = dict(metas[0])
+        for meta in metas[1:]:
+            common = {k: v for k, v in common.items() if meta.get(k) == v}
+        source_index[source] = len(sources)
+        common_meta[source] = common
+        sources.append({"source": source, "meta": common})
+
+    columns = {"pair": [], "rate": [], "ts": [], "src": []}
+    pair_meta: Dict[str, dict] = {}
+    for key, info in pairs.items():
+        source = info.get("source", "")
+        columns["pair"].append(key)
+        columns["rate"].append(float(info["rate"]))
+        columns["ts"].append(
+            to_epoch(info.get("updated_at") or info.get("timestamp"))
+        )
+        columns["src"].append(source_index[source])
+        extra = {
+            k: v for k, v in (info.get("meta") or {}).items()
+            if k not in common_meta[source]
+        }
+        if extra:
+            pair_meta[key] = extra
+
+    return {
+        "format": FORMAT_VERSION,
+        "last_refresh": last_refresh,
+        "sources": sources,
+        "columns": columns,
+        "pair_meta": pair_meta,
+    }
+
+
+def iter_columns(data: dict) -> Iterator[Tuple[str, float, float, str]]:
+    """(pair, rate, ts, source) без построения словарей по парам"""
+    columns = data.get("columns", {})
+    sources = [block["source"] for block in data.get("sources", [])]
+    return zip(
+        columns.get("pair", []),
+        columns.get("rate", []),
+        columns.get("ts", []),
+        (sources[i] for i in columns.get("src", [])),
+    )
+
+
+def decode_pairs(data: dict) -> Dict[str, dict]:
+    """Пары в прежнем формате rates.json (словарь словарей)"""
+    if not is_compact(data):
+        return data.get("pairs", {})
+
+    metas = [block.get("meta", {}) for block in data.get("sources", [])]
+    pair_meta = data.get("pair_meta", {})
+    pairs: Dict[str, dict] = {}
+    columns = data.get("columns", {})
+    for key, rate, ts, src in zip(
+        columns.get("pair", []),
+        columns.get("rate", []),
+        columns.get("ts", []),
+        columns.get("src", []),
+    ):
+        pairs[key] = {
+            "rate": rate,
+            "timestamp": to_iso(ts),
+            "source": data["sources"][src]["source"],
+            "meta": {**metas[src], **pair_meta.get(key, {})},
+        }
+    return pairs
+
+
+def dumps_rates(pairs: Dict[str, dict], last_refresh: Optional[str]) -> str:
+    return json.dumps(
+        encode_rates(pairs, last_refresh),
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
@@ -0,0 +1,169 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: lock-файл через O_CREAT | O_EXCL
+    fcntl = None
+
+from valutatrade_hub.parser_service.api_clients import (
+    CoinGeckoClient,
+    ExchangeRateApiClient,
+)
+from valutatrade_hub.parser_service.config import config
+from valutatrade_hub.parser_service.updater import RatesUpdater
+
+REFRESH_LOCK_FILE = config.REFRESH_LOCK_FILE_PATH
+
+logger = logging.getLogger(__name__)
+
+
+def _default_updater() -> RatesUpdater:
+    return RatesUpdater(clients=[ExchangeRateApiClient(), CoinGeckoClient()])
+
+
+class BackgroundRefresher:
+    """
+    Фоновое обновление курсов «в один полёт» (single-flight).
+
+    В пределах процесса одновременно выполняется не больше одного
+    обновления. Между процессами обновление защищено flock на lock-файле:
+    блокировку снимает ядро при завершении процесса, поэтому брошенных
+    блокировок не бывает. Без fcntl файл создаётся через O_CREAT | O_EXCL,
+    и файл старше lock_timeout считается брошенным.
+
+    После неудачного обновления новое не запускается failure_cooldown секунд,
+    чтобы операции в окне устаревания не дёргали API на каждый запрос курса.
+    """
+
+    def __init__(
+        self,
+        lock_path: str = REFRESH_LOCK_FILE,
+        lock_timeout: float = config.REFRESH_LOCK_TIMEOUT_SECONDS,
+        updater_factory: Callable = _default_updater,
+        failure_cooldown: float = config.REFRESH_FAILURE_COOLDOWN_SECONDS,
+    ):
+        self.lock_path = lock_path
+        self.lock_timeout = lock_timeout
+        self.updater_factory = updater_factory
+        self.failure_cooldown = failure_cooldown
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._lock_fd: Optional[int] = None
+        self._failed_at: Optional[float] = None
+
+    def _acquire_file(self) -> bool:
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        if fcntl is None:
+            return self._acquire_exclusive()
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._lock_fd = fd
+        return True
+
+    def _acquire_exclusive(self) -> bool:
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    age = time.time() - os.path.getmtime(self.lock_path)
+                except FileNotFoundError:
+                    continue
+                if age < self.lock_timeout:
+                    return False
+                logger.warning(
+                    f"Брошенный lock-файл обновления курсов ({age:.0f} с), удаляем"
+                )
+                try:
+                    os.remove(self.lock_path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(str(os.getpid()))
+            return True
+        return False
+
+    def _release_file(self):
+        if self._lock_fd is not None:
+            # файл не удаляем: иначе другой процесс мог бы взять flock
+            # на удалённый inode, а третий — на новый файл
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+            return
+        try:
+            os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+
+    def _cooling_down(self) -> bool:
+        return (
+            self._failed_at is not None
+            and time.monotonic() - self._failed_at < self.failure_cooldown
+        )
+
+    def request(self) -> bool:
+        """
+        Запускает фоновое обновление, если оно ещё не идёт
+        ни в этом, ни в другом процессе. True — обновление запущено.
+        """
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return False
+            if self._cooling_down():
+                return False
+            if not self._acquire_file():
+                return False
+            # не daemon: процесс CLI дождётся обновления (оно ограничено
+            # дедлайном RatesUpdater) и успеет удалить lock-файл
+            self._thread = threading.Thread(
+                target=self._run, name="rates-refresh"
+            )
+            self._thread.start()
+            return True
+
+    def _run(self):
+        failed = True
+        try:
+            count = self.updater_factory().run_update()
+            failed = count == 0
+            logger.info(f"Фоновое обновление курсов завершено: {count} пар")
+        except Exception as exc:
+            logger.error(f"Ошибка фонового обновления курсов: {exc}")
+        finally:
+            with self._lock:
+                self._failed_at = time.monotonic() if failed else None
+            self._release_file()
+
+    @property
+    def running(self) -> bool:
+        with self._lock:
+            return bool(self._thread and self._thread.is_alive())
+
+    def wait(self, timeout: Optional[float] = None):
+        thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+
+_refresher: Optional[BackgroundRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def get_refresher() -> BackgroundRefresher:
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = BackgroundRefresher()
+        return _refresher
@@ -0,0 +1,213 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.parser_service.config import config
+from valutatrade_hub.parser_service.history import (
+    RateHistoryStore,
+    get_history_store,
+    record_ohlc,
+    record_pair,
+    record_ts,
+)
+
+settings = SettingsLoader()
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
+MINUTE_DIR = os.path.join(config.HISTORY_DIR, "1m")
+HOUR_DIR = os.path.join(config.HISTORY_DIR, "1h")
+
+
+def rollup_records(records: List[dict], interval: int) -> List[dict]:
+    """
+    Сворачивает тики или свечи в свечи интервала interval.
+
+    Тик считается свечой с open = high = low = close = rate и count = 1.
+    Результирующая запись — обычная запись истории: rate = close,
+    ts = время последнего тика в свече, плюс поля ohlc и interval.
+    Читатели истории берут open/high/low/count из ohlc (history.record_ohlc);
+    частичные свечи одного интервала при чтении объединяются.
+    """
+    by_pair: Dict[str, List[dict]] = {}
+    for record in records:
+        by_pair.setdefault(record_pair(record), []).append(record)
+
+    result: List[dict] = []
+    for pair, items in by_pair.items():
+        items.sort(key=record_ts)
+        ts = np.fromiter((record_ts(r) for r in items), dtype=np.float64)
+        columns = [record_ohlc(r) for r in items]
+        opens = np.array([c[0] for c in columns], dtype=np.float64)
+        highs = np.array([c[1] for c in columns], dtype=np.float64)
+        lows = np.array([c[2] for c in columns], dtype=np.float64)
+        closes = np.array([c[3] for c in columns], dtype=np.float64)
+        counts = np.array([c[4] for c in columns], dtype=np.int64)
+
+        buckets = np.floor_divide(ts, interval).astype(np.int64)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+        ends = np.concatenate((starts[1:], [ts.size]))
+
+        high = np.maximum.reduceat(highs, starts)
+        low = np.minimum.reduceat(lows, starts)
+        count = np.add.reduceat(counts, starts)
+        from_code, _, to_code = pair.partition("_")
+        for i, (lo, hi) in enumerate(zip(starts.tolist(), ends.tolist())):
+            last = items[hi - 1]
+            result.append({
+                "id": f"{pair}_{int(buckets[lo]) * interval}_{interval}",
+                "from_currency": from_code,
+                "to_currency": to_code,
+                "rate": float(closes[hi - 1]),
+                "timestamp": last["timestamp"],
+                "ts": float(ts[hi - 1]),
+                "source": last.get("source", ""),
+                "interval": interval,
+                "ohlc": {
+                    "start": int(buckets[lo]) * interval,
+                    "open": float(opens[lo]),
+                    "high": float(high[i]),
+                    "low": float(low[i]),
+                    "close": float(closes[hi - 1]),
+                    "count": int(count[i]),
+                },
+            })
+    result.sort(key=lambda r: r["ts"])
+    return result
+
+
+class HistoryRetention:
+    """
+    Многоуровневое хранение истории курсов:
+    сырые тики — RAW_DAYS дней, затем минутные свечи — MINUTE_DAYS дней,
+    затем часовые — HOUR_DAYS дней, после чего записи удаляются.
+
+    Компактизация работает только с закрытыми сегментами, поэтому запись
+    новых тиков планировщиком не блокируется (кроме коротких удалений файлов).
+    """
+
+    def __init__(
+        self,
+        raw: Optional[RateHistoryStore] = None,
+        minute: Optional[RateHistoryStore] = None,
+        hour: Optional[RateHistoryStore] = None,
+    ):
+        self.raw = raw or get_history_store()
+        self.minute = minute or RateHistoryStore(MINUTE_DIR)
+        self.hour = hour or RateHistoryStore(HOUR_DIR)
+        self.raw_days = settings.get("HISTORY_RAW_DAYS", 7)
+        self.minute_days = settings.get("HISTORY_MINUTE_DAYS", 30)
+        self.hour_days = settings.get("HISTORY_HOUR_DAYS", 365)
+
+        self._compact_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _roll(
+        self,
+        source: RateHistoryStore,
+        target: Optional[RateHistoryStore],
+        interval: int,
+        max_age_days: float,
+        now: float,
+    ) -> int:
+        cutoff = now - max_age_days * DAY
+        expired: List = []
+        for segment in source.sealed_segments():
+            if segment.end >= cutoff:
+                break
+            expired.append(segment)
+
+        moved = 0
+        carry: List[dict] = []
+        written: List = []
+        for n, segment in enumerate(expired):
+            if target is not None:
+                records = carry + list(source.read_segment(segment))
+                carry = []
+                if n + 1 < len(expired):
+                    # интервал на границе сегментов дописывается вместе со
+                    # следующим сегментом, чтобы не разбивать его на две свечи
+                    edge = segment.end // interval
+                    carry = [r for r in records if record_ts(r) // interval == edge]
+                    records = [r for r in records if record_ts(r) // interval != edge]
+                target.append_many(rollup_records(records, interval))
+            moved += segment.count
+            written.append(segment)
+            if not carry:
+                # удаляем сегменты, только когда все их записи уже свёрнуты
+                for done in written:
+                    source.drop_segment(done)
+                written = []
+        return moved
+
+    def compact(self, now: Optional[float] = None) -> dict:
+        """Один проход компактизации по всем уровням"""
+        now = now or time.time()
+        with self._compact_lock:
+            stats = {
+                "raw_to_minute": self._roll(
+                    self.raw, self.minute, 60, self.raw_days, now
+                ),
+                "minute_to_hour": self._roll(
+                    self.minute, self.hour, 60 * 60, self.minute_days, now
+                ),
+                "hour_dropped": self._roll(
+                    self.hour, None, 0, self.hour_days, now
+                ),
+            }
+        if any(stats.values()):
+            logger.info(f"Компактизация истории курсов: {stats}")
+        return stats
+
+    def read(
+        self,
+        pair: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> Iterator[dict]:
+        """Записи пары по всем уровням: часовые, минутные, затем сырые"""
+        for store in (self.hour, self.minute, self.raw):
+            yield from store.read(pair, start, end)
+
+    def start(
+        self,
+        interval: float = settings.get("HISTORY_COMPACTION_INTERVAL_SECONDS", 3600),
+    ):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), name="history-retention", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self, interval: float):
+        while not self._stop_event.is_set():
+            try:
+                self.compact()
+            except Exception as exc:
+                logger.error(f"Ошибка компактизации истории курсов: {exc}")
+            self._stop_event.wait(interval)
+
+
+_retention: Optional[HistoryRetention] = None
+_retention_lock = threading.Lock()
+
+
+def get_history_retention() -> HistoryRetention:
+    global _retention
+    with _retention_lock:
+        if _retention is None:
+            _retention = HistoryRetention()
+        return _retention
@@ -1,31 +1,80 @@
+import heapq
 import logging
+import random
 import threading
 import time
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
 
-from .api_clients import CoinGeckoClient, ExchangeRateApiClient
+from .api_clients import BaseApiClient, CoinGeckoClient, ExchangeRateApiClient
 from .config import config
+from .retention import get_history_retention
 from .updater import RatesUpdater
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class SourceSchedule:
+    """Расписание и состояние опроса одного источника"""
+    client: BaseApiClient
+    updater: RatesUpdater
+    interval: float
+    next_run: float = 0.0
+    last_run: Optional[float] = None
+    last_duration: Optional[float] = None
+    last_error: Optional[str] = None
+    failures: int = 0
+    runs: int = 0
+
+    @property
+    def name(self) -> str:
+        return self.client.__class__.__name__
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
 class RateUpdaterScheduler:
     """
     Планировщик периодического обновления курсов.
+
+    Каждый источник опрашивается по своему периоду (client.update_interval):
+    ближайший запуск берётся из кучи, а поток ждёт его через
+    Event.wait(timeout), поэтому stop() срабатывает сразу. К периоду
+    добавляется случайный разброс ±jitter, после ошибок период растёт
+    экспоненциально (не больше backoff_max).
     """
 
-    def __init__(self, interval: int = config.UPDATE_INTERVAL_SECONDS):
-        self.interval = interval
+    def __init__(
+        self,
+        interval: Optional[int] = None,
+        clients: Optional[List[BaseApiClient]] = None,
+        jitter: float = config.SCHEDULER_JITTER,
+        backoff_max: float = config.SCHEDULER_BACKOFF_MAX_SECONDS,
+    ):
+        self.jitter = jitter
+        self.backoff_max = backoff_max
         self._stop_event = threading.Event()
         self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
 
-        self.updater = RatesUpdater(
-            clients=[
-                ExchangeRateApiClient(),
-                CoinGeckoClient(),
-            ]
-        )
+        clients = clients or [ExchangeRateApiClient(), CoinGeckoClient()]
+        # каждый источник пишет только свои пары, поэтому снимок обновляется
+        # в дельта-режиме: пары других источников сохраняются как есть
+        self.sources = [
+            SourceSchedule(
+                client=client,
+                updater=RatesUpdater(clients=[client], delta=True),
+                interval=interval or client.update_interval,
+            )
+            for client in clients
+        ]
+        self._heap: List[tuple] = []
 
     def start(self):
         if self._thread and self._thread.is_alive():
@@ -33,35 +82,92 @@ class RateUpdaterScheduler:
             return
 
         self._stop_event.clear()
+        now = time.monotonic()
+        with self._lock:
+            self._heap = []
+            for i, source in enumerate(self.sources):
+                source.next_run = now
+                heapq.heappush(self._heap, (now, i))
         self._thread = threading.Thread(target=self._run, daemon=True)
         self._thread.start()
+        get_history_retention().start()
 
-        logger.info(f"RateUpdaterScheduler started (interval={self.interval}s)")
+        intervals = ", ".join(f"{s.name}={s.interval}s" for s in self.sources)
+        logger.info(f"RateUpdaterScheduler started ({intervals})")
 
     def stop(self):
         self._stop_event.set()
         if self._thread:
             self._thread.join()
+        get_history_retention().stop()
         logger.info("RateUpdaterScheduler stopped")
 
+    def _delay(self, source: SourceSchedule) -> float:
+        delay = source.interval
+        if source.failures:
+            delay = min(
+                source.interval * 2 ** source.failures,
+                max(self.backoff_max, source.interval),
+            )
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
     def _run(self):
         while not self._stop_event.is_set():
-            try:
-                count = self.updater.run_update()
-                logger.info(
-                    f"[{datetime.now().isoformat()}Z] "
-                    f"Updated {count} currency pairs"
-                )
-            except Exception as exc:
-                logger.error(
-                    f"[{datetime.now().isoformat()}Z] "
-                    f"Update error: {exc}"
-                )
-
-            for _ in range(self.interval):
-                if self._stop_event.is_set():
-                    break
-                time.sleep(1)
+            with self._lock:
+                next_run, i = self._heap[0]
+            if self._stop_event.wait(max(0.0, next_run - time.monotonic())):
+                break
+
+            with self._lock:
+                heapq.heappop(self._heap)
+            source = self.sources[i]
+            self._run_source(source)
+
+            with self._lock:
+                source.next_run = time.monotonic() + self._delay(source)
+                heapq.heappush(self._heap, (source.next_run, i))
+
+    def _run_source(self, source: SourceSchedule):
+        started = time.monotonic()
+        error: Optional[str] = None
+        try:
+            count = source.updater.run_update()
+            error = source.updater.last_report.get("errors", {}).get(source.name)
+        except Exception as exc:
+            count = 0
+            error = str(exc)
+
+        with self._lock:
+            source.runs += 1
+            source.last_run = time.time()
+            source.last_duration = time.monotonic() - started
+            source.last_error = error
+            source.failures = source.failures + 1 if error else 0
+
+        timestamp = datetime.now(timezone.utc).isoformat()
+        if error:
+            logger.error(f"[{timestamp}] {source.name} update error: {error}")
+        else:
+            logger.info(f"[{timestamp}] {source.name} updated {count} currency pairs")
+
+    def status(self) -> List[dict]:
+        """Состояние каждого источника: период, следующий запуск, ошибки"""
+        now, wall = time.monotonic(), time.time()
+        with self._lock:
+            return [
+                {
+                    "source": source.name,
+                    "interval": source.interval,
+                    "next_run": _iso(wall + max(0.0, source.next_run - now))
+                    if self._thread and self._thread.is_alive() else None,
+                    "last_run": _iso(source.last_run),
+                    "last_duration": source.last_duration,
+                    "last_error": source.last_error,
+                    "failures": source.failures,
+                    "runs": source.runs,
+                }
+                for source in self.sources
+            ]
 
 
 scheduler = RateUpdaterScheduler()
@@ -0,0 +1,255 @@
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+import string
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from valutatrade_hub.parser_service.config import config
+
+logger = logging.getLogger(__name__)
+
+
+def fixture_key(url: str) -> str:
+    """'https://host/path?query' → 'host/path?query' (ключ записи)"""
+    parts = urlsplit(url)
+    key = f"{parts.netloc}{parts.path}"
+    return f"{key}?{parts.query}" if parts.query else key
+
+
+def replay_url(url: str, base: str) -> str:
+    """URL источника → URL подменного сервера: base/host/path?query"""
+    return f"{base.rstrip('/')}/{fixture_key(url)}"
+
+
+class FixtureStore:
+    """Записанные ответы источников: по JSON-файлу на ключ fixture_key"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def save(self, key: str, status: int, content_type: str, body: str):
+        data = {
+            "key": key,
+            "status": status,
+            "content_type": content_type,
+            "body": body,
+        }
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=self.directory, delete=False
+            ) as tf:
+                json.dump(data, tf, ensure_ascii=False)
+                temp_name = tf.name
+            os.replace(temp_name, self._path(key))
+
+    def load(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return data if data.get("key") == key else None
+
+
+def record_response(key: str, response):
+    """Режим записи (HTTP_RECORD): сохраняет успешный ответ источника"""
+    if response.status_code != 200:
+        return
+    FixtureStore(config.FIXTURES_DIR).save(
+        key,
+        response.status_code,
+        response.headers.get("Content-Type", "application/json"),
+        response.text,
+    )
+
+
+def _synthetic_codes(count: int) -> list:
+    letters = itertools.product(string.ascii_uppercase, repeat=3)
+    return ["".join(code) for code in itertools.islice(letters, count)]
+
+
+class SyntheticSource:
+    """
+    Генератор ответов CoinGecko и ExchangeRate-API для пар, которых нет
+    среди записанных: pairs фиатных валют и coins монет со случайными курсами.
+    """
+
+    def __init__(self, pairs: int, coins: int, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.fiat = _synthetic_codes(pairs)
+        self.coins = [(f"coin-{i}", f"c{i}") for i in range(coins)]
+        self._lock = threading.Lock()
+
+    def _price(self) -> float:
+        with self._lock:
+            return round(self.rng.uniform(0.01, 50000.0), 6)
+
+    def respond(self, path: str, query: dict) -> Optional[dict]:
+        if path.endswith("/simple/price"):
+            ids = query.get("ids", [""])[0].split(",")
+            vs = query.get("vs_currencies", ["usd"])[0]
+            return {coin_id: {vs: self._price()} for coin_id in ids if coin_id}
+        if path.endswith("/coins/markets"):
+            page = int(query.get("page", ["1"])[0])
+            per_page = int(query.get("per_page", ["100"])[0])
+            chunk = self.coins[(page - 1) * per_page: page * per_page]
+            return [{"id": coin_id, "symbol": symbol} for coin_id, symbol in chunk]
+        if "/latest/" in path:
+            base = path.rsplit("/", 1)[-1]
+            return {
+                "result": "success",
+                "base_code": base,
+                "rates": {code: self._price() for code in [base, *self.fiat]},
+            }
+        return None
+
+
+class StandInServer:
+    """
+    Локальный подменный HTTP-сервер для источников курсов.
+
+    Клиенты направляются на него через BaseApiClient.set_api_base(base_url):
+    путь запроса — host/path?query исходного URL. Ответ берётся из
+    записанных фикстур, иначе из SyntheticSource (если задан).
+    Перед ответом добавляется задержка latency ± jitter, с вероятностью
+    error_rate отдаётся 500, с вероятностью throttle_rate — 429 с Retry-After.
+    """
+
+    def __init__(
+        self,
+        fixtures_dir: Optional[str] = None,
+        synthetic: Optional[SyntheticSource] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.fixtures = FixtureStore(fixtures_dir) if fixtures_dir else None
+        self.synthetic = synthetic
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _roll(self) -> Tuple[float, float]:
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._rng.uniform(-self.jitter, self.jitter)
+            return max(0.0, delay), self._rng.random()
+
+    def respond(self, key: str) -> Tuple[int, dict, str]:
+        delay, roll = self._roll()
+        time.sleep(delay)
+        if roll < self.error_rate:
+            return 500, {}, '{"error": "injected"}'
+        if roll < self.error_rate + self.throttle_rate:
+            return 429, {"Retry-After": str(self.retry_after)}, '{"error": "throttled"}'
+
+        fixture = self.fixtures.load(key) if self.fixtures else None
+        if fixture:
+            headers = {"Content-Type": fixture["content_type"]}
+            return fixture["status"], headers, fixture["body"]
+        if self.synthetic:
+            parts = urlsplit(f"//{key}")
+            body = self.synthetic.respond(parts.path, parse_qs(parts.query))
+            if body is not None:
+                return 200, {"Content-Type": "application/json"}, json.dumps(body)
+        return 404, {}, '{"error": "no fixture"}'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, headers, body = server.respond(self.path.lstrip("/"))
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self) -> str:
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="standin-server", daemon=True
+        )
+        self._thread.start()
+        return self.base_url
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Подменный сервер источников курсов")
+    parser.add_argument("--fixtures", default=config.FIXTURES_DIR)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pairs", type=int, default=0, help="синтетические пары")
+    parser.add_argument("--coins", type=int, default=0, help="синтетические монеты")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    synthetic = (
+        SyntheticSource(args.pairs, args.coins) if args.pairs or args.coins else None
+    )
+    server = StandInServer(
+        fixtures_dir=args.fixtures,
+        synthetic=synthetic,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        port=args.port,
+    )
+    print(f"Подменный сервер: {server.base_url} (VALUTATRADE_API_BASE)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -5,10 +5,19 @@ from datetime import datetime, timezone
 
 from valutatrade_hub.infra.settings import SettingsLoader
 from valutatrade_hub.parser_service.config import config
+from valutatrade_hub.parser_service.history import get_history_store
+from valutatrade_hub.parser_service.rate_table import publish_rate_table
+from valutatrade_hub.parser_service.rates_format import (
+    decode_pairs,
+    dumps_rates,
+    encode_rates,
+    is_compact,
+)
 
 settings = SettingsLoader()
 DATA_DIR = settings.get("DATA_DIR") or "data"
 RATES_FILE = config.RATES_FILE_PATH
+RATE_TABLE_FILE = config.RATE_TABLE_FILE_PATH
 EXCHANGE_RATES_FILE = config.HISTORY_FILE_PATH
 
 
@@ -27,30 +36,50 @@ def _ensure_file(path: str, default_data):
             json.dump(default_data, f, indent=2, ensure_ascii=False)
 
 
-_ensure_file(RATES_FILE, {"pairs": {}, "last_refresh": None})
-_ensure_file(EXCHANGE_RATES_FILE, {"records": []})
+_ensure_file(RATES_FILE, encode_rates({}, None))
 
 
 def load_rates(path: str = RATES_FILE) -> dict:
-    """Загрузка курсов из файла"""
+    """
+    Загрузка курсов из файла.
+    Компактный формат (версия 2) приводится к прежнему виду {"pairs": {...}}.
+    """
     if not path or not os.path.exists(path):
         return {"pairs": {}, "last_refresh": None}
     with open(path, "r", encoding="utf-8") as f:
         try:
-            return json.load(f)
+            data = json.load(f)
         except json.JSONDecodeError:
             return {"pairs": {}, "last_refresh": None}
+    if is_compact(data):
+        return {"pairs": decode_pairs(data), "last_refresh": data.get("last_refresh")}
+    return data
 
 
-def save_atomic(data: dict, path: str):
-    """Сохраняет данные атомарно, чтобы не испортить файл при ошибке"""
+def _write_atomic(text: str, path: str):
     _ensure_dir(path)
-    with tempfile.NamedTemporaryFile("w", encoding="utf-8", delete=False) as tf:
-        json.dump(data, tf, indent=2, ensure_ascii=False)
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=os.path.dirname(path) or ".", delete=False
+    ) as tf:
+        tf.write(text)
         temp_name = tf.name
     os.replace(temp_name, path)
 
 
+def save_atomic(data: dict, path: str):
+    """Сохраняет данные атомарно, чтобы не испортить файл при ошибке"""
+    _write_atomic(json.dumps(data, indent=2, ensure_ascii=False), path)
+
+
+def save_rates(pairs: dict, last_refresh: str | None, path: str = RATES_FILE):
+    """
+    Атомарно сохраняет снимок курсов в компактном формате
+    и публикует ту же выборку в бинарной таблице для mmap-читателей.
+    """
+    _write_atomic(dumps_rates(pairs, last_refresh), path)
+    publish_rate_table(pairs, RATE_TABLE_FILE)
+
+
 def update_rate_pair(
     from_currency: str,
     to_currency: str,
@@ -58,10 +87,10 @@ def update_rate_pair(
     source: str,
     meta: dict | None = None,
 ):
-    """Обновляет пару валют в основном и историческом файле"""
+    """Обновляет пару валют в rates.json и дописывает её в историю"""
     rates = load_rates(RATES_FILE)
     pair_key = f"{from_currency.upper()}_{to_currency.upper()}"
-    timestamp = datetime.now().replace(tzinfo=timezone.utc).isoformat()
+    timestamp = datetime.now(timezone.utc).isoformat()
 
     rates.setdefault("pairs", {})
     rates["pairs"][pair_key] = {
@@ -70,12 +99,24 @@ def update_rate_pair(
         "source": source,
         "meta": meta or {}
     }
-    rates["last_refresh"] = timestamp
-    save_atomic(rates, RATES_FILE)
+    save_rates(rates["pairs"], timestamp, RATES_FILE)
 
-    history = load_rates(EXCHANGE_RATES_FILE)
-    history.setdefault("records", [])
-    record = {
+    get_history_store().append(
+        history_record(from_currency, to_currency, rate, timestamp, source, meta)
+    )
+
+
+def history_record(
+    from_currency: str,
+    to_currency: str,
+    rate: float,
+    timestamp: str,
+    source: str,
+    meta: dict | None = None,
+) -> dict:
+    """Запись истории курсов в формате exchange_rates.json"""
+    pair_key = f"{from_currency.upper()}_{to_currency.upper()}"
+    return {
         "id": f"{pair_key}_{timestamp}",
         "from_currency": from_currency.upper(),
         "to_currency": to_currency.upper(),
@@ -84,6 +125,3 @@ def update_rate_pair(
         "source": source,
         "meta": meta or {}
     }
-    history["records"].append(record)
-    save_atomic(history, EXCHANGE_RATES_FILE)
-    
\ No newline at end of file
@@ -1,12 +1,21 @@
+import json
 import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime, timezone
-from typing import List
+from typing import Callable, Dict, List, Optional
 
 from valutatrade_hub.infra.settings import SettingsLoader
 from valutatrade_hub.parser_service.config import config
 
 from .api_clients import BaseApiClient
-from .storage import save_atomic
+from .history import get_history_store
+from .rates_cache import checked_path, get_rates_cache
+from .rates_format import to_epoch
+from .storage import history_record, save_atomic, save_rates
 
 settings = SettingsLoader()
 DATA_DIR = settings.get("DATA_DIR", "data")
@@ -14,45 +23,261 @@ RATES_FILE = config.RATES_FILE_PATH
 
 logger = logging.getLogger(__name__)
 
+RatesListener = Callable[[Dict[str, dict]], None]
+_listeners: List[RatesListener] = []
+_listeners_lock = threading.Lock()
+
+
+def add_rates_listener(listener: RatesListener):
+    """
+    Подписка на изменения курсов: после сохранения снимка listener
+    получает только изменившиеся пары {pair_key: info}.
+    """
+    with _listeners_lock:
+        if listener not in _listeners:
+            _listeners.append(listener)
+
+
+def remove_rates_listener(listener: RatesListener):
+    with _listeners_lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def _notify_listeners(changed: Dict[str, dict]):
+    if not changed:
+        return
+    with _listeners_lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(changed)
+        except Exception as exc:
+            logger.error(f"Ошибка обработчика обновления курсов: {exc}")
+
+
 class RatesUpdater:
     """
     Координация обновления всех валютных курсов.
+
+    В конкурентном режиме все клиенты опрашиваются параллельно. Ожидание
+    ограничено общим дедлайном (deadline) и дедлайном клиента
+    (client.deadline или client_deadline): опоздавшие источники пропускаются,
+    сохраняется то, что успело прийти.
+
+    В дельта-режиме новый снимок сравнивается с предыдущим (из RatesCache):
+    rates.json переписывается только при изменениях, в историю попадают только
+    пары, курс которых сдвинулся больше чем на epsilon (относительно), а
+    подтверждение неизменных курсов пишется в маленький файл checked_path.
     """
-    def __init__(self, clients: List[BaseApiClient]):
+    def __init__(
+        self,
+        clients: List[BaseApiClient],
+        concurrent: bool = config.UPDATE_CONCURRENT,
+        deadline: float = config.UPDATE_DEADLINE_SECONDS,
+        client_deadline: float = config.CLIENT_DEADLINE_SECONDS,
+        delta: bool = config.UPDATE_DELTA_MODE,
+        epsilon: float = config.RATES_DELTA_EPSILON,
+    ):
         self.clients = clients
+        self.concurrent = concurrent
+        self.deadline = deadline
+        self.client_deadline = client_deadline
+        self.delta = delta
+        self.epsilon = epsilon
+        self.last_report: dict = {}
+        self._errors: Dict[str, str] = {}
 
-    def run_update(self):
-        """
-        1. Получаем данные от всех клиентов
-        2. Объединяем словари
-        3. Добавляем метаданные last_refresh
-        4. Сохраняем в rates.json
-        5. Логируем шаги
-        """
-        all_rates = {}
+    def _fetch_sequential(self) -> List[Optional[Dict[str, dict]]]:
+        results: List[Optional[Dict[str, dict]]] = []
         for client in self.clients:
             try:
-                client_rates = client.fetch_rates()
-                all_rates.update(client_rates)
-                logger.info(
-                    f"{client.__class__.__name__}"
-                    "успешно обновил {len(client_rates)} пар"
-                )
+                results.append(client.fetch_rates())
             except Exception as exc:
                 logger.error(
                     f"{client.__class__.__name__} не удалось получить данные: {exc}"
                 )
+                self._errors[client.__class__.__name__] = str(exc)
+                results.append(None)
+        return results
 
-        timestamp = datetime.now().replace(tzinfo=timezone.utc).isoformat()
-        final_data = {
-            "pairs": all_rates,
-            "last_refresh": timestamp
-        }
+    def _fetch_concurrent(self) -> List[Optional[Dict[str, dict]]]:
+        """
+        Каждый клиент запускается в daemon-потоке, чтобы зависший запрос
+        не задерживал ни ответ, ни завершение процесса.
+        """
+        started = time.monotonic()
+        futures: List[Future] = []
+
+        for client in self.clients:
+            future: Future = Future()
+            thread = threading.Thread(
+                target=self._run_client,
+                args=(client, future),
+                name=f"rates-{client.__class__.__name__}",
+                daemon=True,
+            )
+            thread.start()
+            futures.append(future)
 
-        save_atomic(final_data, RATES_FILE)
-        logger.info(f"Обновление завершено. Всего пар: {len(all_rates)}")
+        results: List[Optional[Dict[str, dict]]] = []
+        for client, future in zip(self.clients, futures):
+            client_deadline = getattr(client, "deadline", None) or self.client_deadline
+            until = started + min(self.deadline, client_deadline)
+            name = client.__class__.__name__
+            try:
+                results.append(
+                    future.result(timeout=max(0.0, until - time.monotonic()))
+                )
+            except FutureTimeoutError:
+                logger.error(f"{name} не уложился в дедлайн, данные пропущены")
+                self._errors[name] = "дедлайн истёк"
+                results.append(None)
+            except Exception as exc:
+                logger.error(f"{name} не удалось получить данные: {exc}")
+                self._errors[name] = str(exc)
+                results.append(None)
+        return results
+
+    @staticmethod
+    def _run_client(client: BaseApiClient, future: Future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(client.fetch_rates())
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    def run_update(self):
+        """
+        1. Получаем данные от всех клиентов (параллельно или по очереди)
+        2. Объединяем словари в порядке self.clients — при совпадении пар
+           побеждает клиент, стоящий в списке позже
+        3. Добавляем метаданные last_refresh
+        4. Сохраняем в rates.json и дописываем пары в историю
+        5. Логируем шаги
+        """
+        self._errors = {}
+        if self.concurrent and len(self.clients) > 1:
+            results = self._fetch_concurrent()
+        else:
+            results = self._fetch_sequential()
+
+        all_rates = {}
+        for client, client_rates in zip(self.clients, results):
+            if client_rates is None:
+                continue
+            all_rates.update(client_rates)
+            logger.info(
+                f"{client.__class__.__name__} "
+                f"успешно обновил {len(client_rates)} пар"
+            )
+
+        timestamp = datetime.now(timezone.utc).isoformat()
+        if self.delta:
+            self._save_delta(all_rates, timestamp)
+        else:
+            save_rates(all_rates, timestamp, RATES_FILE)
+            self._append_history(all_rates, timestamp)
+            _notify_listeners(all_rates)
+            self.last_report = {
+                "changed": len(all_rates), "unchanged": 0, "written": True
+            }
+
+        self.last_report["errors"] = dict(self._errors)
+        logger.info(
+            f"Обновление завершено. Всего пар: {len(all_rates)}, "
+            f"изменилось: {self.last_report['changed']}, "
+            f"без изменений: {self.last_report['unchanged']}"
+        )
         return len(all_rates)
 
+    def _moved(self, new_rate: float, old_rate: float) -> bool:
+        return abs(new_rate - old_rate) > self.epsilon * abs(old_rate)
+
+    def _save_delta(self, fetched: Dict[str, dict], timestamp: str):
+        previous = get_rates_cache(RATES_FILE).pairs()
+        sources = {info.get("source", "") for info in fetched.values()}
+
+        changed = {
+            key: info for key, info in fetched.items()
+            if key not in previous or self._moved(info["rate"], previous[key]["rate"])
+        }
+        # пары, которые опрошенный источник перестал отдавать
+        removed = [
+            key for key, info in previous.items()
+            if key not in fetched and info.get("source", "") in sources
+        ]
+
+        written = bool(changed or removed)
+        if written:
+            pairs = {
+                key: info for key, info in previous.items() if key not in removed
+            }
+            pairs.update(changed)
+            save_rates(pairs, timestamp, RATES_FILE)
+            self._append_history(changed, timestamp)
+            _notify_listeners(changed)
+
+        if sources:
+            self._save_checked(self._source_times(fetched), timestamp)
+        self.last_report = {
+            "changed": len(changed),
+            "unchanged": len(fetched) - len(changed),
+            "removed": len(removed),
+            "written": written,
+        }
+
+    @staticmethod
+    def _source_times(fetched: Dict[str, dict]) -> Dict[str, float]:
+        """
+        Время данных каждого источника — самая старая метка его пар:
+        ответ из HTTP-кеша подтверждает курсы на момент сохранения, а не опроса.
+        """
+        times: Dict[str, float] = {}
+        for info in fetched.values():
+            source = info.get("source", "")
+            ts = to_epoch(info.get("timestamp")) or time.time()
+            times[source] = min(times.get(source, ts), ts)
+        return times
+
+    @staticmethod
+    def _save_checked(sources: Dict[str, float], timestamp: str):
+        """Отмечает время данных успешно опрошенных источников"""
+        path = checked_path(RATES_FILE)
+        data = {"sources": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                try:
+                    data = json.load(f)
+                except json.JSONDecodeError:
+                    pass
+        checked = data.setdefault("sources", {})
+        for source, checked_at in sources.items():
+            checked[source] = max(checked.get(source, 0.0), checked_at)
+        data["last_refresh"] = timestamp
+        save_atomic(data, path)
+
+    @staticmethod
+    def _append_history(rates: Dict[str, dict], timestamp: str):
+        records = []
+        for key, info in rates.items():
+            from_code, _, to_code = key.partition("_")
+            records.append(
+                history_record(
+                    from_code,
+                    to_code,
+                    info["rate"],
+                    info.get("timestamp") or timestamp,
+                    info.get("source", ""),
+                    info.get("meta"),
+                )
+            )
+        try:
+            get_history_store().append_many(records)
+        except OSError as exc:
+            logger.error(f"Не удалось записать историю курсов: {exc}")
+
 
 if __name__ == "__main__":
     from .api_clients import CoinGeckoClient, ExchangeRateApiClient